@@ -0,0 +1,227 @@
+import argparse
+import json
+import platform
+import time
+import tracemalloc
+
+import numpy as np
+
+import delauney
+import predicates
+from delauney import Delauney
+from quad_edge import Site
+
+
+def uniform(n, rng):
+    return rng.uniform(0, 10000, size=(n, 2))
+
+
+def clustered(n, rng):
+    # Gaussian blobs of very different spread around a few centers
+    centers = rng.uniform(0, 10000, size=(max(1, n // 1000), 2))
+    spread = rng.uniform(1, 200, size=len(centers))
+    which = rng.integers(0, len(centers), size=n)
+    return centers[which] + rng.normal(size=(n, 2)) * spread[which, None]
+
+
+def grid(n, rng):
+    # Every unit square has four cocircular corners
+    side = int(np.ceil(np.sqrt(n)))
+    xs, ys = np.divmod(np.arange(n), side)
+    return np.column_stack([xs, ys]).astype(np.float64)
+
+
+def collinear(n, rng):
+    # Most sites lie on a handful of lines, the rest scattered around them
+    lines = 8
+    on_line = n - n // 10
+    t = rng.uniform(-5000, 5000, size=on_line)
+    angle = np.linspace(0, np.pi, lines, endpoint=False)[rng.integers(0, lines, size=on_line)]
+    points = 5000 + t[:, None] * np.column_stack([np.cos(angle), np.sin(angle)])
+    return np.concatenate([points, uniform(n - on_line, rng)])
+
+
+def strip(n, rng):
+    # A sensor sweep: a thousand times longer than it is wide
+    return np.column_stack([rng.uniform(0, 10000, size=n), rng.uniform(0, 10, size=n)])
+
+
+def anisotropic(n, rng):
+    # Elongated blobs in random directions
+    centers = rng.uniform(0, 10000, size=(max(1, n // 1000), 2))
+    angle = rng.uniform(0, np.pi, size=len(centers))
+    which = rng.integers(0, len(centers), size=n)
+    local = rng.normal(size=(n, 2)) * (2000, 2)
+    cos, sin = np.cos(angle[which]), np.sin(angle[which])
+    return centers[which] + np.column_stack([cos * local[:, 0] - sin * local[:, 1], sin * local[:, 0] + cos * local[:, 1]])
+
+
+def duplicates(n, rng):
+    # Only a tenth of the sites are distinct
+    distinct = uniform(max(1, n // 10), rng)
+    return distinct[rng.integers(0, len(distinct), size=n)]
+
+
+DISTRIBUTIONS = {
+    "uniform": uniform,
+    "clustered": clustered,
+    "grid": grid,
+    "collinear": collinear,
+    "strip": strip,
+    "anisotropic": anisotropic,
+    "duplicates": duplicates,
+}
+
+
+def build(points, api, strategy):
+    if api == "list":
+        return Delauney([Site(x, y) for x, y in points.tolist()], strategy=strategy)
+    return Delauney.from_array(points, strategy=strategy)
+
+
+def phases(points, api, strategy):
+    # The measured phases, in order, sharing the triangulation they build
+    d = None
+
+    def construct():
+        nonlocal d
+        d = build(points, api, strategy)
+
+    def triangles():
+        d.find_triangles()
+
+    def voronoi():
+        d.voronoi()
+
+    return {"build": construct, "find_triangles": triangles, "voronoi": voronoi}
+
+
+def timed(points, api, strategy, repeat):
+    best = {}
+    for _ in range(repeat):
+        for name, phase in phases(points, api, strategy).items():
+            start = time.perf_counter()
+            phase()
+            seconds = time.perf_counter() - start
+            best[name] = min(seconds, best.get(name, seconds))
+    return best
+
+
+class Counter:
+    # Wraps a predicate and counts its calls
+    def __init__(self, function) -> None:
+        self.function = function
+        self.calls = 0
+
+    def __call__(self, *args):
+        self.calls += 1
+        return self.function(*args)
+
+
+def profiled(points, api, strategy):
+    # Peak traced memory and predicate calls per phase. Run separately from
+    # the timings since both tracemalloc and the counters slow things down.
+    names = {
+        (delauney, "orient2d"): "orient2d",
+        (delauney, "incircle"): "incircle",
+        (predicates, "orient2d_exact"): "orient2d_exact",
+        (predicates, "incircle_exact"): "incircle_exact",
+    }
+    counters = {key: Counter(getattr(*key)) for key in names}
+    for (module, name), counter in counters.items():
+        setattr(module, name, counter)
+
+    result = {}
+    tracemalloc.start()
+    try:
+        for phase, run in phases(points, api, strategy).items():
+            for counter in counters.values():
+                counter.calls = 0
+            tracemalloc.reset_peak()
+            run()
+            result[phase] = {
+                "peak_bytes": tracemalloc.get_traced_memory()[1],
+                "calls": {names[key]: counter.calls for key, counter in counters.items()},
+            }
+    finally:
+        tracemalloc.stop()
+        for (module, name), counter in counters.items():
+            setattr(module, name, counter.function)
+    return result
+
+
+def bench(sizes, distributions, api, strategies, repeat, profile, seed):
+    results = []
+    for distribution in distributions:
+        for n in sizes:
+            points = DISTRIBUTIONS[distribution](n, np.random.default_rng(seed))
+            for strategy in strategies:
+                record = {
+                    "distribution": distribution,
+                    "n": n,
+                    "api": api,
+                    "strategy": strategy,
+                    "seconds": timed(points, api, strategy, repeat),
+                }
+                if profile:
+                    for phase, stats in profiled(points, api, strategy).items():
+                        record.setdefault("peak_bytes", {})[phase] = stats["peak_bytes"]
+                        record.setdefault("calls", {})[phase] = stats["calls"]
+                results.append(record)
+
+                seconds = "  ".join(f"{k} {v:9.3f}s" for k, v in record["seconds"].items())
+                print(f"{distribution:<11} {n:>9} {strategy:<11}  {seconds}", flush=True)
+    return results
+
+
+def key(record):
+    # Runs from before strategies existed used the vertical one
+    return record["distribution"], record["n"], record["api"], record.get("strategy", "vertical")
+
+
+def compare(results, baseline):
+    # Ratio of this run's time to the baseline's for every shared case
+    old = {key(r): r["seconds"] for r in baseline["results"]}
+    for record in results:
+        before = old.get(key(record))
+        if before is None:
+            continue
+        ratios = "  ".join(f"{k} {v / before[k]:6.2f}x" for k, v in record["seconds"].items() if before.get(k))
+        print(f"{record['distribution']:<11} {record['n']:>9} {record['strategy']:<11}  {ratios}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Time Delauney construction, triangle and Voronoi extraction.")
+    parser.add_argument("--sizes", type=lambda s: [int(float(n)) for n in s.split(",")], default=[1000, 10000, 100000])
+    parser.add_argument("--distributions", type=lambda s: s.split(","), default=list(DISTRIBUTIONS))
+    parser.add_argument("--api", choices=["array", "list"], default="array")
+    parser.add_argument(
+        "--strategies",
+        type=lambda s: s.split(","),
+        default=["vertical"],
+        help=f"comma-separated construction strategies out of {','.join(delauney.STRATEGIES)}",
+    )
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--no-profile", dest="profile", action="store_false", help="skip memory and call counts")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default="bench_delauney.json")
+    parser.add_argument("--compare", help="earlier output file to compare timings against")
+    args = parser.parse_args()
+
+    results = bench(args.sizes, args.distributions, args.api, args.strategies, args.repeat, args.profile, args.seed)
+    with open(args.out, "w") as f:
+        json.dump(
+            {
+                "python": platform.python_version(),
+                "numpy": np.__version__,
+                "machine": platform.machine(),
+                "seed": args.seed,
+                "results": results,
+            },
+            f,
+            indent=2,
+        )
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(results, json.load(f))
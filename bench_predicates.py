@@ -0,0 +1,57 @@
+import random
+import timeit
+
+import numpy as np
+
+from predicates import incircle, orient2d
+
+
+def det_ccw(a, b, c):
+    return np.linalg.det([[a[0], a[1], 1], [b[0], b[1], 1], [c[0], c[1], 1]]) > 0
+
+
+def det_in_circle(a, b, c, d):
+    return (
+        np.linalg.det(
+            [
+                [a[0], a[1], a[0] ** 2 + a[1] ** 2, 1],
+                [b[0], b[1], b[0] ** 2 + b[1] ** 2, 1],
+                [c[0], c[1], c[0] ** 2 + c[1] ** 2, 1],
+                [d[0], d[1], d[0] ** 2 + d[1] ** 2, 1],
+            ]
+        )
+        > 0
+    )
+
+
+def random_points(n, near_degenerate=False):
+    if near_degenerate:
+        # Points on a tiny perturbation of a line / circle, so the filter fails
+        # and the exact fallback is exercised.
+        base = 0.5
+        return [(base + random.randint(0, 16) * 2.0**-53, base + random.randint(0, 16) * 2.0**-53) for _ in range(n)]
+    return [(random.uniform(0, 10000), random.uniform(0, 10000)) for _ in range(n)]
+
+
+def bench(near_degenerate=False, n=20000, repeat=3):
+    pts = random_points(n + 3, near_degenerate)
+    triples = [(pts[i], pts[i + 1], pts[i + 2]) for i in range(n)]
+    quads = [(pts[i], pts[i + 1], pts[i + 2], pts[i + 3]) for i in range(n)]
+
+    results = {
+        "det ccw": min(timeit.repeat(lambda: [det_ccw(*t) for t in triples], number=1, repeat=repeat)),
+        "orient2d": min(timeit.repeat(lambda: [orient2d(*a, *b, *c) > 0 for a, b, c in triples], number=1, repeat=repeat)),
+        "det in_circle": min(timeit.repeat(lambda: [det_in_circle(*q) for q in quads], number=1, repeat=repeat)),
+        "incircle": min(timeit.repeat(lambda: [incircle(*a, *b, *c, *d) > 0 for a, b, c, d in quads], number=1, repeat=repeat)),
+    }
+
+    label = "near-degenerate" if near_degenerate else "uniform"
+    print(f"{label} inputs, {n} calls each")
+    for name, seconds in results.items():
+        print(f"  {name:<14} {seconds * 1e9 / n:10.1f} ns/call")
+
+
+if __name__ == "__main__":
+    random.seed(0)
+    bench()
+    bench(near_degenerate=True)
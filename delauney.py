@@ -1,11 +1,21 @@
-from collections import defaultdict
-import itertools
-from typing import Dict, List, Tuple
-import uuid
+from array import array
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import heapq
+import json
+import math
+import os
+import random
+import tempfile
+import time
+from typing import Dict, Iterator, List, Sequence, Tuple
 
 import numpy as np
 
-from quad_edge import QuadEdge, Site
+from predicates import incircle, incircle_array, orient2d, orient2d_array
+from quad_edge import EdgeStore, QuadEdge, Site, SiteArray, as_array
+from roadmap import Roadmap
+from stats import Stats
 
 class Triangle:
     def __init__(self, a: Site, b: Site, c: Site) -> None:
@@ -21,123 +31,1058 @@ class Triangle:
         return f"Triangle({self.sites[0]}, {self.sites[1]}, {self.sites[2]})"
 
 class VoronoiEdge:
-    def __init__(self, origin: Site, dest: Site) -> None:
-        self.id = str(uuid.uuid4())
+    def __init__(self, origin: Site, dest: Site, id: int = None) -> None:
+        self.id = id
         self.origin = origin
         self.dest = dest
 
     def __repr__(self):
-        return f"VoronoiEdge(start={self.origin}, end={self.end})"
+        return f"VoronoiEdge(start={self.origin}, end={self.dest})"
+
+# Ranges smaller than this are never handed to a worker process on their own
+PARALLEL_MIN_SITES = 4096
+
+# How the initial triangulation is built. "vertical" is divide and conquer
+# over the sites sorted by x; "alternating" cuts every range across the
+# longer side of its bounding box, which alternates between x and y on
+# evenly spread sites as in Dwyer's algorithm and keeps subproblems from
+# getting long and thin on skewed ones; "hilbert" and "morton" insert the
+# sites one by one in that space-filling curve order, so every point
+# location starts next to its target. Only "vertical" builds with several
+# worker processes.
+STRATEGIES = ("vertical", "alternating", "hilbert", "morton")
+# Bits per coordinate of the space-filling curve keys
+CURVE_BITS = 16
+
+# save() writes FILE_MAGIC, the length of a JSON header as a little-endian
+# uint64, the header, then every array at an offset aligned to FILE_ALIGNMENT.
+# The header gives each array's offset, dtype and shape.
+FILE_MAGIC = b"DELAUNEY"
+FILE_VERSION = 1
+FILE_ALIGNMENT = 64
+
+# Layout of the temporary strip files written by Delauney.stream: the
+# coordinates of a point and its row in the source. Per quarter-edge states
+# of the streamed mesh: the face on its left was yielded, or deleted.
+STRIP_RECORD = np.dtype([("x", "<f8"), ("y", "<f8"), ("row", "<i8")])
+YIELDED = 1
+HOLE = 2
+
+# refine() leaves edges shorter than this fraction of the diagonal of the
+# bounds alone, so that segments meeting at small angles, which keep
+# encroaching on each other, stop being split
+REFINE_MIN_EDGE = 1e-9
+
+# relative_neighborhood_array() searches around this many edges at a time,
+# which bounds the memory of the vectorized pass
+NEIGHBORHOOD_CHUNK = 1 << 16
+
+# Runs validate() after every build and update when set, for test runs in CI
+VALIDATE = os.environ.get("DELAUNEY_VALIDATE", "") not in ("", "0")
+
 
 class Delauney:
-    def __init__(self, sites: List[Site]) -> None:
-        self.edges: Dict[str, QuadEdge] = {}
+    def __init__(
+        self, sites: List[Site], workers: int = 1, stats: bool = False, strategy: str = "vertical", tolerance: float = 0.0
+    ) -> None:
+        # Sorts sites in place. Sites dropped by sanitize() or merged within
+        # tolerance are left out of self.sites, representative giving for
+        # each position in the sorted list the index of the site standing
+        # for it.
+        sites.sort(key=lambda s: (s.x, s.y))
+        points = np.array([(s.x, s.y) for s in sites], dtype=np.float64).reshape(-1, 2)
+        keep, self.representative = sanitize(points)
+        if len(keep) < len(sites):
+            sites = [sites[i] for i in keep.tolist()]
+            points = points[keep]
+        self.order: np.ndarray = None
+        self.__build(points, sites, workers, stats, strategy)
+
+        roots = self.__merge_close(tolerance)
+        if roots is not None:
+            self.__build(points[roots], [sites[i] for i in roots.tolist()], workers, stats, strategy)
+
+    @classmethod
+    def from_array(
+        cls,
+        points: np.ndarray,
+        workers: int = 1,
+        stats: bool = False,
+        strategy: str = "vertical",
+        tolerance: float = 0.0,
+    ) -> "Delauney":
+        # Triangulate an (N, 2) coordinate array. The rows go through
+        # sanitize() first, sites being referred to by their index in the
+        # sorted result: order maps each index back to its row in the input
+        # and representative each row to the index of its site. With a
+        # tolerance, sites chained together by gaps no longer than it are
+        # merged into the lexicographically first of them. Site objects are
+        # only created when a view asks for one.
+        keep, representative = sanitize(points)
+        points = np.asarray(points, dtype=np.float64)
+
+        d = cls.__new__(cls)
+        d.order = keep
+        d.representative = representative
+        d.__build(points[keep], SiteArray(points[keep]), workers, stats, strategy)
+
+        roots = d.__merge_close(tolerance)
+        if roots is not None:
+            d.order = keep[roots]
+            d.__build(points[d.order], SiteArray(points[d.order]), workers, stats, strategy)
+        return d
+
+    def __merge_close(self, tolerance: float) -> np.ndarray:
+        # The constructors' merging of sites within tolerance. The mesh of
+        # the distinct sites has every gap a tolerance merges along as an
+        # edge, so it finds them. Points representative at the merged sites
+        # and returns the indices of the sites to build again with, or None
+        # when nothing merged and the mesh stands.
+        if not tolerance > 0:
+            return None
+        roots, merged = _close_groups(self.points, self.edge_array(), tolerance)
+        if len(roots) == len(self.points):
+            return None
+        self.representative = np.where(self.representative >= 0, merged[self.representative], -1)
+        return roots
+
+    def __build(
+        self, points: np.ndarray, sites: Sequence[Site], workers: int, stats: bool, strategy: str = "vertical"
+    ) -> None:
+        if strategy not in STRATEGIES:
+            raise ValueError(f"unknown strategy {strategy!r}, expected one of {STRATEGIES}")
+        if workers > 1 and strategy != "vertical":
+            raise ValueError(f"strategy {strategy!r} builds on one core, workers must be 1")
         self.left: QuadEdge = None
         self.right: QuadEdge = None
-        sites.sort(key=lambda s: (s.x, s.y))
-        self.left, self.right = self.__triangulate(sites)
+        self.points = points
+        self.sites = sites
+        # (xmin, ymin, xmax, ymax) of the sites
+        self.bounds = (
+            tuple(points.min(axis=0).tolist() + points.max(axis=0).tolist()) if len(points) else (0.0, 0.0, 0.0, 0.0)
+        )
+        self.xs = memoryview(points[:, 0])
+        self.ys = memoryview(points[:, 1])
+        self.edges = EdgeStore(sites, capacity=3 * len(points))
+        # A rebuild, after sites merged within tolerance, starts the stats of the
+        # first build over; its methods are already counted
+        previous = getattr(self, "stats", None)
+        self.stats: Stats = None
+        # Arrays precomputed by save(), dropped once the mesh changes
+        self.__saved: Dict[str, np.ndarray] = {}
+        # Roadmaps by clearance, also dropped on change
+        self.__roadmaps: Dict[float, Roadmap] = {}
+        # Edge records (quarter-edge >> 2) of segments flips must keep, and
+        # points inside holes bounded by them
+        self.constraints = set()
+        self.holes: List[Tuple[float, float]] = []
+        if previous is not None:
+            previous.reset()
+            self.stats = previous
+            self.__count_edge_operations()
+        elif stats:
+            self.enable_stats()
+
+        start = time.perf_counter()
+        if len(points) < 2:
+            pass
+        elif strategy == "alternating":
+            self.left, self.right = map(self.edges.view, self.__triangulate_alternating())
+        elif strategy in ("hilbert", "morton"):
+            self.left, self.right = map(self.edges.view, self.__triangulate_incremental(_curve_order(points, strategy)))
+        elif workers > 1:
+            self.left, self.right = map(self.edges.view, self.__triangulate_parallel(workers))
+        else:
+            self.left, self.right = map(self.edges.view, self.__triangulate(0, len(points)))
+        if self.stats is not None:
+            self.stats.add_time("triangulate", time.perf_counter() - start)
+
+        self.__index_incident()
+        self.__coords = points
+        self.__recent = 0
+        # Samples the starting sites of walks, apart from the global random
+        # state so that walks are the same from run to run
+        self.__random = random.Random(0)
+        # Number of sites taken out by remove(); their indices stay allocated
+        self.removed = 0
+        if self.stats is not None:
+            self.stats.add_time("build", time.perf_counter() - start)
+        if VALIDATE:
+            self.validate()
+
+    def __index_incident(self) -> None:
+        # One outgoing edge per site, the starting points for walks
+        store = self.edges
+        org = np.frombuffer(store.org, dtype=np.int64, count=store.count >> 1)
+        quarters = np.arange(0, store.count, 2, dtype=np.int64)
+        alive = org >= 0
+        incident = np.full(len(self.points), -1, dtype=np.int64)
+        incident[org[alive]] = quarters[alive]
+        self.incident = array("q", incident.tobytes())
+
+    def enable_stats(self) -> Stats:
+        # Starts counting predicate calls, edge operations and work per merge
+        # level, and timing the extraction and update methods. Merges done in
+        # worker processes are not counted.
+        if self.stats is None:
+            stats = self.stats = Stats()
+            self.__ccw = stats.counted("ccw", self.__ccw)
+            self.__in_circle = stats.counted("in_circle", self.__in_circle)
+            self.__orient = stats.counted("orient", self.__orient)
+            self.__merge = stats.merged(self.__merge)
+            self.__count_edge_operations()
+            for name in (
+                "find_triangles",
+                "triangle_array",
+                "voronoi",
+                "voronoi_arrays",
+                "voronoi_cells",
+                "adjacency",
+                "insert",
+                "remove",
+                "move",
+                "insert_segment",
+                "refine",
+                "roadmap",
+                "route",
+            ):
+                setattr(self, name, stats.timed(name, getattr(self, name)))
+        return self.stats
+
+    def __count_edge_operations(self) -> None:
+        # splice counts include the splices done by connect and delete
+        for name in ("make_edge", "splice", "connect", "delete"):
+            setattr(self.edges, name, self.stats.counted(name, getattr(self.edges, name)))
+
+    def save(self, path: str, triangles: bool = False, voronoi: bool = False) -> None:
+        # Writes the coordinates and edge store in the flat layout described at
+        # FILE_MAGIC, optionally with the triangle and Voronoi arrays so load()
+        # does not have to extract them again.
+        store = self.edges
+        arrays = {
+            "points": self.points,
+            "onext": np.frombuffer(store.onext, dtype=np.int64, count=store.count),
+            "org": np.frombuffer(store.org, dtype=np.int64, count=store.count >> 1),
+            "incident": np.frombuffer(self.incident, dtype=np.int64, count=len(self.points)),
+            "free": np.array(store.free, dtype=np.int64),
+        }
+        if self.order is not None:
+            arrays["order"] = self.order
+        if self.representative is not None:
+            arrays["representative"] = self.representative
+        if self.constraints:
+            arrays["constraints"] = np.array(sorted(self.constraints), dtype=np.int64)
+        if self.holes:
+            arrays["holes"] = np.array(self.holes, dtype=np.float64)
+        if triangles:
+            arrays["triangles"] = self.triangle_array()
+        if voronoi:
+            arrays["voronoi_centers"], arrays["voronoi_edges"] = self.voronoi_arrays()
+
+        arrays = {name: np.ascontiguousarray(a, dtype=a.dtype.newbyteorder("<")) for name, a in arrays.items()}
+        header = {
+            "version": FILE_VERSION,
+            "count": store.count,
+            # -1 when there are fewer than two sites, and no edges
+            "left": self.left.id if self.left is not None else -1,
+            "right": self.right.id if self.right is not None else -1,
+            "removed": self.removed,
+            "bounds": list(self.bounds),
+            "arrays": {},
+        }
+        # Offsets depend on the header length, which depends on the offsets;
+        # numbers only grow, so a couple of passes settle it
+        size = 0
+        while True:
+            offset = len(FILE_MAGIC) + 8 + size
+            for name, a in arrays.items():
+                offset += -offset % FILE_ALIGNMENT
+                header["arrays"][name] = {"offset": offset, "dtype": a.dtype.str, "shape": list(a.shape)}
+                offset += a.nbytes
+            encoded = json.dumps(header).encode()
+            if len(encoded) <= size:
+                break
+            size = len(encoded)
+
+        with open(path, "wb") as f:
+            f.write(FILE_MAGIC)
+            f.write(size.to_bytes(8, "little"))
+            f.write(encoded.ljust(size))
+            for name, a in arrays.items():
+                f.write(bytes(header["arrays"][name]["offset"] - f.tell()))
+                a.tofile(f)
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> "Delauney":
+        # Reads a file written by save(). With mmap the arrays are views of a
+        # copy-on-write mapping of the file, so processes loading the same file
+        # share its pages and later updates never reach the file.
+        with open(path, "rb") as f:
+            if f.read(len(FILE_MAGIC)) != FILE_MAGIC:
+                raise ValueError(f"{path} is not a saved triangulation")
+            header = json.loads(f.read(int.from_bytes(f.read(8), "little")))
+        if header["version"] != FILE_VERSION:
+            raise ValueError(f"unsupported file version {header['version']}")
+
+        if mmap:
+            buffer = np.memmap(path, dtype=np.uint8, mode="c")
+        else:
+            with open(path, "rb") as f:
+                buffer = np.frombuffer(bytearray(f.read()), dtype=np.uint8)
+        arrays = {}
+        for name, a in header["arrays"].items():
+            dtype, shape = np.dtype(a["dtype"]), tuple(a["shape"])
+            size = dtype.itemsize * int(np.prod(shape))
+            arrays[name] = buffer[a["offset"] : a["offset"] + size].view(dtype).reshape(shape)
+
+        def int64s(a):
+            return memoryview(a).cast("B").cast("q")
+
+        points = arrays["points"]
+        d = cls.__new__(cls)
+        d.order = arrays.get("order")
+        d.representative = arrays.get("representative")
+        d.points = points
+        d.sites = SiteArray(points)
+        d.bounds = tuple(header["bounds"])
+        d.xs = memoryview(points[:, 0])
+        d.ys = memoryview(points[:, 1])
+        d.edges = EdgeStore(d.sites)
+        d.edges.onext = int64s(arrays["onext"])
+        d.edges.org = int64s(arrays["org"])
+        d.edges.count = header["count"]
+        d.edges.free = arrays["free"].tolist()
+        d.stats = None
+        d.left = d.edges.view(header["left"]) if header["left"] >= 0 else None
+        d.right = d.edges.view(header["right"]) if header["right"] >= 0 else None
+        d.incident = int64s(arrays["incident"])
+        d.__coords = points
+        d.__recent = 0
+        d.__random = random.Random(0)
+        d.removed = header["removed"]
+        d.constraints = set(arrays["constraints"].tolist()) if "constraints" in arrays else set()
+        d.holes = [tuple(h) for h in arrays["holes"].tolist()] if "holes" in arrays else []
+        d.__roadmaps = {}
+        d.__saved = {name: arrays[name] for name in ("triangles", "voronoi_centers", "voronoi_edges") if name in arrays}
+        return d
 
     def voronoi(self):
-        triangles = self.find_triangles()
-        triangle_to_circumcenter = {triangle: self.circumcenter(*triangle.sites) for triangle in triangles}
+        centers, edges = self.voronoi_arrays()
+        circumcenters = [Site(x, y) for x, y in centers.tolist()]
+        voronoi_edges = [VoronoiEdge(circumcenters[a], circumcenters[b], i) for i, (a, b) in enumerate(edges.tolist())]
+        return circumcenters, voronoi_edges
+
+    def voronoi_arrays(self) -> Tuple[np.ndarray, np.ndarray]:
+        # Voronoi vertices as an (M, 2) array of triangle circumcenters, and
+        # Voronoi edges as a (K, 2) array of indices into it, one per pair of
+        # triangles sharing a Delaunay edge.
+        if "voronoi_centers" in self.__saved:
+            return self.__saved["voronoi_centers"], self.__saved["voronoi_edges"]
+        triangles, sides = self.__faces()
+        centers = self.circumcenters(triangles)
+        face = self.__face_index(sides)
+
+        # Each interior edge is a side of two triangles, once per direction
+        sides = sides.ravel()
+        sides = sides[sides < (sides ^ 2)]
+        other = face[sides ^ 2]
+        keep = other >= 0
+        return centers, np.column_stack([face[sides[keep]], other[keep]])
+
+    def roadmap(self, clearance: float = 0.0) -> Roadmap:
+        # The Voronoi graph as a Roadmap over voronoi_arrays() centers. It
+        # leaves out Voronoi edges crossing a segment, triangles in holes
+        # and gaps between sites narrower than 2 * clearance. Kept until the
+        # triangulation changes.
+        roadmap = self.__roadmaps.get(clearance)
+        if roadmap is not None:
+            return roadmap
 
-        edge_to_triangles = defaultdict(list)
-        for triangle in triangles:
-            for site1, site2 in itertools.combinations(triangle.sites, 2):
-                edge_key = frozenset((site1, site2))
-                edge_to_triangles[edge_key].append(triangle)
+        centers, edges = self.voronoi_arrays()
+        # The Delaunay edge uv each Voronoi edge crosses, the two corners
+        # its triangles share
+        first, second = self.triangle_array()[edges.T]
+        apex = (first[:, :, None] != second[:, None, :]).all(axis=2).argmax(axis=1)
+        rows = np.arange(len(edges))
+        u, v = first[rows, (apex + 1) % 3], first[rows, (apex + 2) % 3]
 
-        voronoi_edges = set()
+        keep = np.ones(len(edges), dtype=bool)
+        if self.constraints:
+            n = len(self.points)
+            segments = np.sort(self.constraint_array(), axis=1)
+            keep &= ~np.isin(np.minimum(u, v) * n + np.maximum(u, v), segments[:, 0] * n + segments[:, 1])
+        if clearance > 0:
+            gap = self.points[u] - self.points[v]
+            keep &= np.hypot(gap[:, 0], gap[:, 1]) >= 2 * clearance
+        edges = edges[keep]
+        if self.holes:
+            hole = self.hole_mask()
+            edges = edges[~(hole[edges[:, 0]] | hole[edges[:, 1]])]
 
-        for adjacent in edge_to_triangles.values():
-            if len(adjacent) == 2:  
-                t1, t2 = adjacent
-                cc1 = triangle_to_circumcenter[t1]
-                cc2 = triangle_to_circumcenter[t2]
-                voronoi_edges.add(VoronoiEdge(cc1, cc2))
+        roadmap = self.__roadmaps[clearance] = Roadmap(centers, edges)
+        return roadmap
 
-        return list(triangle_to_circumcenter.values()), list(voronoi_edges)
+    def route(
+        self, start: Tuple[float, float], goal: Tuple[float, float], clearance: float = 0.0, heuristic: bool = True
+    ) -> Tuple[np.ndarray, float]:
+        # Shortest path from start to goal along the Voronoi edges of
+        # roadmap(clearance), as (P, 2) points and length. See Roadmap.route.
+        return self.roadmap(clearance).route(start, goal, heuristic)
+
+    def voronoi_rays(self) -> Tuple[np.ndarray, np.ndarray]:
+        # The unbounded Voronoi edges, one per convex hull edge: the index of
+        # the circumcenter each ray starts from (as in voronoi_arrays) and the
+        # unit outward normal of the hull edge as its direction.
+        _, sides = self.__faces()
+        face = self.__face_index(sides)
+
+        # Hull edges are the sides whose sym has the outer face on its left
+        sides = sides.ravel()
+        sides = sides[face[sides ^ 2] < 0]
+        hull = sides ^ 2
+
+        org = np.frombuffer(self.edges.org, dtype=np.int64, count=self.edges.count >> 1)
+        d = self.points[org[(hull >> 1) ^ 1]] - self.points[org[hull >> 1]]
+        normals = np.column_stack([-d[:, 1], d[:, 0]])
+        return face[sides], normals / np.linalg.norm(normals, axis=1)[:, None]
+
+    def voronoi_cells(
+        self, bounds: Tuple[float, float, float, float] = None
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        # Voronoi cell of every site clipped to bounds (xmin, ymin, xmax, ymax),
+        # which defaults to the bounds of the sites. Cells are returned in CSR
+        # form: the ccw polygon of site i is
+        # vertices[indices[offsets[i] : offsets[i + 1]]].
+        #
+        # Each cell starts as the bounding box and is cut by the bisector with
+        # each Delaunay neighbor, so unbounded hull cells and inputs without
+        # any triangle need no special casing. Vertices that coincide up to
+        # rounding are shared between cells.
+        xmin, ymin, xmax, ymax = bounds if bounds is not None else self.bounds
+        box = [(xmin, ymin), (xmax, ymin), (xmax, ymax), (xmin, ymax)]
+        x = self.points[:, 0].tolist()
+        y = self.points[:, 1].tolist()
+        offsets, targets = self.adjacency()
+        offsets = offsets.tolist()
+        targets = targets.tolist()
+
+        cells = []
+        for i in range(len(x)):
+            if self.incident[i] < 0:
+                # Removed site
+                cells.append([])
+                continue
+            polygon = box
+            px, py = x[i], y[i]
+            for j in targets[offsets[i] : offsets[i + 1]]:
+                # Keep the side of the bisector closer to site i
+                nx, ny = x[j] - px, y[j] - py
+                polygon = _clip_polygon(polygon, nx, ny, (nx * (px + x[j]) + ny * (py + y[j])) / 2)
+                if not polygon:
+                    break
+            cells.append(polygon)
+
+        sizes = np.array([len(cell) for cell in cells], dtype=np.int64)
+        offsets = np.zeros(len(cells) + 1, dtype=np.int64)
+        np.cumsum(sizes, out=offsets[1:])
+        points = np.array([p for cell in cells for p in cell], dtype=np.float64).reshape(-1, 2)
+
+        tolerance = 1e-9 * max(xmax - xmin, ymax - ymin, 1e-300)
+        keys = np.round((points - (xmin, ymin)) / tolerance).astype(np.int64)
+        _, first, indices = np.unique(keys, axis=0, return_index=True, return_inverse=True)
+        indices = indices.reshape(-1)
+
+        # Merging can make neighboring polygon vertices identical, e.g. where
+        # four cocircular sites meet; drop the repeats.
+        cell = np.repeat(np.arange(len(cells)), sizes)
+        position = np.arange(len(indices))
+        previous = np.where(position == offsets[cell], offsets[cell + 1] - 1, position - 1)
+        keep = indices != indices[previous]
+        np.cumsum(np.bincount(cell[keep], minlength=len(cells)), out=offsets[1:])
+
+        return points[first], offsets, indices[keep]
+
+    def edge_array(self) -> np.ndarray:
+        # (E, 2) array of site indices, each Delaunay edge once
+        store = self.edges
+        org = np.frombuffer(store.org, dtype=np.int64, count=store.count >> 1)
+        org = org.reshape(-1, 2)
+        return org[org[:, 0] >= 0]
+
+    def adjacency(self) -> Tuple[np.ndarray, np.ndarray]:
+        # Delaunay graph in CSR form: the neighbors of site i are
+        # targets[offsets[i] : offsets[i + 1]].
+        org = self.edge_array()
+        sources = np.concatenate([org[:, 0], org[:, 1]])
+        targets = np.concatenate([org[:, 1], org[:, 0]])
+        order = np.argsort(sources, kind="stable")
+
+        offsets = np.zeros(len(self.points) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(sources, minlength=len(self.points)), out=offsets[1:])
+        return offsets, targets[order]
+
+    def gabriel_array(self) -> np.ndarray:
+        # (E, 2) array of the edges of the Gabriel graph: the Delaunay edges
+        # with no other site inside or on the circle they are a diameter of.
+        # Any such site sees the edge at a right or obtuse angle, and so does
+        # the apex of one of the two triangles on it, which is all that is
+        # tested. With segments inserted the mesh is no longer Delaunay,
+        # and neither this nor the graphs built on it are exact.
+        triangles, sides = self.__faces()
+        p = self.points
+        obtuse = np.zeros(self.edges.count >> 2, dtype=bool)
+        for k in range(3):
+            # The side from corner k to the next one, seen from the last
+            a = p[triangles[:, k]] - p[triangles[:, (k + 2) % 3]]
+            b = p[triangles[:, (k + 1) % 3]] - p[triangles[:, (k + 2) % 3]]
+            obtuse[sides[np.einsum("ij,ij->i", a, b) <= 0, k] >> 2] = True
+
+        org = np.frombuffer(self.edges.org, dtype=np.int64, count=self.edges.count >> 1).reshape(-1, 2)
+        return org[(org[:, 0] >= 0) & ~obtuse]
+
+    def relative_neighborhood_array(self) -> np.ndarray:
+        # (E, 2) array of the edges of the relative neighborhood graph: the
+        # edges uv with no site w closer to both u and v than they are to
+        # each other, w in the lune of uv. They are Gabriel edges. Every
+        # site nearer to u than v is reached from u by a path of Delaunay
+        # edges through such sites, since the mesh always has a neighbor
+        # nearer to u, so each edge searches outwards from u through them
+        # until it meets a site in the lune. The searches of a chunk of
+        # edges run in lockstep; on evenly spread sites each visits a few.
+        edges = self.gabriel_array()
+        offsets, targets = self.adjacency()
+        p = self.points
+        n = len(p)
+        keep = np.ones(len(edges), dtype=bool)
+        for lo in range(0, len(edges), NEIGHBORHOOD_CHUNK):
+            u, v = edges[lo : lo + NEIGHBORHOOD_CHUNK].T
+            length = ((p[u] - p[v]) ** 2).sum(axis=1)
+            # Pairs of edge and site reached so far, as sorted keys
+            seen = np.sort(np.arange(len(u)) * n + u)
+            row, site = np.arange(len(u)), u
+            while len(row):
+                count = offsets[site + 1] - offsets[site]
+                first = np.repeat(offsets[site] - (np.cumsum(count) - count), count)
+                row = np.repeat(row, count)
+                site = targets[first + np.arange(len(row))]
+                near = (((p[site] - p[u[row]]) ** 2).sum(axis=1) < length[row]) & keep[lo + row]
+                key, index = np.unique(row[near] * n + site[near], return_index=True)
+                position = np.minimum(np.searchsorted(seen, key), len(seen) - 1)
+                new = seen[position] != key
+                row, site = row[near][index[new]], site[near][index[new]]
+                seen = np.sort(np.concatenate([seen, key[new]]))
+
+                lune = ((p[site] - p[v[row]]) ** 2).sum(axis=1) < length[row]
+                keep[lo + row[lune]] = False
+                row, site = row[~lune], site[~lune]
+        return edges[keep]
+
+    def spanning_tree_array(self) -> np.ndarray:
+        # (E, 2) array of the edges of the Euclidean minimum spanning tree,
+        # shortest first, by Kruskal's algorithm over the Gabriel
+        # edges, which contain it. The union-find is a flat list of parents
+        # with path halving and union by size, in plain Python, which is
+        # faster on lists.
+        edges = self.gabriel_array()
+        gap = self.points[edges[:, 0]] - self.points[edges[:, 1]]
+        edges = edges[np.argsort((gap**2).sum(axis=1), kind="stable")]
+
+        parent = list(range(len(self.points)))
+        size = [1] * len(self.points)
+        tree = []
+        needed = len(self.points) - 1
+        for k, (u, v) in enumerate(zip(edges[:, 0].tolist(), edges[:, 1].tolist())):
+            while parent[u] != u:
+                parent[u] = u = parent[parent[u]]
+            while parent[v] != v:
+                parent[v] = v = parent[parent[v]]
+            if u == v:
+                continue
+            if size[u] < size[v]:
+                u, v = v, u
+            parent[v] = u
+            size[u] += size[v]
+            tree.append(k)
+            if len(tree) == needed:
+                break
+        return edges[np.array(tree, dtype=np.int64)].reshape(-1, 2)
+
+    def circumcenters(self, triangles: np.ndarray) -> np.ndarray:
+        # Computed relative to the first corner, which keeps the lifted terms
+        # small when the coordinates are large compared to the triangles
+        a = self.points[triangles[:, 0]]
+        b = self.points[triangles[:, 1]] - a
+        c = self.points[triangles[:, 2]] - a
+        bx, by = b[:, 0], b[:, 1]
+        cx, cy = c[:, 0], c[:, 1]
+
+        d = 2 * (bx * cy - by * cx)
+        blift = bx * bx + by * by
+        clift = cx * cx + cy * cy
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            ux = (cy * blift - by * clift) / d
+            uy = (bx * clift - cx * blift) / d
+
+        return np.column_stack([ux, uy]) + a
 
     def circumcenter(self, a: Site, b: Site, c: Site) -> Site:
-        ax, ay = a.x, a.y
-        bx, by = b.x, b.y
-        cx, cy = c.x, c.y
+        # Relative to a, as circumcenters() does. Collinear corners have
+        # their center at infinity, which is what this returns for them.
+        bx, by = b.x - a.x, b.y - a.y
+        cx, cy = c.x - a.x, c.y - a.y
+        if orient2d(a.x, a.y, b.x, b.y, c.x, c.y) == 0:
+            return Site(math.inf, math.inf)
+
+        d = 2 * (bx * cy - by * cx)
+        blift = bx * bx + by * by
+        clift = cx * cx + cy * cy
+        return Site(a.x + (cy * blift - by * clift) / d, a.y + (bx * clift - cx * blift) / d)
+
+    def __triangulate(
+        self,
+        lo: int,
+        hi: int,
+        done: Dict[Tuple[int, int], Tuple[int, int]] = None,
+        extremes: Dict[Tuple[int, int], Tuple[int, int, int, int]] = None,
+    ) -> Tuple[int, int]:
+        # Divide and conquer over the index range [lo, hi) of the sorted sites,
+        # driven by an explicit stack instead of recursion. Each entry is a
+        # range to split or, once both halves are done, a pending merge.
+        # Results of finished ranges are pushed in left-to-right order.
+        # Ranges found in done have already been triangulated elsewhere.
+        # With extremes, halves may have been cut along the other axis, and
+        # the sites of each half to merge at are looked up there.
+        store = self.edges
+        results: List[Tuple[int, int]] = []
+        stack = [(lo, hi, False, 0)]
+
+        while stack:
+            lo, hi, merge, depth = stack.pop()
+            if merge:
+                (rdi, rdo) = results.pop()
+                (ldo, ldi) = results.pop()
+                if extremes is not None:
+                    ll, lr, rl, rr = extremes[(lo, hi)]
+                    ldo, ldi = self.__hull_at(ldo, ll), store.oprev(self.__hull_at(ldo, lr))
+                    rdi, rdo = self.__hull_at(rdi, rl), store.oprev(self.__hull_at(rdi, rr))
+                if self.stats is not None:
+                    self.stats.level = depth
+                results.append(self.__merge(ldo, ldi, rdi, rdo))
+            elif done and (lo, hi) in done:
+                results.append(done[(lo, hi)])
+            elif hi - lo <= 3:
+                results.append(self.__base_case(lo, hi))
+            else:
+                mid = lo + (hi - lo) // 2
+                stack.append((lo, hi, True, depth))
+                stack.append((mid, hi, False, depth + 1))
+                stack.append((lo, mid, False, depth + 1))
+
+        return results[0]
+
+    def __hull_at(self, e: int, v: int) -> int:
+        # Walks the hull from e, a hull edge with the outer face on its right,
+        # to the one leaving site v
+        store = self.edges
+        org = store.org
+        while org[e >> 1] != v:
+            e = store.onext[e ^ 2]
+        return e
+
+    def __triangulate_alternating(self) -> Tuple[int, int]:
+        # Divide and conquer over the partition of _alternating_cuts. The
+        # sites are triangulated under their partition order, which
+        # __triangulate needs, and the edges renamed to site indices after.
+        points = self.points
+        order, extremes = _alternating_cuts(points)
+        self.xs = memoryview(np.ascontiguousarray(points[order, 0]))
+        self.ys = memoryview(np.ascontiguousarray(points[order, 1]))
+        store = self.edges
+        try:
+            left, right = self.__triangulate(0, len(points), extremes=extremes)
+            # The last cut may have been across y; left and right are the
+            # hull edges at the first and last sites by x
+            position = np.argsort(order)
+            left, right = self.__hull_at(left, position[0]), store.oprev(self.__hull_at(left, position[-1]))
+        finally:
+            self.xs = memoryview(points[:, 0])
+            self.ys = memoryview(points[:, 1])
+
+        org = np.frombuffer(store.org, dtype=np.int64, count=store.count >> 1)
+        alive = org >= 0
+        org[alive] = order[org[alive]]
+        return left, right
+
+    def __triangulate_incremental(self, order: np.ndarray) -> Tuple[int, int]:
+        # Inserts the sites one at a time in the given order, each walk
+        # starting from the site inserted before it
+        store = self.edges
+        order = order.tolist()
+        self.incident = array("q", [-1]) * len(self.points)
+        a, b = order[0], order[1]
+        if (self.xs[b], self.ys[b]) < (self.xs[a], self.ys[a]):
+            a, b = b, a
+        e = store.make_edge(a, b)
+        self.incident[a], self.incident[b] = e, e ^ 2
+        self.left, self.right = store.view(e), store.view(e ^ 2)
+
+        previous = b
+        for p in order[2:]:
+            status, f, existing = self.__locate_site(self.xs[p], self.ys[p], self.incident[previous])
+            if existing < 0:
+                self.__insert_located(p, status, f)
+                previous = p
+        return self.left.id, self.right.id
 
-        d = 2 * (ax * (by - cy) + bx * (cy - ay) + cx * (ay - by))
+    def __triangulate_parallel(self, workers: int) -> Tuple[int, int]:
+        # Split the range the same way __triangulate does, down to the depth
+        # that gives every worker a part, and triangulate the parts in worker
+        # processes. Their edges are grafted into this store and the merges
+        # above the cutoff depth run here.
+        n = len(self.points)
+        parts = [(0, n)]
+        for _ in range((workers - 1).bit_length()):
+            split = []
+            for lo, hi in parts:
+                if hi - lo >= 2 * PARALLEL_MIN_SITES:
+                    mid = lo + (hi - lo) // 2
+                    split += [(lo, mid), (mid, hi)]
+                else:
+                    split.append((lo, hi))
+            parts = split
 
-        if abs(d) < 1e-10: 
-            raise ValueError("Cannot compute circumcenter of collinear points")
+        if len(parts) == 1:
+            return self.__triangulate(0, n)
 
-        ux = ((ax * ax + ay * ay) * (by - cy) + (bx * bx + by * by) * (cy - ay) + (cx * cx + cy * cy) * (ay - by)) / d
-        uy = ((ax * ax + ay * ay) * (cx - bx) + (bx * bx + by * by) * (ax - cx) + (cx * cx + cy * cy) * (bx - ax)) / d
+        done = {}
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(Delauney._triangulate_part, self.points[lo:hi]) for lo, hi in parts]
+            for (lo, hi), future in zip(parts, futures):
+                onext, org, free, left, right = future.result()
+                offset = self.edges.graft(onext, org, free, lo)
+                done[(lo, hi)] = (left + offset, right + offset)
 
-        return Site(ux, uy)
+        return self.__triangulate(0, n, done)
+
+    @classmethod
+    def _triangulate_part(cls, points: np.ndarray) -> Tuple[array, array, List[int], int, int]:
+        # Runs in a worker process. Returns the raw edge buffers, free list and
+        # hull edges of the triangulation of the sorted sites in points.
+        d = cls.__new__(cls)
+        d.sites = []
+        d.stats = None
+        d.xs = memoryview(points[:, 0])
+        d.ys = memoryview(points[:, 1])
+        d.edges = EdgeStore(capacity=3 * len(points))
+        left, right = d.__triangulate(0, len(points))
+
+        store = d.edges
+        return store.onext[: store.count], store.org[: store.count >> 1], store.free, left, right
+
+    @classmethod
+    def stream(
+        cls, source, strip_size: int = 1 << 20, chunk_size: int = 1 << 20, tmpdir: str = None
+    ) -> Iterator[np.ndarray]:
+        # Triangulates an (N, 2) point cloud that need not fit in memory: an
+        # array, a memmap or the path of a .npy file, read chunk_size rows at
+        # a time. The cloud is cut by x into strips of about strip_size points
+        # spilled to temporary files. Each strip is triangulated on its own
+        # and merged onto the mesh of the strips left of it with the common
+        # tangent merge. A triangle is final once its circumcircle lies left
+        # of the next strip, since no later point can fall inside it. Final
+        # triangles are yielded as (K, 3) arrays of rows of source in ccw
+        # order, and dropped from memory once their neighbors are final too.
+        # Of exact duplicates only one row is used.
+        if isinstance(source, str):
+            source = np.load(source, mmap_mode="r")
+        with tempfile.TemporaryDirectory(dir=tmpdir) as directory:
+            yield from cls.__stream_strips(cls._spill_strips(source, strip_size, chunk_size, directory))
+
+    @staticmethod
+    def _spill_strips(source, strip_size: int, chunk_size: int, directory: str) -> List[str]:
+        # Writes the points of each strip to a file of STRIP_RECORD in
+        # directory. Returns the files from left to right. Strips are cut at the edges of a histogram of x, so a strip
+        # can hold more than strip_size points when they share a bin.
+        n = len(source)
+        chunks = range(0, n, chunk_size)
+        xmin, xmax = np.inf, -np.inf
+        for lo in chunks:
+            x = np.asarray(source[lo : lo + chunk_size, 0], dtype=np.float64)
+            xmin, xmax = min(xmin, x.min()), max(xmax, x.max())
+        if n == 0:
+            return []
+
+        bins = 64 * (n // strip_size + 1)
+        scale = bins / (xmax - xmin) if xmax > xmin else 0.0
+
+        def bin_of(x):
+            return np.minimum(((x - xmin) * scale).astype(np.int64), bins - 1)
+
+        counts = np.zeros(bins, dtype=np.int64)
+        for lo in chunks:
+            counts += np.bincount(bin_of(np.asarray(source[lo : lo + chunk_size, 0], dtype=np.float64)), minlength=bins)
+        before = np.cumsum(counts) - counts
+        _, strip_of_bin = np.unique(before // strip_size, return_inverse=True)
+        strips = int(strip_of_bin[-1]) + 1
+
+        written = np.zeros(strips, dtype=bool)
+        for lo in chunks:
+            chunk = np.asarray(source[lo : lo + chunk_size], dtype=np.float64)
+            strip = strip_of_bin[bin_of(chunk[:, 0])]
+            order = np.argsort(strip, kind="stable")
+            edges = np.searchsorted(strip[order], np.arange(strips + 1))
+            for k in np.flatnonzero(np.diff(edges)).tolist():
+                take = order[edges[k] : edges[k + 1]]
+                records = np.empty(len(take), dtype=STRIP_RECORD)
+                records["x"], records["y"] = chunk[take, 0], chunk[take, 1]
+                records["row"] = lo + take
+                with open(os.path.join(directory, f"{k}.strip"), "ab") as f:
+                    records.tofile(f)
+                written[k] = True
+
+        return [os.path.join(directory, f"{k}.strip") for k in np.flatnonzero(written).tolist()]
+
+    @staticmethod
+    def _read_strips(paths: List[str]) -> Iterator[Tuple[np.ndarray, float]]:
+        # Yields the sorted, distinct points of each strip file, deleting the
+        # file once read, with the smallest x of the strip after it. A strip
+        # of fewer than two points cannot be merged on its own and is added to
+        # the one before it, or the one after it if it comes first.
+        ready = None
+        carry = np.empty(0, dtype=STRIP_RECORD)
+        for path in paths:
+            records = np.concatenate([carry, np.fromfile(path, dtype=STRIP_RECORD)])
+            os.remove(path)
+            records = records[np.lexsort((records["y"], records["x"]))]
+            keep = np.ones(len(records), dtype=bool)
+            keep[1:] = (records["x"][1:] != records["x"][:-1]) | (records["y"][1:] != records["y"][:-1])
+            records = records[keep]
+
+            if len(records) >= 2:
+                if ready is not None:
+                    yield ready, records["x"][0]
+                ready = records
+                carry = records[:0]
+            elif ready is not None:
+                ready = np.concatenate([ready, records])
+            else:
+                carry = records
+
+        if ready is not None:
+            yield ready, np.inf
+
+    @classmethod
+    def __stream_strips(cls, paths: List[str]) -> Iterator[np.ndarray]:
+        d = cls.__new__(cls)
+        d.order = None
+        d.representative = None
+        d.__build(np.empty((0, 2)), SiteArray(np.empty((0, 2))), 1, False)
+        rows = np.empty(0, dtype=np.int64)
+        state = np.empty(0, dtype=np.int8)
+
+        for records, limit in cls._read_strips(paths):
+            d.__merge_strip(np.column_stack([records["x"], records["y"]]))
+            rows = np.concatenate([rows, records["row"]])
+            if len(state) < d.edges.count:
+                state = np.concatenate([state, np.zeros(d.edges.count, dtype=np.int8)])
+
+            triangles, state = d.__retire(state, limit)
+            if len(triangles):
+                yield rows[triangles]
+
+            if 8 * len(d.edges.free) > d.edges.count:
+                rows, state = d.__compact(rows, state)
+
+    def __merge_strip(self, points: np.ndarray) -> None:
+        # Triangulates sorted points that all lie right of the current sites
+        # and merges the two triangulations. A strip is tall and narrow, which
+        # makes every vertical cut of __triangulate a long merge, so it is
+        # triangulated turned a quarter clockwise: the same graph, cut across.
+        n = len(self.points)
+        order = np.lexsort((-points[:, 0], points[:, 1]))
+        onext, org, free, _, _ = self._triangulate_part(np.column_stack([points[order, 1], -points[order, 0]]))
+        org = np.frombuffer(org, dtype=np.int64)
+        org = np.where(org >= 0, order[org], -1)
+
+        self.__set_points(np.concatenate([self.points, points]))
+        offset = self.edges.graft(onext, org, free, n)
+        rdi = self.__hull_edge(offset + 2 * int(np.argmax(org == 0)), True)
+        rdo = self.__hull_edge(offset + 2 * int(np.argmax(org == len(points) - 1)), False)
+        if self.left is not None:
+            rdi, rdo = self.__merge(self.left.id, self.right.id, rdi, rdo)
+        self.left, self.right = self.edges.view(rdi), self.edges.view(rdo)
+
+        xmin, ymin, xmax, ymax = self.bounds
+        self.bounds = (
+            min(xmin, points[:, 0].min()),
+            min(ymin, points[:, 1].min()),
+            max(xmax, points[:, 0].max()),
+            max(ymax, points[:, 1].max()),
+        )
+
+    def __hull_edge(self, e: int, leftmost: bool) -> int:
+        # e leaves the leftmost or rightmost site v. Returns the ccw hull edge
+        # out of v if it is the leftmost, the cw one otherwise, as the merge
+        # step expects them. All neighbors of v lie within a half-turn, so the
+        # outer face is the only wedge between neighbors that is not convex.
+        store = self.edges
+        org = store.org
+        v = org[e >> 1]
+        while True:
+            f = store.onext[e]
+            if f == e or not self.__ccw(v, org[(e >> 1) ^ 1], org[(f >> 1) ^ 1]):
+                return f if leftmost else e
+            e = f
+
+    def __set_points(self, points: np.ndarray) -> None:
+        self.points = self.__coords = points
+        self.sites = self.edges.sites = SiteArray(points)
+        self.xs = memoryview(points[:, 0])
+        self.ys = memoryview(points[:, 1])
+
+    def __retire(self, state: np.ndarray, limit: float) -> Tuple[np.ndarray, np.ndarray]:
+        # Returns the triangles whose circumcircle lies left of x = limit that
+        # were not returned before. state holds, per quarter-edge, whether the
+        # face on its left was returned (YIELDED) or has been deleted (HOLE).
+        # Final triangles whose neighbors are all final or deleted are no
+        # longer needed by any merge: a merge deletes only triangles it
+        # reaches from the hull or through other deleted triangles, and stops
+        # at the first final one. Edges between two such faces are deleted.
+        store = self.edges
+        triangles, sides = self.__faces()
+        # A hole can be left bounded by three edges; it is no triangle
+        real = state[sides[:, 0]] != HOLE
+        if limit == np.inf:
+            final = real.copy()
+        else:
+            centers = self.circumcenters(triangles)
+            radius = np.hypot(*(centers - self.points[triangles[:, 0]]).T)
+            final = real & (centers[:, 0] + radius * (1 + 1e-6) < limit)
+
+        new = final & (state[sides[:, 0]] == 0)
+        state[sides[new].ravel()] = YIELDED
+
+        face = self.__face_index(sides)
+        gone = final | ~real
+        neighbors = face[sides ^ 2]
+        closed = final & np.all(np.where(neighbors >= 0, gone[np.maximum(neighbors, 0)], state[sides ^ 2] == HOLE), axis=1)
+        gone = closed | ~real
+
+        quarters = sides[closed].ravel()
+        other = face[quarters ^ 2]
+        deleted = np.where(other >= 0, gone[np.maximum(other, 0)], state[quarters ^ 2] == HOLE)
+        state[quarters[~deleted]] = HOLE
+        for base in np.unique(quarters[deleted] & ~3).tolist():
+            store.delete(base)
+            state[base : base + 4] = 0
+
+        return triangles[new], state
+
+    def __compact(self, rows: np.ndarray, state: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        # Renumbers the live edges and the sites they use contiguously,
+        # dropping deleted edges and sites left without edges. Returns rows
+        # and state renumbered the same way.
+        store = self.edges
+        onext = np.frombuffer(store.onext, dtype=np.int64, count=store.count)
+        org = np.frombuffer(store.org, dtype=np.int64, count=store.count >> 1)
+
+        alive = np.flatnonzero(org[::2] >= 0)
+        quad = np.full(len(org) >> 1, -1, dtype=np.int64)
+        quad[alive] = np.arange(len(alive))
+        quarters = (4 * alive[:, None] + np.arange(4)).ravel()
+        onext = 4 * quad[onext[quarters] >> 2] + (onext[quarters] & 3)
+        org = org[(2 * alive[:, None] + np.arange(2)).ravel()]
+
+        used = np.zeros(len(self.points), dtype=bool)
+        used[org] = True
+        site = np.cumsum(used) - 1
+
+        left, right = self.left.id, self.right.id
+        self.__set_points(self.points[used])
+        store.onext = array("q", onext.tobytes())
+        store.org = array("q", site[org].tobytes())
+        store.count = len(onext)
+        store.free = []
+        self.left = store.view(4 * int(quad[left >> 2]) + (left & 3))
+        self.right = store.view(4 * int(quad[right >> 2]) + (right & 3))
+        self.__recent = 0
+        return rows[used], state[quarters]
+
+    def __base_case(self, lo: int, hi: int) -> Tuple[int, int]:
+        store = self.edges
 
-    def __triangulate(self, sites: List[Site]) -> Tuple[QuadEdge, QuadEdge]:
         # Base case: Only 2 sites, create a single edge
-        if len(sites) == 2:
-            a = self.make_edge(sites[0], sites[1])
-            return (a, a.sym)
+        if hi - lo == 2:
+            a = store.make_edge(lo, lo + 1)
+            return (a, a ^ 2)
         
         # Base case: 3 sites, create a triangle
-        elif len(sites) == 3:
-            a = self.make_edge(sites[0], sites[1])
-            b = self.make_edge(sites[1], sites[2])
-
-            self.splice(a.sym, b)
-
-            if self.ccw(sites[0], sites[1], sites[2]):
-                c = self.connect(b, a)
-                return (a, b.sym)
-            elif self.ccw(sites[0], sites[2], sites[1]):
-                c = self.connect(b, a)
-                return (c.sym, c)
+        else:
+            a = store.make_edge(lo, lo + 1)
+            b = store.make_edge(lo + 1, lo + 2)
+
+            store.splice(a ^ 2, b)
+
+            if self.__ccw(lo, lo + 1, lo + 2):
+                c = store.connect(b, a)
+                return (a, b ^ 2)
+            elif self.__ccw(lo, lo + 2, lo + 1):
+                c = store.connect(b, a)
+                return (c ^ 2, c)
             else:
-                return (a, b.sym)
-        
-        # Recursive case: More than 3 sites
-        n = len(sites)
-        (ldo, ldi) = self.__triangulate(sites[: n // 2])
-        (rdi, rdo) = self.__triangulate(sites[n // 2 :])
+                return (a, b ^ 2)
+
+    def __merge(self, ldo: int, ldi: int, rdi: int, rdo: int) -> Tuple[int, int]:
+        store = self.edges
+        onext = store.onext
+        org = store.org
+
+        # Edges are integer ids into the edge store. For a primal edge e,
+        # org[e >> 1] is its origin and org[(e >> 1) ^ 1] its destination.
 
         # Merge step: Find the lower common tangent
         # -----------------------------------------
         while True:
-            if self.left_of(rdi.origin, ldi):
-                ldi = ldi.lnext
-            elif self.right_of(ldi.origin, rdi):
-                rdi = rdi.rprev
+            if self.__ccw(org[rdi >> 1], org[ldi >> 1], org[(ldi >> 1) ^ 1]):
+                ldi = store.lnext(ldi)
+            elif self.__ccw(org[ldi >> 1], org[(rdi >> 1) ^ 1], org[rdi >> 1]):
+                rdi = store.rprev(rdi)
             else:
                 break
         
         # Connect the left and right triangulations
-        base1 = self.connect(rdi.sym, ldi)
+        base1 = store.connect(rdi ^ 2, ldi)
 
         # Adjust edges if necessary
-        if ldi.origin == ldo.origin:
-            ldo = base1.sym
-        if rdi.origin == rdo.origin:
+        if org[ldi >> 1] == org[ldo >> 1]:
+            ldo = base1 ^ 2
+        if org[rdi >> 1] == org[rdo >> 1]:
             rdo = base1
 
         def valid(e):
-            return self.right_of(e.dest, base1)
+            return self.__ccw(org[(e >> 1) ^ 1], org[(base1 >> 1) ^ 1], org[base1 >> 1])
 
         # Stitch together left and right triangulations until the upper common tangent is found
         while True:
-            lcand = base1.sym.onext
+            lcand = onext[base1 ^ 2]
             # If left candidate does not follow the delauney condition, delete it and try with the next one
             if valid(lcand):
-                while self.in_circle(base1.dest, base1.origin, lcand.dest, lcand.onext.dest):
-                    t = lcand.onext
-                    self.delete(lcand)
+                while self.__in_circle(
+                    org[(base1 >> 1) ^ 1], org[base1 >> 1], org[(lcand >> 1) ^ 1], org[(onext[lcand] >> 1) ^ 1]
+                ):
+                    t = onext[lcand]
+                    store.delete(lcand)
                     lcand = t
 
-            rcand = base1.oprev
+            rcand = store.oprev(base1)
             # If right candidate does not follow the delauney condition, delete it and try with the next one
             if valid(rcand):
-                while self.in_circle(base1.dest, base1.origin, rcand.dest, rcand.oprev.dest):
-                    t = rcand.oprev
-                    self.delete(rcand)
+                while self.__in_circle(
+                    org[(base1 >> 1) ^ 1], org[base1 >> 1], org[(rcand >> 1) ^ 1], org[(store.oprev(rcand) >> 1) ^ 1]
+                ):
+                    t = store.oprev(rcand)
+                    store.delete(rcand)
                     rcand = t
 
             # If both candidates are invalid, we have found the upper common tangent
@@ -146,33 +1091,29 @@ class Delauney:
             # If right candidate is valid and follows the delauney condition, connect it to the base
             if not valid(lcand) or (
                 valid(rcand)
-                and self.in_circle(lcand.dest, lcand.origin, rcand.origin, rcand.dest)
+                and self.__in_circle(org[(lcand >> 1) ^ 1], org[lcand >> 1], org[rcand >> 1], org[(rcand >> 1) ^ 1])
             ):
-                base1 = self.connect(rcand, base1.sym)
+                base1 = store.connect(rcand, base1 ^ 2)
             # If left candidate is valid and follows the delauney condition, connect it to the base
             else:
-                base1 = self.connect(base1.sym, lcand.sym)
+                base1 = store.connect(base1 ^ 2, lcand ^ 2)
 
         # Return the left and right most edges
         return (ldo, rdo)
+
+    def __ccw(self, a: int, b: int, c: int):
+        xs, ys = self.xs, self.ys
+        return orient2d(xs[a], ys[a], xs[b], ys[b], xs[c], ys[c]) > 0
+
+    def __in_circle(self, a: int, b: int, c: int, d: int):
+        xs, ys = self.xs, self.ys
+        return incircle(xs[a], ys[a], xs[b], ys[b], xs[c], ys[c], xs[d], ys[d]) > 0
     
     def in_circle(self, a: Site, b: Site, c: Site, d: Site):
-        return (
-            np.linalg.det(
-                [
-                    [a.x, a.y, a.x**2 + a.y**2, 1],
-                    [b.x, b.y, b.x**2 + b.y**2, 1],
-                    [c.x, c.y, c.x**2 + c.y**2, 1],
-                    [d.x, d.y, d.x**2 + d.y**2, 1],
-                ]
-            )
-            > 0
-        )
-
+        return incircle(a.x, a.y, b.x, b.y, c.x, c.y, d.x, d.y) > 0
 
     def ccw(self, a: Site, b: Site, c: Site):
-        return np.linalg.det([[a.x, a.y, 1], [b.x, b.y, 1], [c.x, c.y, 1]]) > 0
-
+        return orient2d(a.x, a.y, b.x, b.y, c.x, c.y) > 0
 
     def right_of(self, site: Site, edge: QuadEdge):
         return self.ccw(site, edge.dest, edge.origin)
@@ -181,70 +1122,1389 @@ class Delauney:
     def left_of(self, site: Site, edge: QuadEdge):
         return self.ccw(site, edge.origin, edge.dest)
     
-    def make_edge(self, a: Site, b: Site):
-        e1 = QuadEdge()
-        e2 = QuadEdge()
-        e3 = QuadEdge()
-        e4 = QuadEdge()
+    def make_edge(self, a: int, b: int):
+        return self.edges.view(self.edges.make_edge(a, b))
 
-        e1.origin = a
-        e3.origin = b
+    def splice(self, a: QuadEdge, b: QuadEdge):
+        self.edges.splice(a.id, b.id)
+
+    def connect(self, a: QuadEdge, b: QuadEdge):
+        return self.edges.view(self.edges.connect(a.id, b.id))
+    
+    def delete(self, e: QuadEdge):
+        self.edges.delete(e.id)
 
-        e1.rot = e2
-        e2.rot = e3
-        e3.rot = e4
-        e4.rot = e1
+    def insert(self, site) -> int:
+        # Insert a Site or (x, y) pair into the triangulation and restore the
+        # Delaunay property with edge flips. Returns the index of the new site,
+        # or of the existing one at the same coordinates. Inserted sites are
+        # appended after the existing ones and have no entry in order.
+        if not hasattr(site, "x"):
+            px, py = site
+            site = None
+        else:
+            px, py = site.x, site.y
+        px, py = float(px), float(py)
 
-        e1.onext = e1
-        e2.onext = e4
-        e3.onext = e3
-        e4.onext = e2
+        if self.left is None:
+            p = self.__insert_first(px, py, site)
+        else:
+            status, e, p = self.__locate_site(px, py)
+            if p >= 0:
+                return p
+            p = self.__add_site(px, py, site)
+            self.__insert_located(p, status, e)
+        if VALIDATE:
+            self.validate()
+        return p
 
-        self.edges[e1.id] = e1
-        self.edges[e2.id] = e2
-        self.edges[e3.id] = e3
-        self.edges[e4.id] = e4
+    def __insert_first(self, px: float, py: float, site: Site = None) -> int:
+        # insert() into a mesh without edges, which has at most one site:
+        # the second distinct site is joined to it by the first edge, left
+        # to right as the base case of __triangulate does
+        for i in range(len(self.points)):
+            if self.xs[i] == px and self.ys[i] == py:
+                return i
+        p = self.__add_site(px, py, site)
+        if p:
+            a, b = (0, p) if (self.xs[0], self.ys[0]) < (px, py) else (p, 0)
+            e = self.edges.make_edge(a, b)
+            self.incident[a], self.incident[b] = e, e ^ 2
+            self.left, self.right = self.edges.view(e), self.edges.view(e ^ 2)
+        self.__recent = p
+        return p
 
-        return e1
+    def __locate_site(self, px: float, py: float, e: int = None) -> Tuple[str, int, int]:
+        # locate(), plus the index of the site already at (px, py) or -1
+        store = self.edges
+        org = store.org
 
+        status, e = self.locate(px, py, e)
 
-    def splice(self, a: QuadEdge, b: QuadEdge):
-        alpha = a.onext.rot
-        beta = b.onext.rot
+        if status == "face":
+            ring = (e, store.lnext(e), store.lnext(store.lnext(e)))
+        elif status == "collinear":
+            e = self.__collinear_position(px, py, e)
+            ring = (e,)
+        else:
+            ring = (e,)
+        for q in ring:
+            for i in (org[q >> 1], org[(q >> 1) ^ 1]):
+                if self.xs[i] == px and self.ys[i] == py:
+                    return status, e, i
 
-        t1 = b.onext
-        t2 = a.onext
-        t3 = beta.onext
-        t4 = alpha.onext
+        return status, e, -1
 
-        a.onext = t1
-        b.onext = t2
-        alpha.onext = t3
-        beta.onext = t4
+    def __insert_located(self, p: int, status: str, e: int) -> None:
+        # Connect site p, which has no edges yet, at the position found by
+        # __locate_site and flip until the triangulation is Delaunay again
+        store = self.edges
+        org = store.org
+        px, py = self.xs[p], self.ys[p]
 
-        self.edges[a.id] = a
-        self.edges[b.id] = b
+        if status == "face":
+            ring = (e, store.lnext(e), store.lnext(store.lnext(e)))
+            on_edge = [q for q in ring if self.__orient(px, py, q) == 0]
+            if not on_edge:
+                chain = list(ring)
+                self.__insert_star(p, chain, closed=True)
+            else:
+                q = on_edge[0]
+                f = store.lnext(q)
+                g = store.lnext(f)
+                constrained = q >> 2 in self.constraints
+                if self.__is_triangle(q ^ 2):
+                    # p splits an interior edge: retriangulate the quadrilateral
+                    chain = [f, g, store.lnext(q ^ 2), store.lnext(store.lnext(q ^ 2))]
+                    self.__delete_edge(q)
+                    spokes = self.__insert_star(p, chain, closed=True)
+                else:
+                    # p splits a hull edge
+                    self.__delete_edge(q)
+                    spokes = self.__insert_star(p, [f, g], closed=False)
+                    self.__replace_hull_ref(q, spokes[-1], spokes[0])
+                    chain = [f, g]
+                if constrained:
+                    # Both halves of a split segment are segments; the
+                    # spokes from its ends are the first and the third
+                    self.constraints.update((spokes[0] >> 2, spokes[2] >> 2))
+        elif status == "outside":
+            chain = self.__visible_chain(px, py, e)
+            spokes = self.__insert_star(p, chain, closed=False)
+            self.__update_hull_refs(p, spokes[0] ^ 2, spokes[-1] ^ 2)
+        else:
+            chain = []
+            self.__insert_collinear(p, e)
 
-    def connect(self, a: QuadEdge, b: QuadEdge):
-        e = self.make_edge(a.dest, b.origin)
-        self.splice(e, a.lnext)
-        self.splice(e.sym, b)
+        self.__legalize(p, chain)
+        self.__recent = p
+
+    def remove(self, site) -> int:
+        # Remove a site, given by index or as a Site / (x, y) at its
+        # coordinates, and retriangulate the hole left by its star. The index
+        # stays allocated but no edge refers to it any more. Returns the index.
+        # A site inside a segment, where it was split, is removed from it
+        # and the two pieces are joined again; segments ending at the site
+        # are removed with it. Sites where segments cross cannot be removed.
+        v = self.__find_site(site)
+        if len(self.points) - self.removed <= 2:
+            raise ValueError("cannot remove a site from a triangulation of two sites")
+        through = self.__segments_through(v)
+        if len(through) > 1:
+            raise ValueError(f"cannot remove site {v}, where segments cross")
+        ending = sum(e >> 2 in self.constraints for e in self.__spokes(v)) - 2 * len(through)
+
+        self.__remove(v)
+        self.removed += 1
+        for a, b in through:
+            self.insert_segment(a, b)
+        if ending:
+            # Edges kept by a segment that is gone may be anywhere along it,
+            # so every edge is checked again
+            org = self.edges.org
+            self.__flip([r << 2 for r in range(self.edges.count >> 2) if org[r << 1] >= 0])
+        if VALIDATE:
+            self.validate()
+        return v
+
+    def move(self, site, xy: Tuple[float, float]) -> int:
+        # Move a site, given like in remove(), to xy and keep its index. While
+        # the new position stays inside the kernel of its star the mesh is
+        # repaired with local flips; otherwise the site is removed and
+        # reinserted from its old neighborhood, and segments at it are lost.
+        v = self.__find_site(site)
+        px, py = float(xy[0]), float(xy[1])
+        store = self.edges
+
+        spokes = self.__spokes(v)
+        link = [store.lnext(e) for e in spokes]
+        if all(self.__is_triangle(e) for e in spokes) and all(self.__orient(px, py, e) > 0 for e in link):
+            self.__set_coordinates(v, px, py)
+            self.__flip(spokes + link)
+            if VALIDATE:
+                self.validate()
+            return v
+
+        _, _, existing = self.__locate_site(px, py, link[0])
+        if existing == v:
+            return v
+        if existing >= 0:
+            raise ValueError(f"site {existing} is already at ({px}, {py})")
+        if len(self.points) - self.removed <= 2:
+            raise ValueError("cannot move a site of a triangulation of two sites")
+
+        start = store.org[link[0] >> 1]
+        self.__remove(v)
+        self.__set_coordinates(v, px, py)
+        status, e, _ = self.__locate_site(px, py, self.incident[start])
+        self.__insert_located(v, status, e)
+        if VALIDATE:
+            self.validate()
+        return v
+
+    def insert_segment(self, a, b) -> List[int]:
+        # Make the segment between a and b, each a site index or a Site or
+        # (x, y) pair, an edge that no later flip removes. Ends that are not
+        # sites yet are inserted. Only the triangles the segment crosses are
+        # changed. Returns the sites along it from a to b, as it is split at
+        # every site it passes through. Segments may touch but not cross.
+        self.__changed()
+        u, v = self.__segment_end(a), self.__segment_end(b)
+        path = [u]
+        while u != v:
+            crossed, w = self.__segment_crossings(u, v)
+            self.__force_edge(u, w, crossed)
+            path.append(w)
+            u = w
+        if VALIDATE:
+            self.validate()
+        return path
+
+    def insert_polygon(self, vertices, hole: bool = False) -> List[int]:
+        # Insert the closed boundary through vertices, an (N, 2) array or
+        # list of sites, as segments. With hole, the triangles inside it are
+        # marked in hole_mask(). Returns the boundary sites in order.
+        ends = [self.__segment_end(v) for v in vertices]
+        path = []
+        for a, b in zip(ends, ends[1:] + ends[:1]):
+            path += self.insert_segment(a, b)[:-1]
+
+        if hole and len(path) > 2:
+            # A point in the triangle inside the polygon along its first edge
+            x, y = self.points[path, 0], self.points[path, 1]
+            area = np.dot(x, np.roll(y, -1)) - np.dot(y, np.roll(x, -1))
+            e = next(e for e in self.__spokes(path[0]) if self.edges.org[(e >> 1) ^ 1] == path[1])
+            if area < 0:
+                e ^= 2
+            c = [self.edges.org[e >> 1], self.edges.org[(e >> 1) ^ 1], self.edges.org[(self.edges.lnext(e) >> 1) ^ 1]]
+            self.add_hole(self.points[c, 0].mean(), self.points[c, 1].mean())
+        return path
+
+    def add_hole(self, x: float, y: float) -> None:
+        # Mark the region around (x, y) enclosed by segments as a hole
+        self.__changed()
+        self.holes.append((float(x), float(y)))
+
+    def constraint_array(self) -> np.ndarray:
+        # (K, 2) array of the site indices of the segment edges
+        org = self.edges.org
+        return np.array([(org[r << 1], org[(r << 1) | 1]) for r in sorted(self.constraints)], dtype=np.int64).reshape(-1, 2)
+
+    def hole_mask(self) -> np.ndarray:
+        # Which rows of triangle_array() lie in a hole: flood fill from the
+        # triangle around each hole point without crossing segments
+        triangles, sides = self.__faces()
+        face = self.__face_index(sides)
+        constrained = np.zeros(self.edges.count >> 2, dtype=bool)
+        constrained[list(self.constraints)] = True
+        open_sides = np.where(constrained[sides >> 2], -1, sides ^ 2)
+
+        mask = np.zeros(len(triangles), dtype=bool)
+        frontier = []
+        for x, y in self.holes:
+            status, e = self.locate(x, y)
+            if status == "face" and face[e] >= 0:
+                frontier.append(face[e])
+        frontier = np.unique(np.array(frontier, dtype=np.int64))
+        while len(frontier):
+            mask[frontier] = True
+            nxt = open_sides[frontier].ravel()
+            nxt = face[nxt[nxt >= 0]]
+            frontier = np.unique(nxt[nxt >= 0])
+            frontier = frontier[~mask[frontier]]
+        return mask
+
+    def refine(
+        self, min_angle: float = 20.0, max_area: float = None, max_steiner: int = None, enclose: bool = False
+    ) -> Tuple[int, float, float]:
+        # Ruppert's refinement: adds Steiner points until no triangle has an
+        # angle under min_angle degrees or, with max_area, a larger area.
+        # Segments and hull edges with a site inside their diametral circle
+        # are split at their midpoints first. Then bad triangles, worst first,
+        # get their circumcenter, unless it encroaches on a segment or lies
+        # behind one, which is split instead. Triangles in holes are left
+        # alone, as are edges shorter than REFINE_MIN_EDGE of the bounds.
+        # Bounds above about 20.7 degrees may never be met; max_steiner caps
+        # the points added. Returns how many were added, the seconds taken
+        # and the smallest angle left outside holes, in degrees.
+        #
+        # The domain is kept: hull edges are split like segments, their
+        # midpoints put on or just outside the hull. Splitting the hull has
+        # to keep it convex though, which a slanted hull edge with a site
+        # close to it soon does not allow, and the triangles there stay bad;
+        # the smallest angle returned tells. With enclose, the sites are
+        # first enclosed in their bounding rectangle, as segments whose
+        # midpoints are exact; its corners count as added points and the
+        # triangles between the hull and the rectangle are refined too.
+        start = time.perf_counter()
+        store = self.edges
+        org = store.org
+        triangles, sides = self.__faces()
+        if not len(triangles):
+            return 0, time.perf_counter() - start, math.inf
+
+        steiner = 0
+        if enclose:
+            count = len(self.points)
+            xmin, ymin, xmax, ymax = self.bounds
+            self.insert_polygon([(xmin, ymin), (xmax, ymin), (xmax, ymax), (xmin, ymax)])
+            steiner = len(self.points) - count
+            triangles, sides = self.__faces()
+
+        # Squared circumradius to shortest edge ratio a triangle may have
+        bound = 1 / (4 * math.sin(math.radians(min_angle)) ** 2)
+        max_area = math.inf if max_area is None else max_area
+        xmin, ymin, xmax, ymax = self.bounds
+        shortest = (REFINE_MIN_EDGE * math.hypot(xmax - xmin, ymax - ymin)) ** 2
+
+        # The coordinate views are replaced as sites are added, so every
+        # helper takes them afresh
+        def badness(e):
+            # How far the triangle left of e exceeds the bounds, 0 if it is good
+            xs, ys = self.xs, self.ys
+            f = store.lnext(e)
+            g = store.lnext(f)
+            if store.lnext(g) != e:
+                return 0.0
+            a, b, c = org[e >> 1], org[f >> 1], org[g >> 1]
+            ax, ay, bx, by, cx, cy = xs[a], ys[a], xs[b], ys[b], xs[c], ys[c]
+            area = orient2d(ax, ay, bx, by, cx, cy)
+            if area <= 0:
+                return 0.0
+            lengths = ((bx - ax) ** 2 + (by - ay) ** 2, (cx - bx) ** 2 + (cy - by) ** 2, (ax - cx) ** 2 + (ay - cy) ** 2)
+            if min(lengths) < shortest:
+                return 0.0
+            worst = max(lengths[0] * lengths[1] * lengths[2] / (4 * area * area * min(lengths)) / bound, area / 2 / max_area)
+            return worst if worst > 1 else 0.0
+
+        def is_segment(e):
+            return e >> 2 in self.constraints or not (self.__is_triangle(e) and self.__is_triangle(e ^ 2))
+
+        def encroached(e, px, py):
+            # Whether (px, py) lies strictly inside the diametral circle of e
+            a, b = org[e >> 1], org[(e >> 1) ^ 1]
+            xs, ys = self.xs, self.ys
+            return (xs[a] - px) * (xs[b] - px) + (ys[a] - py) * (ys[b] - py) < 0
+
+        def apex(e):
+            return org[(store.lnext(e) >> 1) ^ 1]
+
+        def triangle(e):
+            return (org[e >> 1], org[store.lnext(e) >> 1], apex(e))
+
+        heap = []
+        segments = []
+        holes = None
+
+        def push(e):
+            priority = badness(e)
+            if priority:
+                heapq.heappush(heap, (-priority, e, triangle(e)))
+
+        def push_segment(e):
+            segments.append((e, org[e >> 1], org[(e >> 1) ^ 1]))
+
+        def split(e, a, b):
+            # Splits segment e if it is still there from a to b and long enough
+            nonlocal steiner, holes
+            xs, ys = self.xs, self.ys
+            if org[e >> 1] != a or org[(e >> 1) ^ 1] != b:
+                return False
+            if (xs[a] - xs[b]) ** 2 + (ys[a] - ys[b]) ** 2 < 4 * shortest:
+                return False
+            p = self.__split_segment(e)
+            if p < 0:
+                return False
+            steiner += 1
+            holes = None
+            push_around(p)
+            return True
+
+        def push_around(v):
+            for e in self.__spokes(v):
+                push(e)
+                for f in (e, store.lnext(e)):
+                    if is_segment(f):
+                        push_segment(f)
+
+        # Seeding: every segment and hull edge, and the bad triangles
+        for r in range(store.count >> 2):
+            if org[r << 1] >= 0 and is_segment(r << 2):
+                push_segment(r << 2)
+        for e in sides[:, 0].tolist():
+            push(e)
+
+        while (segments or heap) and (max_steiner is None or steiner < max_steiner):
+            if segments:
+                e, a, b = segments.pop()
+                if org[e >> 1] == a and any(
+                    self.__is_triangle(f) and encroached(e, self.xs[apex(f)], self.ys[apex(f)]) for f in (e, e ^ 2)
+                ):
+                    split(e, a, b)
+                continue
+
+            _, e, corners = heapq.heappop(heap)
+            if not self.__is_triangle(e) or triangle(e) != corners or not badness(e):
+                continue
+            if self.holes:
+                if holes is None:
+                    holes = self.__hole_triangles()
+                if tuple(sorted(corners)) in holes:
+                    continue
+
+            center = self.circumcenter(*(Site(self.xs[v], self.ys[v]) for v in corners))
+            px, py = center.x, center.y
+            f = self.__walk_to(px, py, e)
+            if f < 0:
+                continue
+            if is_segment(f) and self.__orient(px, py, f) < 0:
+                blocking = [f]
+            else:
+                blocking = [g for g in self.__cavity_boundary(px, py, f) if is_segment(g) and encroached(g, px, py)]
+            if blocking:
+                # The segments are split instead, and the triangle tried
+                # again if any of them was
+                ends = [(g, org[g >> 1], org[(g >> 1) ^ 1]) for g in blocking]
+                if any([split(*end) for end in ends]) and self.__is_triangle(e) and triangle(e) == corners:
+                    heapq.heappush(heap, (-badness(e), e, corners))
+                continue
+
+            status, f, existing = self.__locate_site(px, py, f)
+            if existing >= 0:
+                continue
+            p = self.__add_site(px, py)
+            self.__insert_located(p, status, f)
+            steiner += 1
+            push_around(p)
+
+        if VALIDATE:
+            self.validate()
+        return steiner, time.perf_counter() - start, self.__smallest_angle()
+
+    def __smallest_angle(self) -> float:
+        # Smallest angle in degrees of the triangles outside holes
+        triangles = self.__faces()[0]
+        if self.holes:
+            triangles = triangles[~self.hole_mask()]
+        if not len(triangles):
+            return math.inf
+        p = self.points[triangles]
+        angles = []
+        for k in range(3):
+            u, v = p[:, (k + 1) % 3] - p[:, k], p[:, (k + 2) % 3] - p[:, k]
+            cross = u[:, 0] * v[:, 1] - u[:, 1] * v[:, 0]
+            angles.append(np.arctan2(np.abs(cross), (u * v).sum(axis=1)))
+        return math.degrees(np.min(angles))
+
+    def __split_segment(self, e: int) -> int:
+        # Inserts the midpoint of edge e and keeps both halves as segments
+        # if e was one. Midpoints are rounded off the line more often than
+        # not. On the hull they are moved outwards to the nearest float on
+        # or outside it, so the sliver left beside e can be flipped away, but
+        # only as long as no other hull edge sees them, which would leave
+        # slivers on the hull; failing that e is not split. Returns the new
+        # site, or -1 when there is no room for one.
+        store = self.edges
+        org = store.org
+        a, b = org[e >> 1], org[(e >> 1) ^ 1]
+        (ax, ay), (bx, by) = self.__coords[[a, b]].tolist()
+        px, py = (ax + bx) / 2, (ay + by) / 2
+
+        if not (self.__is_triangle(e) and self.__is_triangle(e ^ 2)):
+            outer = e ^ 2 if self.__is_triangle(e) else e
+            u, w = org[outer >> 1], org[(outer >> 1) ^ 1]
+            nx, ny = -(self.ys[w] - self.ys[u]), self.xs[w] - self.xs[u]
+            for _ in range(4):
+                if self.__orient(px, py, outer) >= 0:
+                    break
+                px = math.nextafter(px, math.copysign(math.inf, nx)) if nx else px
+                py = math.nextafter(py, math.copysign(math.inf, ny)) if ny else py
+            else:
+                return -1
+            if self.__orient(px, py, store.onext[outer] ^ 2) > 0 or self.__orient(px, py, store.lnext(outer)) > 0:
+                return -1
+
+        status, f, existing = self.__locate_site(px, py, e)
+        if existing >= 0:
+            return -1
+        p = self.__add_site(px, py)
+        self.__insert_located(p, status, f)
+
+        # Off the line, p went in beside e instead of splitting it
+        ab = next((g for g in self.__spokes(a) if org[(g >> 1) ^ 1] == b), None)
+        if ab is not None:
+            if ab >> 2 in self.constraints:
+                self.constraints.discard(ab >> 2)
+                self.constraints.update(g >> 2 for g in self.__spokes(p) if org[(g >> 1) ^ 1] in (a, b))
+            self.__flip([ab])
+        return p
+
+    def __walk_to(self, px: float, py: float, e: int) -> int:
+        # Visibility walk from the triangle left of e towards (px, py) that
+        # stops at segments and the hull. Returns the edge of the triangle
+        # it ended in that (px, py) lies beyond, or an edge of the triangle
+        # containing it; -1 if the walk takes too long, as it may cycle in a
+        # triangulation that is only constrained Delaunay.
+        store = self.edges
+        for _ in range(len(self.points) + 3):
+            for f in (e, store.lnext(e), store.lnext(store.lnext(e))):
+                if self.__orient(px, py, f) < 0:
+                    break
+            else:
+                return e
+            if f >> 2 in self.constraints or not self.__is_triangle(f ^ 2):
+                return f
+            e = f ^ 2
+        return -1
+
+    def __cavity_boundary(self, px: float, py: float, e: int) -> List[int]:
+        # Edges around the triangles that inserting (px, py) into the one
+        # left of e would replace: those whose circumcircle contains it,
+        # reached without crossing segments
+        store = self.edges
+        org = store.org
+        boundary = []
+        seen = {min(e, store.lnext(e), store.lnext(store.lnext(e)))}
+        stack = [e]
+        while stack:
+            e = stack.pop()
+            for f in (e, store.lnext(e), store.lnext(store.lnext(e))):
+                g = f ^ 2
+                if f >> 2 in self.constraints or not self.__is_triangle(g):
+                    boundary.append(f)
+                    continue
+                key = min(g, store.lnext(g), store.lnext(store.lnext(g)))
+                if key in seen:
+                    continue
+                a, b, c = org[g >> 1], org[(g >> 1) ^ 1], org[(store.lnext(g) >> 1) ^ 1]
+                if incircle(self.xs[a], self.ys[a], self.xs[b], self.ys[b], self.xs[c], self.ys[c], px, py) > 0:
+                    seen.add(key)
+                    stack.append(g)
+                else:
+                    boundary.append(f)
+        return boundary
+
+    def __hole_triangles(self) -> set:
+        # Sorted corners of the triangles in holes, like hole_mask() but
+        # walking only the holes
+        store = self.edges
+        org = store.org
+        found = set()
+        for x, y in self.holes:
+            status, e = self.locate(x, y)
+            if status != "face":
+                continue
+            stack = [e]
+            while stack:
+                e = stack.pop()
+                f, g = store.lnext(e), store.lnext(store.lnext(e))
+                key = tuple(sorted((org[e >> 1], org[f >> 1], org[g >> 1])))
+                if key in found:
+                    continue
+                found.add(key)
+                for side in (e, f, g):
+                    if side >> 2 not in self.constraints and self.__is_triangle(side ^ 2):
+                        stack.append(side ^ 2)
+        return found
+
+    def validate(self) -> None:
+        # Checks the mesh is a Delaunay triangulation of its sites and raises
+        # ValueError on the first thing wrong: edges must be consistent
+        # around every site, every face but the outer one a ccw triangle, the
+        # outer face a convex hull traversed once (a path there and back
+        # when all sites are collinear), V - E + F = 2, and every interior
+        # edge that is not a segment locally Delaunay. Vectorized except for
+        # the walk around the hull.
+        store = self.edges
+        onext = np.frombuffer(store.onext, dtype=np.int64, count=store.count)
+        org = np.frombuffer(store.org, dtype=np.int64, count=store.count >> 1)
+        incident = np.frombuffer(self.incident, dtype=np.int64, count=len(self.points))
+        edges = np.arange(0, store.count, 2, dtype=np.int64)
+        edges = edges[org[edges >> 1] >= 0]
+        sites = np.flatnonzero(incident >= 0)
+
+        if np.any(org[(edges >> 1) ^ 1] < 0):
+            raise ValueError("edge with one end deleted")
+        nxt = onext[edges]
+        if np.any(nxt & 1) or np.any(org[nxt >> 1] != org[edges >> 1]):
+            raise ValueError("onext leaves the origin of an edge")
+        if np.any(org[incident[sites] >> 1] != sites):
+            raise ValueError("incident edge does not leave its site")
+        if len(np.setdiff1d(org[edges >> 1], sites)):
+            raise ValueError("site with edges has no incident edge")
+        if len(edges) == 0:
+            if len(sites) or len(self.points) - self.removed > 1:
+                raise ValueError("sites are not connected")
+            return
+
+        triangles, sides = self.__faces()
+        bounded = np.zeros(store.count, dtype=bool)
+        bounded[sides.ravel()] = True
+        outer = edges[~bounded[edges]]
+        hull = [outer[0]]
+        e = store.lnext(hull[0])
+        while e != hull[0] and len(hull) <= len(outer):
+            hull.append(e)
+            e = store.lnext(e)
+        if len(hull) != len(outer):
+            raise ValueError("faces other than triangles and one outer face")
+        if len(sites) - len(edges) // 2 + len(triangles) + 1 != 2:
+            raise ValueError("Euler characteristic is not 2")
+        if len(sites) != len(self.points) - self.removed:
+            raise ValueError("sites are not all connected")
+
+        hull = np.array(hull, dtype=np.int64)
+        a, b = org[hull >> 1], org[(hull >> 1) ^ 1]
+        c = np.roll(b, -1)
+        x, y = self.points[:, 0], self.points[:, 1]
+        if np.any(orient2d_array(x[a], y[a], x[b], y[b], x[c], y[c]) > 0):
+            raise ValueError("hull is not convex")
+
+        # Each interior side once, with the corners opposite it on both sides
+        opposite = np.empty(store.count, dtype=np.int64)
+        for k in range(3):
+            opposite[sides[:, k]] = org[sides[:, (k + 2) % 3] >> 1]
+        sides = sides.ravel()
+        sides = sides[(sides < (sides ^ 2)) & bounded[sides ^ 2]]
+        if self.constraints:
+            constrained = np.zeros(store.count >> 2, dtype=bool)
+            constrained[list(self.constraints)] = True
+            sides = sides[~constrained[sides >> 2]]
+        a, b = org[sides >> 1], org[(sides >> 1) ^ 1]
+        c, d = opposite[sides], opposite[sides ^ 2]
+        if np.any(incircle_array(x[a], y[a], x[b], y[b], x[c], y[c], x[d], y[d]) > 0):
+            raise ValueError("edge is not locally Delaunay")
+
+    def __changed(self) -> None:
+        # Drops everything computed from the current triangulation
+        self.__saved.clear()
+        self.__roadmaps.clear()
+
+    def __segment_end(self, site) -> int:
+        if isinstance(site, (int, np.integer)):
+            return self.__find_site(site)
+        return self.insert(site)
+
+    def __segment_crossings(self, u: int, v: int) -> Tuple[List[int], int]:
+        # Walks from site u towards site v through the triangles the segment
+        # crosses, stopping at v or at the first site on the segment before
+        # it. Returns the crossed edges, in order, and where the walk stopped.
+        store = self.edges
+        org = store.org
+        xs, ys = self.xs, self.ys
+
+        def side(w):
+            return orient2d(xs[u], ys[u], xs[v], ys[v], xs[w], ys[w])
+
+        spokes = self.__spokes(u)
+        for e in spokes:
+            w = org[(e >> 1) ^ 1]
+            if w == v or (side(w) == 0 and (xs[w] - xs[u]) * (xs[v] - xs[u]) + (ys[w] - ys[u]) * (ys[v] - ys[u]) > 0):
+                return [], w
+
+        # The triangle at u whose corner holds the segment
+        for e in spokes:
+            if self.__is_triangle(e) and side(org[(e >> 1) ^ 1]) < 0 and side(org[(store.lnext(e) >> 1) ^ 1]) > 0:
+                t = store.lnext(e)
+                break
+        else:
+            raise ValueError(f"no triangle at site {u} towards site {v}")
+
+        crossed = []
+        while True:
+            if t >> 2 in self.constraints:
+                raise ValueError(f"segment from site {u} to site {v} crosses another segment")
+            crossed.append(t)
+            f = store.lnext(t ^ 2)
+            y = org[(f >> 1) ^ 1]
+            if y == v:
+                return crossed, v
+            sy = side(y)
+            if sy == 0:
+                return crossed, y
+            t = f if (sy > 0) != (side(org[f >> 1]) > 0) else store.lnext(f)
+
+    def __force_edge(self, u: int, w: int, crossed: List[int]) -> None:
+        # Sloan's method: swap the edges crossing segment u-w out of its way,
+        # retrying those whose quadrilateral is not convex yet, then restore
+        # the Delaunay property around the new edges except across u-w
+        store = self.edges
+        org = store.org
+        xs, ys = self.xs, self.ys
+
+        def side(p):
+            return orient2d(xs[u], ys[u], xs[w], ys[w], xs[p], ys[p])
+
+        queue = deque(crossed)
+        created = []
+        while queue:
+            e = queue.popleft()
+            a, b = org[e >> 1], org[(e >> 1) ^ 1]
+            c = org[(store.lnext(e) >> 1) ^ 1]
+            d = org[(store.lnext(e ^ 2) >> 1) ^ 1]
+            if not (self.__ccw(d, b, c) and self.__ccw(c, a, d)):
+                queue.append(e)
+                continue
+            self.__swap(e)
+            p, q = org[e >> 1], org[(e >> 1) ^ 1]
+            sp, sq = side(p), side(q)
+            if sp * sq < 0:
+                queue.append(e)
+            elif {p, q} != {u, w}:
+                created.append(e)
+
+        segment = next(e for e in self.__spokes(u) if org[(e >> 1) ^ 1] == w)
+        self.constraints.add(segment >> 2)
+        self.__flip(created)
+
+    def __find_site(self, site) -> int:
+        if isinstance(site, (int, np.integer)):
+            v = int(site)
+            if 0 <= v < len(self.points) and self.incident[v] >= 0:
+                return v
+            raise KeyError(site)
+
+        px, py = (site.x, site.y) if hasattr(site, "x") else site
+        _, _, v = self.__locate_site(float(px), float(py))
+        if v < 0:
+            raise KeyError(site)
+        return v
+
+    def __spokes(self, v: int) -> List[int]:
+        # Edges out of site v in counterclockwise order
+        onext = self.edges.onext
+        first = self.incident[v]
+        spokes = [first]
+        e = onext[first]
+        while e != first:
+            spokes.append(e)
+            e = onext[e]
+        return spokes
+
+    def __segments_through(self, v: int) -> List[Tuple[int, int]]:
+        # The ends of the pairs of segments at site v that continue each
+        # other in a straight line, v lying between the two
+        org = self.edges.org
+        xs, ys = self.xs, self.ys
+        ends = [org[(e >> 1) ^ 1] for e in self.__spokes(v) if e >> 2 in self.constraints]
+        through = []
+        for i, a in enumerate(ends):
+            for b in ends[i + 1 :]:
+                straight = orient2d(xs[a], ys[a], xs[b], ys[b], xs[v], ys[v]) == 0
+                if straight and (xs[a] - xs[v]) * (xs[b] - xs[v]) + (ys[a] - ys[v]) * (ys[b] - ys[v]) < 0:
+                    through.append((a, b))
+        return through
+
+    def __remove(self, v: int) -> None:
+        self.__changed()
+        store = self.edges
+        org = store.org
+        spokes = self.__spokes(v)
+        faces = [self.__is_triangle(e) for e in spokes]
+
+        if all(faces):
+            # Interior site: the link of its star is a closed polygon
+            chain, closed = [store.lnext(e) for e in spokes], True
+        elif any(faces):
+            # Hull site: the link runs from the spoke after the outer face
+            # to the spoke before it
+            k = faces.index(False)
+            spokes = spokes[k + 1 :] + spokes[: k + 1]
+            chain, closed = [store.lnext(e) for e in spokes[:-1]], False
+        else:
+            chain, closed = [], False
+
+        # On a collinear chain the two neighbors of v get joined directly
+        rejoin = []
+        if not chain and len(spokes) == 2:
+            for e in spokes:
+                rest = store.oprev(e ^ 2)
+                rejoin.append((org[(e >> 1) ^ 1], rest if rest != e ^ 2 else None))
+
+        deleted = set()
+        for e in spokes:
+            deleted.update((e, e ^ 2))
+            self.__delete_edge(e)
+        self.incident[v] = -1
+
+        if rejoin:
+            (u, ru), (w, rw) = rejoin
+            f = store.make_edge(u, w)
+            if ru is not None:
+                store.splice(f, ru)
+            if rw is not None:
+                store.splice(f ^ 2, rw)
+            self.incident[u] = f
+            self.incident[w] = f ^ 2
+
+        self.__fill_hole(chain, closed)
+
+        if self.left.id in deleted or self.right.id in deleted:
+            self.__refresh_hull_refs()
+
+    def __fill_hole(self, chain: List[int], closed: bool) -> None:
+        # Clip Delaunay ears off a chain of edges with the hole on their left:
+        # convex corners whose circumcircle holds no other chain vertex. A
+        # closed chain is done at a triangle, an open one once it is convex.
+        # Around segments there may be no such ear; then any convex corner
+        # with no chain vertex in its triangle is clipped, and the new edges
+        # are flipped until the mesh is constrained Delaunay again.
+        store = self.edges
+        org = store.org
+        xs, ys = self.xs, self.ys
+        # The sides of the hole and the edges added across it
+        touched = list(chain)
+        flip = False
+
+        while len(chain) > (3 if closed else 1):
+            vertices = [org[e >> 1] for e in chain]
+            if not closed:
+                vertices.append(org[(chain[-1] >> 1) ^ 1])
+
+            ear = fallback = None
+            for i in range(len(chain) if closed else len(chain) - 1):
+                u, w = org[chain[i] >> 1], org[chain[(i + 1) % len(chain)] >> 1]
+                x = org[(chain[(i + 1) % len(chain)] >> 1) ^ 1]
+                if not self.__ccw(u, w, x):
+                    continue
+                others = [y for y in vertices if y != u and y != w and y != x]
+                if not any(self.__in_circle(u, w, x, y) for y in others):
+                    ear = i
+                    break
+                if fallback is None and not any(_in_triangle(xs, ys, u, w, x, y) for y in others):
+                    fallback = i
+            else:
+                if fallback is None:
+                    break
+                ear, flip = fallback, True
+
+            a = chain[ear]
+            b = chain[(ear + 1) % len(chain)]
+            c = store.connect(b, a)
+            touched.append(c)
+            if ear + 1 < len(chain):
+                chain[ear : ear + 2] = [c ^ 2]
+            else:
+                chain = chain[1:-1] + [c ^ 2]
+
+        if flip:
+            self.__flip(touched)
+
+    def __flip(self, stack: List[int]) -> None:
+        # Lawson flips: swap edges that are not locally Delaunay and recheck
+        # the sides of the quadrilateral they were in
+        store = self.edges
+        org = store.org
+        while stack:
+            e = stack.pop()
+            if not (self.__is_triangle(e) and self.__is_triangle(e ^ 2)) or e >> 2 in self.constraints:
+                continue
+            c = org[(store.lnext(e) >> 1) ^ 1]
+            d = org[(store.oprev(e) >> 1) ^ 1]
+            if self.__in_circle(org[e >> 1], org[(e >> 1) ^ 1], c, d):
+                f = store.lnext(e)
+                g = store.lnext(e ^ 2)
+                stack.extend((f, store.lnext(f), g, store.lnext(g)))
+                self.__swap(e)
+
+    def __set_coordinates(self, v: int, px: float, py: float) -> None:
+        self.__changed()
+        self.__coords[v] = (px, py)
+        if isinstance(self.sites, SiteArray):
+            site = self.sites.cache.get(v)
+        else:
+            site = self.sites[v]
+        if site is not None:
+            site.x, site.y = px, py
+
+        xmin, ymin, xmax, ymax = self.bounds
+        self.bounds = (min(xmin, px), min(ymin, py), max(xmax, px), max(ymax, py))
+
+    def __refresh_hull_refs(self) -> None:
+        # Recompute left/right from the lexicographically extreme live sites
+        alive = np.flatnonzero(np.frombuffer(self.incident, dtype=np.int64) >= 0)
+        order = np.lexsort((self.points[alive, 1], self.points[alive, 0]))
+        leftmost, rightmost = int(alive[order[0]]), int(alive[order[-1]])
+
+        spokes = self.__spokes(leftmost)
+        self.left = self.edges.view(next((e for e in spokes if not self.__is_triangle(e ^ 2)), spokes[0]))
+        spokes = self.__spokes(rightmost)
+        self.right = self.edges.view(next((e for e in spokes if not self.__is_triangle(e)), spokes[0]))
+
+    def locate(self, px: float, py: float, e: int = None) -> Tuple[str, int]:
+        # Visibility walk towards (px, py), by default starting from the best of
+        # a few sampled sites and the most recently inserted one. Returns
+        # ("face", e) when the point is in the closed triangle left of edge e,
+        # ("outside", e) when e is a hull edge the point is strictly outside
+        # of, and ("collinear", e) when the triangulation has no triangles and
+        # the point lies on the line through e.
+        store = self.edges
+        org = store.org
+
+        if e is None:
+            e = self.__start_edge(px, py)
+        if self.__orient(px, py, e) < 0:
+            e ^= 2
+
+        while True:
+            if not self.__is_triangle(e):
+                if self.__orient(px, py, e) > 0:
+                    return ("outside", e)
+                if self.__is_triangle(e ^ 2):
+                    e ^= 2
+                    continue
+                return ("collinear", e)
+
+            f = store.lnext(e)
+            if self.__orient(px, py, f) < 0:
+                e = f ^ 2
+                continue
+            g = store.lnext(f)
+            if self.__orient(px, py, g) < 0:
+                e = g ^ 2
+                continue
+            return ("face", e)
+
+    def nearest(self, x: float, y: float, start: int = None) -> int:
+        # Index of the site closest to (x, y). Steepest descent over the
+        # Delaunay graph always reaches it: a site that is not the nearest
+        # has a Delaunay neighbor closer to the query. The walk starts at
+        # start if given, else at a site picked like locate() does.
+        xs, ys = self.xs, self.ys
+        org = self.edges.org
+        onext = self.edges.onext
+        x, y = float(x), float(y)
+
+        if self.left is None:
+            # No edges: at most one site, -1 if none
+            return len(self.points) - 1
+        if start is None or self.incident[start] < 0:
+            start = org[self.__start_edge(x, y) >> 1]
+        v = start
+        best = (xs[v] - x) ** 2 + (ys[v] - y) ** 2
+        while True:
+            closest = v
+            first = e = self.incident[v]
+            while True:
+                w = org[(e >> 1) ^ 1]
+                distance = (xs[w] - x) ** 2 + (ys[w] - y) ** 2
+                if distance < best:
+                    best, closest = distance, w
+                e = onext[e]
+                if e == first:
+                    break
+            if closest == v:
+                return v
+            v = closest
+
+    def k_nearest(self, x: float, y: float, k: int, start: int = None) -> np.ndarray:
+        # Indices of the k sites closest to (x, y), nearest first. The i-th
+        # nearest site is a Delaunay neighbor of one of the i - 1 before it,
+        # so a best-first expansion from the nearest site finds them all.
+        xs, ys = self.xs, self.ys
+        x, y = float(x), float(y)
+
+        v = self.nearest(x, y, start)
+        if v < 0:
+            return np.zeros(0, dtype=np.int64)
+        heap = [((xs[v] - x) ** 2 + (ys[v] - y) ** 2, v)]
+        seen = {v}
+        result = []
+        while heap and len(result) < k:
+            _, v = heapq.heappop(heap)
+            result.append(v)
+            for w in self.neighbors(v):
+                if w not in seen:
+                    seen.add(w)
+                    heapq.heappush(heap, ((xs[w] - x) ** 2 + (ys[w] - y) ** 2, w))
+
+        return np.array(result, dtype=np.int64)
+
+    def nearest_array(self, queries: np.ndarray) -> np.ndarray:
+        # nearest() for each row of an (M, 2) array. Each walk starts from the
+        # previous answer, so queries in spatially coherent order are cheap.
+        result = np.empty(len(queries), dtype=np.int64)
+        v = None
+        for i, (x, y) in enumerate(np.asarray(queries, dtype=np.float64).tolist()):
+            v = result[i] = self.nearest(x, y, v)
+        return result
+
+    def k_nearest_array(self, queries: np.ndarray, k: int) -> np.ndarray:
+        # k_nearest() for each row of an (M, 2) array as an (M, k) array,
+        # padded with -1 when there are fewer than k sites
+        result = np.full((len(queries), k), -1, dtype=np.int64)
+        v = None
+        for i, (x, y) in enumerate(np.asarray(queries, dtype=np.float64).tolist()):
+            found = self.k_nearest(x, y, k, v)
+            result[i, : len(found)] = found
+            v = int(found[0]) if len(found) else None
+        return result
+
+    def neighbors(self, v: int) -> List[int]:
+        # Delaunay neighbors of site v in counterclockwise order
+        org = self.edges.org
+        return [org[(e >> 1) ^ 1] for e in self.__spokes(v)] if self.incident[v] >= 0 else []
+
+    def __orient(self, px: float, py: float, e: int) -> float:
+        # Positive when (px, py) lies strictly left of the primal edge e
+        org = self.edges.org
+        a, b = org[e >> 1], org[(e >> 1) ^ 1]
+        return orient2d(self.xs[a], self.ys[a], self.xs[b], self.ys[b], px, py)
+
+    def __is_triangle(self, e: int) -> bool:
+        # Whether the face left of e is a bounded triangle
+        store = self.edges
+        org = store.org
+        f = store.lnext(e)
+        g = store.lnext(f)
+        return store.lnext(g) == e and self.__ccw(org[e >> 1], org[f >> 1], org[g >> 1])
+
+    def __start_edge(self, px: float, py: float) -> int:
+        # Jump: pick the closest of ~n^(1/3) random sites and the most recent one
+        n = len(self.points)
+        xs, ys = self.xs, self.ys
+        best = self.__recent if self.incident[self.__recent] >= 0 else self.left.store.origin(self.left.id)
+        best_distance = (xs[best] - px) ** 2 + (ys[best] - py) ** 2
+        for i in self.__random.sample(range(n), min(n, int(n ** (1 / 3)) + 1)):
+            distance = (xs[i] - px) ** 2 + (ys[i] - py) ** 2
+            if distance < best_distance and self.incident[i] >= 0:
+                best, best_distance = i, distance
+        return self.incident[best]
+
+    def __add_site(self, px: float, py: float, site: Site = None) -> int:
+        self.__changed()
+        i = len(self.points)
+        if i == len(self.__coords):
+            coords = np.empty((max(16, 2 * i), 2), dtype=np.float64)
+            coords[:i] = self.points
+            self.__coords = coords
+            self.xs = memoryview(coords[:, 0])
+            self.ys = memoryview(coords[:, 1])
+        self.__coords[i] = (px, py)
+        self.points = self.__coords[: i + 1]
+
+        if isinstance(self.sites, SiteArray):
+            self.sites.points = self.points
+            if site is not None:
+                self.sites.cache[i] = site
+        else:
+            self.sites.append(site if site is not None else Site(px, py))
+
+        xmin, ymin, xmax, ymax = self.bounds if i else (px, py, px, py)
+        self.bounds = (min(xmin, px), min(ymin, py), max(xmax, px), max(ymax, py))
+        if not isinstance(self.incident, array):
+            self.incident = as_array(self.incident)
+        self.incident.append(-1)
+        return i
+
+    def __insert_star(self, p: int, chain: List[int], closed: bool) -> List[int]:
+        # Connects p to every vertex of a chain of edges that all have p on
+        # their left and follow each other in lnext order. A closed chain is
+        # the boundary of the face p lies in. Returns the new edges, each
+        # directed towards p, in chain order.
+        store = self.edges
+        base = store.make_edge(store.org[chain[0] >> 1], p)
+        store.splice(base, chain[0])
+        spokes = [base]
+        for e in chain[:-1] if closed else chain:
+            base = store.connect(e, base ^ 2)
+            spokes.append(base)
+
+        self.incident[p] = base ^ 2
+        return spokes
+
+    def __visible_chain(self, px: float, py: float, e: int) -> List[int]:
+        # The run of hull edges around e that (px, py) is strictly outside of,
+        # in lnext order along the outer face
+        store = self.edges
+        first = e
+        while True:
+            prev = store.onext[first] ^ 2
+            if prev == e or self.__orient(px, py, prev) <= 0:
+                break
+            first = prev
+
+        chain = [first]
+        while chain[-1] != e:
+            chain.append(store.lnext(chain[-1]))
+        while True:
+            nxt = store.lnext(chain[-1])
+            if nxt == first or self.__orient(px, py, nxt) <= 0:
+                break
+            chain.append(nxt)
+        return chain
+
+    def __collinear_position(self, px: float, py: float, e: int) -> int:
+        # All sites are collinear and (px, py) lies on their line. Walks to
+        # the edge whose segment contains the point, or to the end edge of
+        # the chain pointing towards it.
+        store = self.edges
+        org = store.org
+        xs, ys = self.xs, self.ys
+
+        def ahead(e):
+            a, b = org[e >> 1], org[(e >> 1) ^ 1]
+            return (px - xs[b]) * (xs[b] - xs[a]) + (py - ys[b]) * (ys[b] - ys[a]) > 0
+
+        if ahead(e ^ 2):
+            e ^= 2
+        while ahead(e) and store.lnext(e) != e ^ 2:
+            e = store.lnext(e)
         return e
-    
-    def delete(self, e: QuadEdge):
-        self.splice(e, e.oprev)
-        self.splice(e.sym, e.sym.oprev)
 
-        self.edges.pop(e.id)
-        self.edges.pop(e.sym.id)
+    def __insert_collinear(self, p: int, e: int) -> None:
+        # Either split e at p or, when p lies beyond the end of e, extend the
+        # chain from there
+        store = self.edges
+        org = store.org
+        xs, ys = self.xs, self.ys
+        a, b = org[e >> 1], org[(e >> 1) ^ 1]
+
+        if (xs[p] - xs[b]) * (xs[b] - xs[a]) + (ys[p] - ys[b]) * (ys[b] - ys[a]) > 0:
+            f = store.make_edge(b, p)
+            store.splice(f, e ^ 2)
+            self.incident[p] = f ^ 2
+            self.__update_hull_refs(p, f ^ 2, f ^ 2)
+            return
+
+        # Shorten e to end at p and add the edge from p to b in its place
+        rest = store.oprev(e ^ 2)
+        store.splice(e ^ 2, rest)
+        org[(e >> 1) ^ 1] = p
+        f = store.make_edge(p, b)
+        store.splice(f, e ^ 2)
+        if rest != e ^ 2:
+            store.splice(f ^ 2, rest)
+        if e >> 2 in self.constraints:
+            self.constraints.add(f >> 2)
+        self.incident[p] = f
+        self.incident[b] = f ^ 2
+        self.__replace_hull_ref(e, e, f ^ 2)
+
+    def __legalize(self, p: int, stack: List[int]) -> None:
+        # Flip edges opposite p until every triangle around p is Delaunay.
+        # Every edge on the stack has p on its left.
+        store = self.edges
+        org = store.org
+        while stack:
+            e = stack.pop()
+            if not self.__is_triangle(e ^ 2) or e >> 2 in self.constraints:
+                continue
+            a, b = org[e >> 1], org[(e >> 1) ^ 1]
+            t = store.oprev(e)
+            q = org[(t >> 1) ^ 1]
+            if self.__in_circle(a, b, p, q):
+                self.__swap(e)
+                stack.append(t)
+                stack.append(store.lnext(e ^ 2))
+
+    def __swap(self, e: int) -> None:
+        # Turn e counterclockwise inside the quadrilateral formed by the two
+        # triangles it borders
+        store = self.edges
+        org = store.org
+        a = store.oprev(e)
+        b = store.oprev(e ^ 2)
+        self.incident[org[e >> 1]] = a
+        self.incident[org[(e >> 1) ^ 1]] = b
+
+        store.splice(e, a)
+        store.splice(e ^ 2, b)
+        store.splice(e, store.lnext(a))
+        store.splice(e ^ 2, store.lnext(b))
+        org[e >> 1] = org[(a >> 1) ^ 1]
+        org[(e >> 1) ^ 1] = org[(b >> 1) ^ 1]
+
+    def __delete_edge(self, e: int) -> None:
+        # Delete e, keeping incident pointing at live edges
+        store = self.edges
+        org = store.org
+        for q in (e, e ^ 2):
+            i = org[q >> 1]
+            if self.incident[i] == q:
+                other = store.onext[q]
+                self.incident[i] = other if other != q else -1
+        self.constraints.discard(e >> 2)
+        store.delete(e)
+
+    def __replace_hull_ref(self, e: int, forward: int, backward: int) -> None:
+        # Point left/right at the replacement of a deleted hull edge e. forward
+        # starts at the origin of e, backward at its destination.
+        if self.left.id == e:
+            self.left = self.edges.view(forward)
+        elif self.left.id == e ^ 2:
+            self.left = self.edges.view(backward)
+        if self.right.id == e:
+            self.right = self.edges.view(forward)
+        elif self.right.id == e ^ 2:
+            self.right = self.edges.view(backward)
+
+    def __update_hull_refs(self, p: int, ccw: int, cw: int) -> None:
+        # When p is a new leftmost or rightmost site, left/right become its
+        # counterclockwise and clockwise hull edges.
+        xs, ys = self.xs, self.ys
+        i = self.left.store.origin(self.left.id)
+        if (xs[p], ys[p]) < (xs[i], ys[i]):
+            self.left = self.edges.view(ccw)
+        i = self.right.store.origin(self.right.id)
+        if (xs[p], ys[p]) > (xs[i], ys[i]):
+            self.right = self.edges.view(cw)
 
     def find_triangles(self):
-        triangles = set()
-        for e in self.edges.values():
-            if e.origin and e.dest:
-                if e.lnext.lnext.dest == e.origin:
-                    triangles.add(Triangle(e.origin, e.lnext.origin, e.lnext.lnext.origin))
-                if e.rnext.rnext.dest == e.origin:
-                    triangles.add(Triangle(e.origin, e.rnext.origin, e.rnext.rnext.origin))
-
-        return triangles
+        sites = self.sites
+        return {Triangle(sites[a], sites[b], sites[c]) for a, b, c in self.triangle_array().tolist()}
+
+    def triangle_array(self) -> np.ndarray:
+        # (M, 3) array of site indices, each triangle once in ccw order
+        if "triangles" in self.__saved:
+            return self.__saved["triangles"]
+        return self.__faces()[0]
+
+    def triangle_adjacency(self) -> Tuple[np.ndarray, np.ndarray]:
+        # The triangles of triangle_array() and, for each, the three
+        # triangles across the sides opposite its corners, -1 on the hull
+        triangles, sides = self.__faces()
+        face = self.__face_index(sides)
+        return triangles, face[sides[:, [1, 2, 0]] ^ 2]
+
+    def __faces(self) -> Tuple[np.ndarray, np.ndarray]:
+        # Finds every bounded triangular face by following lnext three times
+        # from each primal quarter-edge in one vectorized pass. Returns the
+        # site indices of each triangle and the quarter-edges of its sides.
+        store = self.edges
+        count = store.count
+        onext = np.frombuffer(store.onext, dtype=np.int64, count=count)
+        org = np.frombuffer(store.org, dtype=np.int64, count=count >> 1)
+
+        def lnext(e):
+            t = onext[(e & ~3) | ((e + 3) & 3)]
+            return (t & ~3) | ((t + 1) & 3)
+
+        e = np.arange(0, count, 2, dtype=np.int64)
+        e = e[org[e >> 1] >= 0]
+        f = lnext(e)
+        g = lnext(f)
+
+        # Keep closed 3-cycles, visited from their smallest quarter-edge
+        keep = (lnext(g) == e) & (e < f) & (e < g)
+        e, f, g = e[keep], f[keep], g[keep]
+        triangles = np.column_stack([org[e >> 1], org[f >> 1], org[g >> 1]])
+
+        # The outer face is a 3-cycle too when the hull is a triangle; it is
+        # the only one traversed clockwise.
+        x, y = self.points[:, 0], self.points[:, 1]
+        a, b, c = triangles[:, 0], triangles[:, 1], triangles[:, 2]
+        bounded = orient2d_array(x[a], y[a], x[b], y[b], x[c], y[c]) > 0
+
+        return triangles[bounded], np.column_stack([e, f, g])[bounded]
+
+    def __face_index(self, sides: np.ndarray) -> np.ndarray:
+        # Maps every quarter-edge to the triangle on its left, -1 if none
+        face = np.full(self.edges.count, -1, dtype=np.int64)
+        face[sides.ravel()] = np.repeat(np.arange(len(sides)), 3)
+        return face
+
+
+def sanitize(points: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    # Picks the rows of an (N, 2) array to triangulate: rows with a NaN or
+    # infinite coordinate are dropped and exact duplicates kept once.
+    # Returns the kept rows in lexicographic order, and for every row the
+    # index among them of the one it merged into, -1 for dropped rows.
+    # Merging sites within a tolerance needs a triangulation, so it is done
+    # by the constructors, Delauney(..., tolerance=...).
+    points = np.asarray(points, dtype=np.float64)
+    if points.ndim != 2 or points.shape[1] != 2:
+        raise ValueError("points must be an (N, 2) array")
+
+    rows = np.flatnonzero(np.isfinite(points).all(axis=1))
+    order = rows[np.lexsort((points[rows, 1], points[rows, 0]))]
+    sorted_points = points[order]
+    first = np.ones(len(order), dtype=bool)
+    first[1:] = np.any(sorted_points[1:] != sorted_points[:-1], axis=1)
+    representative = np.full(len(points), -1, dtype=np.int64)
+    representative[order] = np.cumsum(first) - 1
+    return order[first], representative
+
+
+def _close_groups(points: np.ndarray, edges: np.ndarray, tolerance: float) -> Tuple[np.ndarray, np.ndarray]:
+    # Groups points connected by edges no longer than tolerance. Returns the
+    # smallest index of each group in order, and for every point the
+    # position of its group among them.
+    gap = points[edges[:, 0]] - points[edges[:, 1]]
+    close = edges[np.hypot(gap[:, 0], gap[:, 1]) <= tolerance]
+
+    # Every point takes the smallest label among its neighbors until none
+    # changes, jumping along the labels to speed it up
+    label = np.arange(len(points))
+    a, b = close[:, 0], close[:, 1]
+    while len(close):
+        least = np.minimum(label[a], label[b])
+        if (label[a] == least).all() and (label[b] == least).all():
+            break
+        np.minimum.at(label, a, least)
+        np.minimum.at(label, b, least)
+        label = label[label]
+    roots = np.flatnonzero(label == np.arange(len(points)))
+    return roots, np.searchsorted(roots, label)
+
+
+def _in_triangle(xs, ys, u: int, w: int, x: int, y: int) -> bool:
+    # Whether site y lies in the closed ccw triangle of sites u, w and x
+    return all(orient2d(xs[p], ys[p], xs[q], ys[q], xs[y], ys[y]) >= 0 for p, q in ((u, w), (w, x), (x, u)))
+
+
+def _alternating_cuts(points: np.ndarray) -> Tuple[np.ndarray, Dict[Tuple[int, int], Tuple[int, int, int, int]]]:
+    # Partition for __triangulate: ranges of more than three sites are split
+    # in half across the longer side of their bounding box, into ranges that
+    # are contiguous in the returned order of the sites. Across y means
+    # across x with the plane turned a quarter clockwise, so sites are
+    # ordered by (y, -x); the predicates do not change under a rotation and
+    # the merge works unchanged. For every range split, the first and last
+    # sites of both halves in its order are recorded, as positions in the
+    # final order, under (lo, hi).
+    n = len(points)
+    ranks = []
+    for keys in ((points[:, 1], points[:, 0]), (-points[:, 0], points[:, 1])):
+        rank = np.empty(n, dtype=np.int64)
+        rank[np.lexsort(keys)] = np.arange(n)
+        ranks.append(rank)
+
+    order = np.arange(n)
+    starts, ends = np.array([0]), np.array([n])
+    splits = []
+    while True:
+        split = ends - starts > 3
+        if not split.any():
+            break
+        segment = np.repeat(np.arange(len(starts)), ends - starts)
+        x, y = points[order, 0], points[order, 1]
+        across_y = np.maximum.reduceat(y, starts) - np.minimum.reduceat(y, starts) > (
+            np.maximum.reduceat(x, starts) - np.minimum.reduceat(x, starts)
+        )
+        key = np.where(across_y[segment], ranks[1][order], ranks[0][order])
+        order = order[np.lexsort((key, segment))]
+
+        lo, hi = starts[split], ends[split]
+        mid = lo + (hi - lo) // 2
+        splits.append((lo, hi, order[lo], order[mid - 1], order[mid], order[hi - 1]))
+        starts = np.concatenate([starts[~split], lo, mid])
+        ends = np.concatenate([ends[~split], mid, hi])
+        by_start = np.argsort(starts)
+        starts, ends = starts[by_start], ends[by_start]
+
+    position = np.empty(n, dtype=np.int64)
+    position[order] = np.arange(n)
+    extremes = {}
+    for lo, hi, *sites in splits:
+        for key, value in zip(zip(lo.tolist(), hi.tolist()), zip(*(position[v].tolist() for v in sites))):
+            extremes[key] = value
+    return order, extremes
+
+
+def _curve_order(points: np.ndarray, curve: str) -> np.ndarray:
+    # Order of the sites along a Hilbert or Morton (Z-order) curve through
+    # their bounding box, on a grid of 2 ** CURVE_BITS cells per side
+    side = 1 << CURVE_BITS
+    lo = points.min(axis=0)
+    scale = (side - 1) / max(float((points.max(axis=0) - lo).max()), 1e-300)
+    q = np.floor((points - lo) * scale).astype(np.int64)
+    x, y = q[:, 0], q[:, 1]
+
+    key = np.zeros(len(points), dtype=np.int64)
+    if curve == "morton":
+        for bit in range(CURVE_BITS):
+            key |= ((x >> bit) & 1) << (2 * bit) | ((y >> bit) & 1) << (2 * bit + 1)
+        return np.argsort(key, kind="stable")
+
+    s = side >> 1
+    while s > 0:
+        rx = (x & s) > 0
+        ry = (y & s) > 0
+        key += s * s * ((3 * rx) ^ ry)
+        # Turn the quadrant so the curve inside it runs the standard way
+        flip = ~ry & rx
+        x = np.where(flip, side - 1 - x, x)
+        y = np.where(flip, side - 1 - y, y)
+        x, y = np.where(~ry, y, x), np.where(~ry, x, y)
+        s >>= 1
+    return np.argsort(key, kind="stable")
+
+
+def _clip_polygon(polygon: List[Tuple[float, float]], nx: float, ny: float, c: float) -> List[Tuple[float, float]]:
+    # Sutherland-Hodgman step: the part of a convex polygon where nx*x + ny*y <= c
+    clipped = []
+    ax, ay = polygon[-1]
+    da = nx * ax + ny * ay - c
+    for bx, by in polygon:
+        db = nx * bx + ny * by - c
+        if db <= 0:
+            if da > 0 and db < 0:
+                t = da / (da - db)
+                clipped.append((ax + t * (bx - ax), ay + t * (by - ay)))
+            clipped.append((bx, by))
+        elif da < 0:
+            t = da / (da - db)
+            clipped.append((ax + t * (bx - ax), ay + t * (by - ay)))
+        ax, ay, da = bx, by, db
+
+    return clipped
@@ -0,0 +1,223 @@
+from typing import Tuple
+
+import numpy as np
+
+from delauney import Delauney
+from predicates import incircle_array, orient2d_array
+
+# Queries are located and interpolated this many at a time, which bounds the
+# memory of the vectorized passes
+CHUNK_SIZE = 1 << 16
+
+
+class Interpolator:
+    # Interpolates values given at the sites of a triangulation, one per row
+    # of d.points, at batches of (M, 2) query points: linearly over the
+    # triangle containing each query, or by Sibson's natural neighbor
+    # weights. Queries outside the convex hull get a fill value. The mesh is
+    # read once on construction, so later updates to d are not seen.
+    def __init__(self, d: Delauney, values: np.ndarray) -> None:
+        self.points = d.points
+        self.values = np.asarray(values, dtype=np.float64)
+        if self.values.shape != (len(self.points),):
+            raise ValueError(f"expected one value per site, {len(self.points)} in all")
+        self.triangles, self.neighbors = d.triangle_adjacency()
+        self.centers = d.circumcenters(self.triangles)
+        # Where the next walk starts: the triangle of the last query located
+        self.__last = 0
+
+    def locate(self, queries: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        # The triangle containing each query, and whether it is inside the
+        # hull at all; for queries outside it, the triangle whose hull side
+        # the walk stopped at, -1 if there are no triangles. Every query is
+        # found by a visibility walk from the triangle of an earlier one,
+        # query i starting from query i - 2^k for the largest 2^k dividing
+        # i, so in spatially coherent order, such as along the rows of a
+        # grid, the walks are short. The walks of each round run in lockstep.
+        q = np.asarray(queries, dtype=np.float64).reshape(-1, 2)
+        m = len(q)
+        triangle = np.full(m, -1, dtype=np.int64)
+        inside = np.zeros(m, dtype=bool)
+        if not len(self.triangles) or not m:
+            return triangle, inside
+
+        triangle[:1], inside[:1] = self.__walk(q[:1], np.array([self.__last]))
+        stride = 1 << max(m - 1, 1).bit_length() - 1
+        while stride:
+            i = np.arange(stride, m, 2 * stride)
+            triangle[i], inside[i] = self.__walk(q[i], triangle[i - stride])
+            stride >>= 1
+        self.__last = int(triangle[-1])
+        return triangle, inside
+
+    def linear(self, queries: np.ndarray, fill: float = np.nan) -> np.ndarray:
+        # Barycentric interpolation in the triangle containing each query
+        result = np.empty(len(queries))
+        for lo in range(0, len(queries), CHUNK_SIZE):
+            q = np.asarray(queries[lo : lo + CHUNK_SIZE], dtype=np.float64).reshape(-1, 2)
+            triangle, inside = self.locate(q)
+            result[lo : lo + len(q)] = self.__linear(q, triangle, inside, fill)
+        return result
+
+    def natural(self, queries: np.ndarray, fill: float = np.nan) -> np.ndarray:
+        # Sibson interpolation: each site weighs in with the area the query's
+        # Voronoi cell would take from the site's cell if it were inserted.
+        # Those sites are the corners of the triangles whose circumcircles
+        # contain the query, found by a breadth-first search from the one
+        # containing it. Queries on the hull or at a site, where the areas
+        # degenerate, fall back to linear interpolation, which agrees there.
+        result = np.empty(len(queries))
+        for lo in range(0, len(queries), CHUNK_SIZE):
+            q = np.asarray(queries[lo : lo + CHUNK_SIZE], dtype=np.float64).reshape(-1, 2)
+            triangle, inside = self.locate(q)
+            linear = self.__linear(q, triangle, inside, fill)
+            query, cavity = self.__cavities(q, triangle, inside)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                natural = self.__sibson(q, query, cavity)
+            result[lo : lo + len(q)] = np.where(np.isfinite(natural), natural, linear)
+        return result
+
+    def grid(self, xs: np.ndarray, ys: np.ndarray, method: str = "linear", fill: float = np.nan) -> np.ndarray:
+        # Interpolates at every (x, y) for x in xs and y in ys, as a
+        # (len(ys), len(xs)) raster. Rows are queried in order, alternating
+        # direction so that each walk starts next to its target.
+        if method not in ("linear", "natural"):
+            raise ValueError(f"unknown method {method!r}, expected 'linear' or 'natural'")
+        xs = np.asarray(xs, dtype=np.float64)
+        ys = np.asarray(ys, dtype=np.float64)
+        gx = np.tile(np.concatenate([xs, xs[::-1]]), (len(ys) + 1) // 2)[: len(xs) * len(ys)]
+        gy = np.repeat(ys, len(xs))
+        result = getattr(self, method)(np.column_stack([gx, gy]), fill).reshape(len(ys), len(xs))
+        result[1::2] = result[1::2, ::-1]
+        return result
+
+    def __walk(self, q: np.ndarray, start: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        # Moves every query across a side it lies strictly beyond until there
+        # is none, or the side is on the hull. In a Delaunay triangulation
+        # such walks never cycle, whichever side is taken.
+        triangle = start.copy()
+        inside = np.ones(len(q), dtype=bool)
+        active = np.arange(len(q))
+        x, y = self.points[:, 0], self.points[:, 1]
+        while len(active):
+            corners = self.triangles[triangle[active]]
+            qx, qy = q[active, 0], q[active, 1]
+            orient = np.column_stack(
+                [
+                    orient2d_array(x[b], y[b], x[c], y[c], qx, qy)
+                    for b, c in ((corners[:, 1], corners[:, 2]), (corners[:, 2], corners[:, 0]), (corners[:, 0], corners[:, 1]))
+                ]
+            )
+            side = orient.argmin(axis=1)
+            moving = orient[np.arange(len(active)), side] < 0
+            active, side = active[moving], side[moving]
+            across = self.neighbors[triangle[active], side]
+            inside[active[across < 0]] = False
+            active, across = active[across >= 0], across[across >= 0]
+            triangle[active] = across
+        return triangle, inside
+
+    def __linear(self, q: np.ndarray, triangle: np.ndarray, inside: np.ndarray, fill: float) -> np.ndarray:
+        result = np.full(len(q), fill, dtype=np.float64)
+        corners = self.triangles[triangle[inside]]
+        # Corner positions relative to the query; the weight of a corner is
+        # the area of the triangle the query makes with the other two
+        p = self.points[corners] - q[inside, None, :]
+        area = np.column_stack([_cross(p[:, (k + 1) % 3], p[:, (k + 2) % 3]) for k in range(3)])
+        result[inside] = (area * self.values[corners]).sum(axis=1) / area.sum(axis=1)
+        return result
+
+    def __cavities(self, q: np.ndarray, triangle: np.ndarray, inside: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        # Every (query, triangle) pair where the triangle's circumcircle
+        # contains the query, for the queries inside the hull
+        count = len(self.triangles)
+        query = np.flatnonzero(inside)
+        cavity = triangle[inside]
+        # Pairs tested so far, as sorted query * count + triangle keys
+        seen = np.sort(query * count + cavity)
+        frontier = (query, cavity)
+        x, y = self.points[:, 0], self.points[:, 1]
+        while len(frontier[0]):
+            fq = np.repeat(frontier[0], 3)
+            ft = self.neighbors[frontier[1]].ravel()
+            keep = ft >= 0
+            key, first = np.unique(fq[keep] * count + ft[keep], return_index=True)
+            new = ~_contains(seen, key)
+            key = key[new]
+            fq, ft = fq[keep][first[new]], ft[keep][first[new]]
+            seen = np.sort(np.concatenate([seen, key]))
+
+            a, b, c = self.triangles[ft].T
+            contains = incircle_array(x[a], y[a], x[b], y[b], x[c], y[c], q[fq, 0], q[fq, 1]) > 0
+            frontier = (fq[contains], ft[contains])
+            query = np.concatenate([query, frontier[0]])
+            cavity = np.concatenate([cavity, frontier[1]])
+        return query, cavity
+
+    def __sibson(self, q: np.ndarray, query: np.ndarray, cavity: np.ndarray) -> np.ndarray:
+        # The area the query's new cell takes from the cell of a site v is
+        # bounded by the old Voronoi vertices around v, the circumcenters of
+        # the cavity triangles at v, closed off at the two new vertices g on
+        # the bisector of v and the query. Measured as a fan from the
+        # midpoint of v and the query, also on that bisector, and split at
+        # the midpoints of v's edges, it is a sum of terms from single
+        # triangles plus terms at the cavity boundary. Everything is
+        # relative to the query, which keeps the numbers small.
+        count = len(self.triangles)
+        corners = self.triangles[cavity]
+        p = self.points[corners] - q[query, None, :]
+        center = self.centers[cavity] - q[query]
+        in_cavity = np.sort(query * count + cavity)
+
+        values = self.values[corners]
+        numerator = np.zeros(len(cavity))
+        denominator = np.zeros(len(cavity))
+        for k in range(3):
+            # Corner v with the next corner u and the previous one w
+            v, u, w = p[:, k], p[:, (k + 1) % 3], p[:, (k + 2) % 3]
+            middle = v / 2
+            area = _area(middle, (v + u) / 2, center) + _area(middle, center, (v + w) / 2)
+            numerator += area * values[:, k]
+            denominator += area
+
+            # The side from v to u on the cavity boundary adds the pieces
+            # out to the new vertex on it, for both of its ends
+            across = self.neighbors[cavity, (k + 2) % 3]
+            boundary = np.flatnonzero((across < 0) | ~_contains(in_cavity, query * count + across))
+            v, u = v[boundary], u[boundary]
+            g = _circumcenter_at_origin(v, u)
+            side = (v + u) / 2
+            own, other = _area(v / 2, g, side), _area(u / 2, side, g)
+            numerator[boundary] += own * values[boundary, k] + other * values[boundary, (k + 1) % 3]
+            denominator[boundary] += own + other
+
+        numerator = np.bincount(query, weights=numerator, minlength=len(q))
+        denominator = np.bincount(query, weights=denominator, minlength=len(q))
+        result = numerator / denominator
+        result[denominator <= 0] = np.nan
+        return result
+
+
+def _contains(sorted_keys: np.ndarray, keys: np.ndarray) -> np.ndarray:
+    # Which keys are in a sorted array of them
+    if not len(sorted_keys):
+        return np.zeros(len(keys), dtype=bool)
+    position = np.minimum(np.searchsorted(sorted_keys, keys), len(sorted_keys) - 1)
+    return sorted_keys[position] == keys
+
+
+def _cross(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    return a[:, 0] * b[:, 1] - a[:, 1] * b[:, 0]
+
+
+def _area(a: np.ndarray, b: np.ndarray, c: np.ndarray) -> np.ndarray:
+    # Twice the signed area of each triangle abc
+    return _cross(b - a, c - a)
+
+
+def _circumcenter_at_origin(b: np.ndarray, c: np.ndarray) -> np.ndarray:
+    # Circumcenters of the triangles with corners at the origin, b and c
+    d = 2 * _cross(b, c)
+    blift = (b * b).sum(axis=1)
+    clift = (c * c).sum(axis=1)
+    return np.column_stack([c[:, 1] * blift - b[:, 1] * clift, b[:, 0] * clift - c[:, 0] * blift]) / d[:, None]
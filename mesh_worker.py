@@ -0,0 +1,143 @@
+import threading
+import traceback
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from delauney import Delauney
+from quad_edge import Site
+from render import LINES, POINTS, SITE_COLOR, mesh_layers
+from viewport import GridIndex, decimate
+
+
+def layer_vertices(xy: np.ndarray, color) -> np.ndarray:
+    # Interleaved (x, y, r, g, b) float32 vertices for an (N, 2) array of
+    # positions, all of one color
+    vertices = np.empty((len(xy), 5), dtype=np.float32)
+    vertices[:, :2] = xy
+    vertices[:, 2:] = color
+    return vertices
+
+
+class MeshWorker:
+    # Keeps the triangulation of the submitted sites up to date on a
+    # background thread, so whoever submits them never waits for it. Sites
+    # submitted while a job runs are all handled by the one job after it.
+    # Each finished job publishes a new (version, layers) tuple in one
+    # assignment, so readers see either the previous mesh or the next one.
+    #
+    # Once a view is set, only the primitives inside it are published,
+    # decimated to about one per pixel. Views set during a job are also
+    # folded into the next one, only the last of them counting.
+    #
+    # A job that raises is reported on stderr and kept in error, and the
+    # previous mesh stays published; later jobs run as usual.
+    def __init__(self) -> None:
+        self.sites: List[Site] = []
+        self.delauney: Delauney = None
+        self.jobs = 0
+        self.error: Optional[Exception] = None
+        self.__pending: List[Site] = []
+        self.__view = None
+        self.__view_changed = False
+        self.__layers = []
+        self.__busy = False
+        self.__closed = False
+        self.__version = 0
+        self.__result: Optional[Tuple[int, list]] = None
+        self.__changed = threading.Condition()
+        self.__thread = threading.Thread(target=self.__run, name="MeshWorker", daemon=True)
+        self.__thread.start()
+
+    def submit(self, site: Site) -> None:
+        with self.__changed:
+            self.__pending.append(site)
+            self.__changed.notify_all()
+
+    def set_view(self, left: float, right: float, bottom: float, top: float, pixel: float = 0.0) -> None:
+        # Restricts the published layers to the rectangle, with pixel the
+        # size of a window pixel in world units (0 for no decimation)
+        with self.__changed:
+            self.__view = (left, right, bottom, top, pixel)
+            self.__view_changed = True
+            self.__changed.notify_all()
+
+    def latest(self) -> Optional[Tuple[int, list]]:
+        # The last finished mesh as (version, layers), layers being
+        # (kind, vertices) pairs in drawing order, or None before the first
+        return self.__result
+
+    def wait(self, timeout: float = None) -> bool:
+        # Blocks until every submitted site and view is in the latest mesh
+        with self.__changed:
+            return self.__changed.wait_for(lambda: not self.__pending and not self.__view_changed and not self.__busy, timeout)
+
+    def close(self) -> None:
+        with self.__changed:
+            self.__closed = True
+            self.__changed.notify_all()
+        self.__thread.join()
+
+    def __run(self):
+        while True:
+            with self.__changed:
+                self.__changed.wait_for(lambda: self.__pending or self.__view_changed or self.__closed)
+                if self.__closed:
+                    return
+                batch, self.__pending = self.__pending, []
+                view, self.__view_changed = self.__view, False
+                self.__busy = True
+
+            layers = None
+            try:
+                if batch:
+                    self.__update(batch)
+                if self.__layers:
+                    layers = self.__cull(view)
+            except Exception as error:
+                self.error = error
+                traceback.print_exc()
+            finally:
+                with self.__changed:
+                    if layers is not None:
+                        self.__version += 1
+                        self.__result = (self.__version, layers)
+                    self.__busy = False
+                    self.__changed.notify_all()
+
+    def __update(self, batch: List[Site]) -> None:
+        # Adds the batch to the mesh and rebuilds the vertices and the
+        # spatial index of every layer
+        self.jobs += 1
+        self.sites.extend(batch)
+        if self.delauney is not None:
+            for site in batch:
+                self.delauney.insert(site)
+        elif len(self.sites) > 1:
+            self.delauney = Delauney(list(self.sites))
+
+        if self.delauney is None:
+            xy = np.array([(s.x, s.y) for s in self.sites]).reshape(-1, 2)
+            layers = [(POINTS, xy, SITE_COLOR)]
+        else:
+            layers = mesh_layers(self.delauney)
+
+        self.__layers = []
+        for kind, xy, color in layers:
+            primitives = xy.reshape(-1, 2, 2) if kind == LINES else xy
+            self.__layers.append((kind, layer_vertices(xy, color), primitives, GridIndex(primitives)))
+
+    def __cull(self, view) -> list:
+        if view is None:
+            return [(kind, vertices) for kind, vertices, _, _ in self.__layers]
+
+        left, right, bottom, top, pixel = view
+        layers = []
+        for kind, vertices, primitives, index in self.__layers:
+            visible = index.query(left, right, bottom, top)
+            visible = visible[decimate(primitives[visible], pixel)]
+            if kind == LINES:
+                layers.append((kind, vertices.reshape(-1, 2, 5)[visible].reshape(-1, 5)))
+            else:
+                layers.append((kind, vertices[visible]))
+        return layers
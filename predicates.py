@@ -0,0 +1,135 @@
+from fractions import Fraction
+
+import numpy as np
+
+# Half an ulp of 1.0, and Shewchuk's static error-bound coefficients for the
+# closed-form evaluations below. If |det| exceeds bound * permanent the sign of
+# the floating-point result is guaranteed to be correct.
+EPSILON = 2.0**-53
+CCW_ERRBOUND = (3.0 + 16.0 * EPSILON) * EPSILON
+ICC_ERRBOUND = (10.0 + 96.0 * EPSILON) * EPSILON
+
+
+def orient2d(ax, ay, bx, by, cx, cy) -> float:
+    # Equivalent to det([[ax, ay, 1], [bx, by, 1], [cx, cy, 1]]).
+    # Positive when a, b, c are in counterclockwise order.
+    detleft = (ax - cx) * (by - cy)
+    detright = (ay - cy) * (bx - cx)
+    det = detleft - detright
+
+    if detleft > 0:
+        if detright <= 0:
+            return det
+        detsum = detleft + detright
+    elif detleft < 0:
+        if detright >= 0:
+            return det
+        detsum = -detleft - detright
+    else:
+        return det
+
+    if det >= CCW_ERRBOUND * detsum or -det >= CCW_ERRBOUND * detsum:
+        return det
+
+    return orient2d_exact(ax, ay, bx, by, cx, cy)
+
+
+def incircle(ax, ay, bx, by, cx, cy, dx, dy) -> float:
+    # Equivalent to det of the 4x4 lifted matrix rows [x, y, x^2 + y^2, 1].
+    # Positive when d lies inside the circle through counterclockwise a, b, c.
+    adx = ax - dx
+    ady = ay - dy
+    bdx = bx - dx
+    bdy = by - dy
+    cdx = cx - dx
+    cdy = cy - dy
+
+    bdxcdy = bdx * cdy
+    cdxbdy = cdx * bdy
+    alift = adx * adx + ady * ady
+
+    cdxady = cdx * ady
+    adxcdy = adx * cdy
+    blift = bdx * bdx + bdy * bdy
+
+    adxbdy = adx * bdy
+    bdxady = bdx * ady
+    clift = cdx * cdx + cdy * cdy
+
+    det = alift * (bdxcdy - cdxbdy) + blift * (cdxady - adxcdy) + clift * (adxbdy - bdxady)
+
+    permanent = (
+        (abs(bdxcdy) + abs(cdxbdy)) * alift
+        + (abs(cdxady) + abs(adxcdy)) * blift
+        + (abs(adxbdy) + abs(bdxady)) * clift
+    )
+
+    if det > ICC_ERRBOUND * permanent or -det > ICC_ERRBOUND * permanent:
+        return det
+
+    return incircle_exact(ax, ay, bx, by, cx, cy, dx, dy)
+
+
+def orient2d_exact(ax, ay, bx, by, cx, cy) -> float:
+    ax, ay, bx, by, cx, cy = map(Fraction, (ax, ay, bx, by, cx, cy))
+    return float((ax - cx) * (by - cy) - (ay - cy) * (bx - cx))
+
+
+def incircle_exact(ax, ay, bx, by, cx, cy, dx, dy) -> float:
+    ax, ay, bx, by, cx, cy, dx, dy = map(Fraction, (ax, ay, bx, by, cx, cy, dx, dy))
+
+    adx, ady = ax - dx, ay - dy
+    bdx, bdy = bx - dx, by - dy
+    cdx, cdy = cx - dx, cy - dy
+
+    alift = adx * adx + ady * ady
+    blift = bdx * bdx + bdy * bdy
+    clift = cdx * cdx + cdy * cdy
+
+    return float(
+        alift * (bdx * cdy - cdx * bdy)
+        + blift * (cdx * ady - adx * cdy)
+        + clift * (adx * bdy - bdx * ady)
+    )
+
+
+def orient2d_array(ax, ay, bx, by, cx, cy) -> np.ndarray:
+    # Vectorized orient2d over coordinate arrays. Entries whose sign the
+    # error bound cannot certify are recomputed exactly.
+    detleft = (ax - cx) * (by - cy)
+    detright = (ay - cy) * (bx - cx)
+    det = detleft - detright
+
+    uncertain = np.flatnonzero(np.abs(det) < CCW_ERRBOUND * (np.abs(detleft) + np.abs(detright)))
+    for i in uncertain.tolist():
+        det[i] = orient2d_exact(ax[i], ay[i], bx[i], by[i], cx[i], cy[i])
+
+    return det
+
+
+def incircle_array(ax, ay, bx, by, cx, cy, dx, dy) -> np.ndarray:
+    # Vectorized incircle over coordinate arrays, with the same exact
+    # fallback as orient2d_array
+    adx, ady = ax - dx, ay - dy
+    bdx, bdy = bx - dx, by - dy
+    cdx, cdy = cx - dx, cy - dy
+
+    bdxcdy, cdxbdy = bdx * cdy, cdx * bdy
+    cdxady, adxcdy = cdx * ady, adx * cdy
+    adxbdy, bdxady = adx * bdy, bdx * ady
+    alift = adx * adx + ady * ady
+    blift = bdx * bdx + bdy * bdy
+    clift = cdx * cdx + cdy * cdy
+
+    det = alift * (bdxcdy - cdxbdy) + blift * (cdxady - adxcdy) + clift * (adxbdy - bdxady)
+    permanent = (
+        (np.abs(bdxcdy) + np.abs(cdxbdy)) * alift
+        + (np.abs(cdxady) + np.abs(adxcdy)) * blift
+        + (np.abs(adxbdy) + np.abs(bdxady)) * clift
+    )
+
+    uncertain = np.flatnonzero(np.abs(det) <= ICC_ERRBOUND * permanent)
+    for i in uncertain.tolist():
+        det[i] = incircle_exact(ax[i], ay[i], bx[i], by[i], cx[i], cy[i], dx[i], dy[i])
+
+    return det
@@ -1,5 +1,8 @@
+from array import array
+from collections.abc import Mapping, Sequence
+from typing import Dict, Iterator, List
 
-import uuid
+import numpy as np
 
 
 class Site:
@@ -14,19 +17,220 @@ class Site:
         return f"Site({self.x}, {self.y})"
 
 
+class SiteArray(Sequence):
+    # Read-only sequence of Site objects over an (N, 2) coordinate array.
+    # A Site is created on first access and cached, so repeated lookups of
+    # the same index return the same object.
+    def __init__(self, points: np.ndarray) -> None:
+        self.points = points
+        self.cache: Dict[int, Site] = {}
+
+    def __len__(self) -> int:
+        return len(self.points)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self.points)
+        site = self.cache.get(i)
+        if site is None:
+            x, y = self.points[i]
+            site = self.cache[i] = Site(float(x), float(y))
+        return site
+
+
+def as_array(buffer) -> array:
+    # Copies a buffer of int64 values, such as a view of a memory-mapped file,
+    # into an array that can grow
+    copy = array("q")
+    copy.frombytes(memoryview(buffer).cast("B"))
+    return copy
+
+
+# An edge is referred to by an integer id. The four directed/dual quarters of
+# one quad-edge occupy ids 4k .. 4k + 3, so rot/sym are pure index arithmetic.
+def rot(e: int) -> int:
+    return (e & ~3) | ((e + 1) & 3)
+
+
+def sym(e: int) -> int:
+    return e ^ 2
+
+
+def inv_rot(e: int) -> int:
+    return (e & ~3) | ((e + 3) & 3)
+
+
+class EdgeStore(Mapping):
+    # onext holds one entry per quarter-edge. org holds one entry per primal
+    # quarter (ids with an even rotation), indexed by e >> 1; -1 marks a
+    # deleted edge. Deleted quad-edges are kept on a free list and reused.
+    # Both may also be fixed-size int64 buffers, e.g. mapped from a file by
+    # Delauney.load; they are copied into arrays the first time they grow.
+    def __init__(self, sites: Sequence[Site] = None, capacity: int = 0) -> None:
+        self.sites = sites if sites is not None else []
+        self.onext = array("q", bytes(8 * 4 * capacity))
+        self.org = array("q", bytes(8 * 2 * capacity))
+        self.count = 0
+        self.free: List[int] = []
+
+    def add_site(self, site: Site) -> int:
+        self.sites.append(site)
+        return len(self.sites) - 1
+
+    def reserve(self, capacity: int) -> None:
+        grow = capacity - len(self.onext) // 4
+        if grow > 0:
+            if not isinstance(self.onext, array):
+                self.onext = as_array(self.onext)
+                self.org = as_array(self.org)
+            self.onext.extend(array("q", bytes(8 * 4 * grow)))
+            self.org.extend(array("q", bytes(8 * 2 * grow)))
+
+    def graft(self, onext: array, org: array, free: List[int], site_offset: int) -> int:
+        # Append the edges of another store whose sites start at site_offset
+        # in this one. Returns the offset to add to the other store's ids.
+        offset = self.count
+        size = len(onext)
+        self.reserve((offset + size) // 4)
+
+        block = np.frombuffer(onext, dtype=np.int64) + offset
+        self.onext[offset : offset + size] = array("q", block.tobytes())
+
+        block = np.frombuffer(org, dtype=np.int64)
+        block = np.where(block >= 0, block + site_offset, -1)
+        self.org[offset >> 1 : (offset + size) >> 1] = array("q", block.tobytes())
+
+        self.count = offset + size
+        self.free.extend(e + offset for e in free)
+        return offset
+
+    def make_edge(self, a: int, b: int) -> int:
+        if self.free:
+            e = self.free.pop()
+        else:
+            e = self.count
+            self.count += 4
+            if self.count > len(self.onext):
+                self.reserve(max(16, len(self.onext) // 2))
+
+        onext = self.onext
+        onext[e] = e
+        onext[e + 1] = e + 3
+        onext[e + 2] = e + 2
+        onext[e + 3] = e + 1
+
+        self.org[e >> 1] = a
+        self.org[(e >> 1) + 1] = b
+
+        return e
+
+    def splice(self, a: int, b: int) -> None:
+        onext = self.onext
+        t1 = onext[b]
+        t2 = onext[a]
+        alpha = (t2 & ~3) | ((t2 + 1) & 3)
+        beta = (t1 & ~3) | ((t1 + 1) & 3)
+        t3 = onext[beta]
+        t4 = onext[alpha]
+
+        onext[a] = t1
+        onext[b] = t2
+        onext[alpha] = t3
+        onext[beta] = t4
+
+    def connect(self, a: int, b: int) -> int:
+        e = self.make_edge(self.dest(a), self.org[b >> 1])
+        self.splice(e, self.lnext(a))
+        self.splice(e ^ 2, b)
+        return e
+
+    def delete(self, e: int) -> None:
+        self.splice(e, self.oprev(e))
+        self.splice(e ^ 2, self.oprev(e ^ 2))
+
+        base = e & ~3
+        self.org[base >> 1] = -1
+        self.org[(base >> 1) + 1] = -1
+        self.free.append(base)
+
+    def origin(self, e: int) -> int:
+        return -1 if e & 1 else self.org[e >> 1]
+
+    def dest(self, e: int) -> int:
+        return self.origin(e ^ 2)
+
+    def lnext(self, e: int) -> int:
+        return rot(self.onext[inv_rot(e)])
+
+    def oprev(self, e: int) -> int:
+        return rot(self.onext[rot(e)])
+
+    def rprev(self, e: int) -> int:
+        return self.onext[e ^ 2]
+
+    def is_alive(self, e: int) -> bool:
+        return 0 <= e < self.count and self.org[(e & ~3) >> 1] >= 0
+
+    def view(self, e: int) -> "QuadEdge":
+        return QuadEdge(self, e)
+
+    def __getitem__(self, e: int) -> "QuadEdge":
+        if not self.is_alive(e):
+            raise KeyError(e)
+        return QuadEdge(self, e)
+
+    def __iter__(self) -> Iterator[int]:
+        org = self.org
+        for e in range(0, self.count, 4):
+            if org[e >> 1] >= 0:
+                yield e
+                yield e + 1
+                yield e + 2
+                yield e + 3
+
+    def __len__(self) -> int:
+        return self.count - 4 * len(self.free)
+
+
 class QuadEdge:
-    def __init__(self) -> None:
-        self.id = str(uuid.uuid4())
-        self.origin: Site = None
-        self.rot: QuadEdge = None
-        self.onext: QuadEdge = None
+    # Lightweight view of one quarter-edge inside an EdgeStore.
+    __slots__ = ("store", "id")
+
+    def __init__(self, store: EdgeStore, id: int) -> None:
+        self.store = store
+        self.id = id
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, QuadEdge) and self.id == other.id and self.store is other.store
+
+    def __hash__(self) -> int:
+        return hash(self.id)
 
     def __str__(self) -> str:
         return f"Edge({self.origin}, {self.dest})"
 
     def __repr__(self) -> str:
         return f"Edge({self.origin}, {self.dest})"
-        
+
+    @property
+    def origin(self):
+        i = self.store.origin(self.id)
+        return self.store.sites[i] if i >= 0 else None
+
+    @property
+    def onext(self):
+        return QuadEdge(self.store, self.store.onext[self.id])
+
+    @onext.setter
+    def onext(self, e: "QuadEdge"):
+        self.store.onext[self.id] = e.id
+
+    @property
+    def rot(self):
+        return QuadEdge(self.store, rot(self.id))
+
     @property
     def dest(self):
         return self.sym.origin
@@ -41,11 +245,11 @@ class QuadEdge:
 
     @property
     def sym(self):
-        return self.rot.rot
+        return QuadEdge(self.store, self.id ^ 2)
 
     @property
     def inv_rot(self):
-        return self.sym.rot
+        return QuadEdge(self.store, inv_rot(self.id))
 
     @property
     def lnext(self):
@@ -76,50 +280,18 @@ class QuadEdge:
         return self.inv_rot.onext.inv_rot
 
     @staticmethod
-    def make_edge(a: Site, b: Site):
-        e1 = QuadEdge()
-        e2 = QuadEdge()
-        e3 = QuadEdge()
-        e4 = QuadEdge()
-
-        e1.origin = a
-        e3.origin = b
-
-        e1.rot = e2
-        e2.rot = e3
-        e3.rot = e4
-        e4.rot = e1
-
-        e1.onext = e1
-        e2.onext = e4
-        e3.onext = e3
-        e4.onext = e2
-
-        return e1
+    def make_edge(a: Site, b: Site, store: EdgeStore = None):
+        store = store if store is not None else EdgeStore()
+        return QuadEdge(store, store.make_edge(store.add_site(a), store.add_site(b)))
 
     @staticmethod
     def splice(a, b):
-        alpha = a.onext.rot
-        beta = b.onext.rot
-
-        t1 = b.onext
-        t2 = a.onext
-        t3 = beta.onext
-        t4 = alpha.onext
-
-        a.onext = t1
-        b.onext = t2
-        alpha.onext = t3
-        beta.onext = t4
+        a.store.splice(a.id, b.id)
 
     @staticmethod
     def connect(a, b):
-        e = QuadEdge.make_edge(a.dest, b.origin)
-        QuadEdge.splice(e, a.lnext)
-        QuadEdge.splice(e.sym, b)
-        return e
+        return QuadEdge(a.store, a.store.connect(a.id, b.id))
 
     @staticmethod
     def delete(e):
-        QuadEdge.splice(e, e.oprev)
-        QuadEdge.splice(e.sym, e.sym.oprev)
\ No newline at end of file
+        e.store.delete(e.id)
@@ -0,0 +1,205 @@
+import argparse
+import struct
+import zlib
+from typing import List, Tuple
+
+import numpy as np
+
+from delauney import Delauney
+
+# Colors and sizes shared with the interactive viewer
+BACKGROUND_COLOR = (0.35, 0.45, 0.50)
+SITE_COLOR = (1.0, 0.5, 0.0)
+CIRCUMCENTER_COLOR = (0.0, 0.0, 0.0)
+DELAUNEY_EDGE_COLOR = (0.0, 0.0, 1.0)
+VORONOI_EDGE_COLOR = (1.0, 0.0, 0.0)
+POINT_SIZE = 5
+
+# The viewer's world extent as (left, right, bottom, top), as passed to glm.ortho
+EXTENT = (0.0, 10000.0, 0.0, 10000.0)
+
+POINTS = "points"
+LINES = "lines"
+
+
+def ortho(left: float, right: float, bottom: float, top: float, near: float = -1.0, far: float = 1.0) -> np.ndarray:
+    # The matrix glm.ortho builds, acting on column vectors
+    return np.array(
+        [
+            [2 / (right - left), 0, 0, -(right + left) / (right - left)],
+            [0, 2 / (top - bottom), 0, -(top + bottom) / (top - bottom)],
+            [0, 0, -2 / (far - near), -(far + near) / (far - near)],
+            [0, 0, 0, 1],
+        ]
+    )
+
+
+def to_window(xy: np.ndarray, projection: np.ndarray, width: int, height: int) -> np.ndarray:
+    # World positions to window pixels, y pointing down as in image rows
+    ndc = xy @ projection[:2, :2].T + projection[:2, 3]
+    return np.column_stack([(ndc[:, 0] + 1) * (width / 2), (1 - ndc[:, 1]) * (height / 2)])
+
+
+def mesh_layers(d: Delauney, delauney_edges: bool = True) -> List[Tuple[str, np.ndarray, Tuple[float, float, float]]]:
+    # The primitives the viewer draws, in its drawing order: a kind, the
+    # vertex positions (pairs of them for lines) and a color
+    centers, edges = d.voronoi_arrays()
+    layers = [
+        (POINTS, d.points, SITE_COLOR),
+        (POINTS, centers, CIRCUMCENTER_COLOR),
+        (LINES, d.points[d.edge_array()].reshape(-1, 2), DELAUNEY_EDGE_COLOR),
+        (LINES, centers[edges].reshape(-1, 2), VORONOI_EDGE_COLOR),
+    ]
+    if not delauney_edges:
+        del layers[2]
+    return layers
+
+
+def clip_segments(a: np.ndarray, b: np.ndarray, lo, hi) -> Tuple[np.ndarray, np.ndarray]:
+    # Liang-Barsky: the parameter range [t0, t1] of the part of each segment
+    # a + t (b - a) inside the box lo <= p <= hi, empty when t0 > t1
+    d = b - a
+    t0 = np.zeros(len(a))
+    t1 = np.ones(len(a))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        for k in range(2):
+            ta = (lo[k] - a[:, k]) / d[:, k]
+            tb = (hi[k] - a[:, k]) / d[:, k]
+            inside = (lo[k] <= a[:, k]) & (a[:, k] <= hi[k])
+            parallel = d[:, k] == 0
+            t0 = np.maximum(t0, np.where(parallel, np.where(inside, 0.0, np.inf), np.minimum(ta, tb)))
+            t1 = np.minimum(t1, np.where(parallel, np.where(inside, 1.0, -np.inf), np.maximum(ta, tb)))
+    return t0, t1
+
+
+def rasterize(image: np.ndarray, layers, projection: np.ndarray, width: int, height: int, top: int = 0) -> None:
+    # Draws the layers into image, the rows top .. top + len(image) of a
+    # width x height window. Points are POINT_SIZE squares like GL_POINTS
+    # and lines are one pixel wide. Lines are sampled the same way whatever
+    # the band, so bands drawn separately line up exactly.
+    rows = len(image)
+    for kind, xy, color in layers:
+        color = np.round(np.array(color) * 255).astype(np.uint8)
+        window = to_window(np.asarray(xy, dtype=np.float64).reshape(-1, 2), projection, width, height)
+
+        if kind == POINTS:
+            half = POINT_SIZE / 2
+            keep = (window[:, 0] > -half) & (window[:, 0] < width + half)
+            keep &= (window[:, 1] > top - half) & (window[:, 1] < top + rows + half)
+            corner = np.floor(window[keep] - half + 0.5).astype(np.int64)
+            offsets = np.arange(POINT_SIZE)
+            x = (corner[:, 0, None, None] + offsets[None, None, :]).repeat(POINT_SIZE, axis=1).ravel()
+            y = (corner[:, 1, None, None] + offsets[None, :, None]).repeat(POINT_SIZE, axis=2).ravel()
+        else:
+            # One sample per pixel step along the part inside the window
+            a, b = window[0::2], window[1::2]
+            t0, t1 = clip_segments(a, b, (0, 0), (width, height))
+            keep = t0 <= t1
+            a, b = a[keep] + t0[keep, None] * (b - a)[keep], a[keep] + t1[keep, None] * (b - a)[keep]
+            last = np.ceil(np.abs(b - a).max(axis=1, initial=0)).astype(np.int64)
+
+            # Of which only the samples around this band
+            s0, s1 = clip_segments(a, b, (0, top - 1), (width, top + rows + 1))
+            first = np.clip(np.floor(s0 * last), 0, None).astype(np.int64)
+            count = np.where(s0 <= s1, np.minimum(np.ceil(s1 * last), last).astype(np.int64) - first + 1, 0)
+            count = np.maximum(count, 0)
+            segment = np.repeat(np.arange(len(a)), count)
+            i = np.arange(count.sum()) - np.repeat(np.cumsum(count) - count, count) + first[segment]
+            t = i / np.maximum(last, 1)[segment]
+            p = a[segment] + t[:, None] * (b - a)[segment]
+            x, y = np.floor(p[:, 0]).astype(np.int64), np.floor(p[:, 1]).astype(np.int64)
+
+        y -= top
+        inside = (x >= 0) & (x < width) & (y >= 0) & (y < rows)
+        image[y[inside], x[inside]] = color
+
+
+def render_png(
+    d: Delauney,
+    path: str,
+    width: int = 720,
+    height: int = 720,
+    extent: Tuple[float, float, float, float] = EXTENT,
+    tile: int = 1024,
+    delauney_edges: bool = True,
+) -> None:
+    # Writes the mesh as the viewer would draw it with the projection
+    # glm.ortho(*extent). The image is rasterized and compressed in bands of
+    # tile rows, so its size is not limited by memory.
+    projection = ortho(*extent)
+    layers = mesh_layers(d, delauney_edges)
+    background = np.round(np.array(BACKGROUND_COLOR) * 255).astype(np.uint8)
+
+    def chunk(tag: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", zlib.crc32(tag + data) & 0xFFFFFFFF)
+
+    with open(path, "wb") as f:
+        f.write(b"\x89PNG\r\n\x1a\n")
+        f.write(chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)))
+        compressor = zlib.compressobj()
+        for top in range(0, height, tile):
+            band = np.empty((min(tile, height - top), width, 3), dtype=np.uint8)
+            band[:] = background
+            rasterize(band, layers, projection, width, height, top)
+            # Each scanline starts with its filter type, 0 for none
+            scanlines = np.zeros((len(band), 1 + 3 * width), dtype=np.uint8)
+            scanlines[:, 1:] = band.reshape(len(band), -1)
+            data = compressor.compress(scanlines.tobytes())
+            if data:
+                f.write(chunk(b"IDAT", data))
+        f.write(chunk(b"IDAT", compressor.flush()))
+        f.write(chunk(b"IEND", b""))
+
+
+def render_svg(
+    d: Delauney,
+    path: str,
+    width: int = 720,
+    height: int = 720,
+    extent: Tuple[float, float, float, float] = EXTENT,
+    delauney_edges: bool = True,
+) -> None:
+    # Writes the same picture as render_png as vector paths, one per layer.
+    # Primitives entirely outside the extent are left out.
+    projection = ortho(*extent)
+
+    def hex_color(color):
+        return "#" + "".join(f"{round(c * 255):02x}" for c in color)
+
+    with open(path, "w") as f:
+        f.write(f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" viewBox="0 0 {width} {height}">\n')
+        f.write(f'<rect width="{width}" height="{height}" fill="{hex_color(BACKGROUND_COLOR)}"/>\n')
+        for kind, xy, color in mesh_layers(d, delauney_edges):
+            window = to_window(np.asarray(xy, dtype=np.float64).reshape(-1, 2), projection, width, height)
+            if kind == POINTS:
+                half = POINT_SIZE / 2
+                keep = (window[:, 0] > -half) & (window[:, 0] < width + half)
+                keep &= (window[:, 1] > -half) & (window[:, 1] < height + half)
+                square = f"h{POINT_SIZE}v{POINT_SIZE}h-{POINT_SIZE}z"
+                commands = (f"M{x - half:.2f} {y - half:.2f}{square}" for x, y in window[keep].tolist())
+                f.write(f'<path fill="{hex_color(color)}" d="{"".join(commands)}"/>\n')
+            else:
+                a, b = window[0::2], window[1::2]
+                t0, t1 = clip_segments(a, b, (0, 0), (width, height))
+                keep = t0 <= t1
+                a, b = a[keep] + t0[keep, None] * (b - a)[keep], a[keep] + t1[keep, None] * (b - a)[keep]
+                commands = (f"M{ax:.2f} {ay:.2f}L{bx:.2f} {by:.2f}" for (ax, ay), (bx, by) in zip(a.tolist(), b.tolist()))
+                f.write(f'<path fill="none" stroke="{hex_color(color)}" stroke-width="1" d="{"".join(commands)}"/>\n')
+        f.write("</svg>\n")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Render the Delaunay triangulation and Voronoi diagram of points.")
+    parser.add_argument("points", help=".npy file of an (N, 2) array")
+    parser.add_argument("output", help="path ending in .png or .svg")
+    parser.add_argument("--size", type=int, nargs=2, default=[720, 720], metavar=("WIDTH", "HEIGHT"))
+    parser.add_argument("--extent", type=float, nargs=4, default=EXTENT, metavar=("LEFT", "RIGHT", "BOTTOM", "TOP"))
+    parser.add_argument("--tile", type=int, default=1024)
+    parser.add_argument("--no-delauney-edges", dest="delauney_edges", action="store_false")
+    args = parser.parse_args()
+
+    d = Delauney.from_array(np.load(args.points))
+    if args.output.endswith(".svg"):
+        render_svg(d, args.output, *args.size, extent=tuple(args.extent), delauney_edges=args.delauney_edges)
+    else:
+        render_png(d, args.output, *args.size, extent=tuple(args.extent), tile=args.tile, delauney_edges=args.delauney_edges)
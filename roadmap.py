@@ -0,0 +1,157 @@
+import heapq
+import math
+from typing import Tuple
+
+import numpy as np
+
+# Vertices per bucket the snapping grid aims for
+BUCKET_OCCUPANCY = 2
+# The grid spans this quantile range of the vertices; the few beyond, like
+# circumcenters of slivers along the hull, go to the border buckets
+GRID_QUANTILES = (0.01, 0.99)
+
+
+class Roadmap:
+    # A weighted graph over points in CSR form, the neighbors of vertex i
+    # being targets[offsets[i] : offsets[i + 1]] at distances
+    # weights[offsets[i] : offsets[i + 1]], with a bucket grid over the
+    # vertices that have edges for snapping arbitrary points onto it.
+    # Built from Voronoi vertices and edges it keeps as far from the sites
+    # as possible, which makes it a roadmap around obstacles.
+    def __init__(self, points: np.ndarray, edges: np.ndarray) -> None:
+        self.points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        edges = np.asarray(edges, dtype=np.int64).reshape(-1, 2)
+        n = len(self.points)
+
+        sources = np.concatenate([edges[:, 0], edges[:, 1]])
+        targets = np.concatenate([edges[:, 1], edges[:, 0]])
+        order = np.argsort(sources, kind="stable")
+        self.offsets = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(sources, minlength=n), out=self.offsets[1:])
+        self.targets = targets[order]
+        self.weights = np.linalg.norm(self.points[sources[order]] - self.points[self.targets], axis=1)
+
+        # The searches run in plain Python, which is faster on lists
+        self.__offsets = self.offsets.tolist()
+        self.__targets = self.targets.tolist()
+        self.__weights = self.weights.tolist()
+        self.__xs = self.points[:, 0].tolist()
+        self.__ys = self.points[:, 1].tolist()
+
+        # Bucket grid of the connected vertices, rows of buckets in order
+        usable = np.flatnonzero(np.diff(self.offsets) > 0)
+        if len(usable):
+            xy = self.points[usable]
+            self.__origin, end = np.quantile(xy, GRID_QUANTILES, axis=0)
+            span = end - self.__origin
+            side = max(1, int(math.sqrt(len(usable) / BUCKET_OCCUPANCY)))
+            self.__cell = span.max() / side or 1.0
+            self.__nx, self.__ny = (np.floor(span / self.__cell).astype(np.int64) + 1).tolist()
+            cell = np.floor((xy - self.__origin) / self.__cell)
+            cell = np.clip(cell, 0, [self.__nx - 1, self.__ny - 1]).astype(np.int64)
+            key = cell[:, 1] * self.__nx + cell[:, 0]
+            order = np.argsort(key, kind="stable")
+            self.__items = usable[order].tolist()
+            self.__start = np.searchsorted(key[order], np.arange(self.__nx * self.__ny + 1)).tolist()
+        else:
+            self.__items = []
+
+    def nearest(self, x: float, y: float) -> int:
+        # The closest vertex with at least one edge, or -1 if there is none.
+        # Rings of buckets are searched outwards until no unsearched bucket
+        # can hold anything closer. Border buckets also hold everything
+        # beyond them, which only makes them searched last.
+        if not self.__items:
+            return -1
+        xs, ys = self.__xs, self.__ys
+        ox, oy = self.__origin.tolist()
+        cell, nx, ny, start, items = self.__cell, self.__nx, self.__ny, self.__start, self.__items
+        cx = min(max(int((x - ox) // cell), 0), nx - 1)
+        cy = min(max(int((y - oy) // cell), 0), ny - 1)
+
+        best, best_distance = -1, math.inf
+        r = 0
+        while True:
+            x0, x1, y0, y1 = cx - r, cx + r, cy - r, cy + r
+            for j in range(max(y0, 0), min(y1, ny - 1) + 1):
+                row = j * nx
+                # Whole rows at the top and bottom of the ring, the two
+                # end buckets elsewhere
+                columns = range(max(x0, 0), min(x1, nx - 1) + 1) if j in (y0, y1) else (x0, x1)
+                for i in columns:
+                    if not 0 <= i < nx:
+                        continue
+                    for v in items[start[row + i] : start[row + i + 1]]:
+                        distance = (xs[v] - x) ** 2 + (ys[v] - y) ** 2
+                        if distance < best_distance:
+                            best, best_distance = v, distance
+
+            # How far the searched block reaches past the query on each side
+            # that still has buckets beyond it
+            reach = math.inf
+            if x0 > 0:
+                reach = min(reach, x - (ox + x0 * cell))
+            if x1 < nx - 1:
+                reach = min(reach, ox + (x1 + 1) * cell - x)
+            if y0 > 0:
+                reach = min(reach, y - (oy + y0 * cell))
+            if y1 < ny - 1:
+                reach = min(reach, oy + (y1 + 1) * cell - y)
+            if best >= 0 and best_distance <= reach * reach or reach == math.inf:
+                return best
+            r += 1
+
+    def shortest_path(self, source: int, target: int, heuristic: bool = True) -> Tuple[np.ndarray, float]:
+        # A* from source to target with the straight-line distance to target
+        # as the heuristic, or Dijkstra without it. Returns the vertices of
+        # the path and its length, or an empty path and inf when target
+        # cannot be reached.
+        offsets, targets, weights = self.__offsets, self.__targets, self.__weights
+        xs, ys = self.__xs, self.__ys
+        tx, ty = xs[target], ys[target]
+
+        def estimate(v):
+            return math.hypot(xs[v] - tx, ys[v] - ty) if heuristic else 0.0
+
+        distance = {source: 0.0}
+        previous = {source: -1}
+        heap = [(estimate(source), source)]
+        done = set()
+        while heap:
+            _, v = heapq.heappop(heap)
+            if v in done:
+                continue
+            if v == target:
+                path = []
+                while v >= 0:
+                    path.append(v)
+                    v = previous[v]
+                return np.array(path[::-1], dtype=np.int64), distance[target]
+            done.add(v)
+
+            dv = distance[v]
+            for k in range(offsets[v], offsets[v + 1]):
+                w = targets[k]
+                dw = dv + weights[k]
+                if dw < distance.get(w, math.inf):
+                    distance[w] = dw
+                    previous[w] = v
+                    heapq.heappush(heap, (dw + estimate(w), w))
+
+        return np.zeros(0, dtype=np.int64), math.inf
+
+    def route(self, start: Tuple[float, float], goal: Tuple[float, float], heuristic: bool = True) -> Tuple[np.ndarray, float]:
+        # Path from start to goal through the graph, entering and leaving it
+        # at the vertices nearest to them. Returns the (P, 2) points of the
+        # path, start and goal included, and its length; no points and inf
+        # when there is none.
+        source, target = self.nearest(*start), self.nearest(*goal)
+        if source < 0 or target < 0:
+            return np.zeros((0, 2)), math.inf
+        path, length = self.shortest_path(source, target, heuristic)
+        if not len(path):
+            return np.zeros((0, 2)), math.inf
+
+        points = np.vstack([start, self.points[path], goal]).astype(np.float64)
+        length += math.dist(start, points[1]) + math.dist(points[-2], goal)
+        return points, length
@@ -0,0 +1,76 @@
+import json
+import time
+from typing import Callable, Dict
+
+
+class Stats:
+    # Counters and timers for one triangulation. Counting works by wrapping
+    # methods on the instrumented objects, so anything built without stats
+    # runs the plain, unwrapped code.
+    def __init__(self) -> None:
+        self.calls: Dict[str, int] = {}
+        self.seconds: Dict[str, float] = {}
+        # Per divide-and-conquer level, 0 being the final merge
+        self.merges: Dict[int, Dict[str, int]] = {}
+        self.level = 0
+
+    def counted(self, name: str, function: Callable) -> Callable:
+        calls = self.calls
+        calls.setdefault(name, 0)
+
+        def wrapper(*args):
+            calls[name] += 1
+            return function(*args)
+
+        return wrapper
+
+    def timed(self, name: str, function: Callable) -> Callable:
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                self.add_time(name, time.perf_counter() - start)
+
+        return wrapper
+
+    def merged(self, function: Callable) -> Callable:
+        # Attributes the calls made during each merge to the current level.
+        # Every pass of the stitching loop but the last adds one edge, and the
+        # base edge is added before it, so connects equal loop iterations.
+        calls = self.calls
+
+        def wrapper(*args):
+            before = dict(calls)
+            result = function(*args)
+            level = self.merges.setdefault(self.level, {"merges": 0, "iterations": 0})
+            level["merges"] += 1
+            level["iterations"] += calls.get("connect", 0) - before.get("connect", 0)
+            for name, count in calls.items():
+                level[name] = level.get(name, 0) + count - before.get(name, 0)
+            return result
+
+        return wrapper
+
+    def add_time(self, name: str, seconds: float) -> None:
+        self.seconds[name] = self.seconds.get(name, 0.0) + seconds
+
+    def reset(self) -> None:
+        for name in self.calls:
+            self.calls[name] = 0
+        self.seconds.clear()
+        self.merges.clear()
+
+    def as_dict(self) -> dict:
+        return {
+            "calls": dict(self.calls),
+            "seconds": dict(self.seconds),
+            "merges": {level: dict(counts) for level, counts in sorted(self.merges.items())},
+        }
+
+    def to_json(self, path: str = None) -> str:
+        text = json.dumps(self.as_dict(), indent=2)
+        if path is not None:
+            with open(path, "w") as f:
+                f.write(text)
+        return text
@@ -1,4 +1,9 @@
+import json
+import random
 
+import numpy as np
+
+from turn_in import delauney
 from turn_in.delauney import Delauney, Triangle
 from turn_in.quad_edge import Site
 
@@ -17,6 +22,7 @@ def test_edge():
     assert len(circumcenters) == 0
     assert len(voronoi_edges) == 0
 
+
 def test_triangle():
     sites = [Site(0,0), Site(0,1), Site(1,0)]
     d = Delauney(sites)
@@ -31,6 +37,7 @@ def test_triangle():
     assert len(circumcenters) == 1
     assert len(voronoi_edges) == 0
 
+
 def test_square():
     sites = [Site(0,0), Site(0,1), Site(1,0), Site(1,1)]
     d = Delauney(sites)
@@ -45,6 +52,8 @@ def test_square():
 
     assert len(circumcenters) == 2
     assert len(voronoi_edges) == 1
+    assert repr(voronoi_edges[0]).startswith("VoronoiEdge(start=")
+
 
 def test_square_with_center_dot():
     sites = [Site(0,0), Site(0,1), Site(0.5, 0.5), Site(1,0), Site(1,1)]
@@ -61,4 +70,668 @@ def test_square_with_center_dot():
     circumcenters, voronoi_edges = d.voronoi()
 
     assert len(circumcenters) == 4
-    assert len(voronoi_edges) == 4
\ No newline at end of file
+    assert len(voronoi_edges) == 4
+
+
+def test_random_sites_are_delauney():
+    random.seed(0)
+    sites = [Site(random.uniform(0, 100), random.uniform(0, 100)) for _ in range(200)]
+    d = Delauney(sites)
+
+    triangles = d.find_triangles()
+    assert len(triangles) > 200
+
+    for triangle in triangles:
+        a, b, c = triangle.sites
+        if not d.ccw(a, b, c):
+            b, c = c, b
+        for site in sites:
+            if site not in triangle.sites:
+                assert not d.in_circle(a, b, c, site)
+
+
+def test_parallel_matches_serial(monkeypatch):
+    monkeypatch.setattr(delauney, "PARALLEL_MIN_SITES", 32)
+    random.seed(1)
+    points = [(random.uniform(0, 100), random.uniform(0, 100)) for _ in range(300)]
+
+    serial = Delauney([Site(x, y) for x, y in points])
+    parallel = Delauney([Site(x, y) for x, y in points], workers=4)
+
+    def coordinates(d):
+        return {tuple((s.x, s.y) for s in t.sites) for t in d.find_triangles()}
+
+    assert coordinates(parallel) == coordinates(serial)
+
+    # The other strategies have no parallel build to fall back on
+    for strategy in ("alternating", "hilbert", "morton"):
+        try:
+            Delauney.from_array(np.array(points), workers=4, strategy=strategy)
+            assert False
+        except ValueError:
+            pass
+    assert len(parallel.edges) == len(serial.edges)
+
+
+def test_from_array():
+    points = np.array([[1, 1], [0, 1], [0.5, 0.5], [1, 0], [0, 0], [0.5, 0.5]])
+    d = Delauney.from_array(points)
+
+    assert len(d.points) == 5
+    assert d.points.tolist() == [[0, 0], [0, 1], [0.5, 0.5], [1, 0], [1, 1]]
+    assert d.order.tolist() == [4, 1, 2, 3, 0]
+    assert d.bounds == (0, 0, 1, 1)
+    assert d.left.origin.x == 0 and d.left.origin.y == 0
+    assert d.left.origin is d.sites[0]
+
+    triangles = d.find_triangles()
+    assert len(triangles) == 4
+    assert Triangle(d.sites[0], d.sites[1], d.sites[2]) in triangles
+
+
+def test_from_array_matches_sites():
+    random.seed(2)
+    points = np.array([(random.uniform(0, 100), random.uniform(0, 100)) for _ in range(300)])
+
+    from_sites = Delauney([Site(x, y) for x, y in points.tolist()])
+    from_array = Delauney.from_array(points)
+
+    def coordinates(d):
+        return {tuple((s.x, s.y) for s in t.sites) for t in d.find_triangles()}
+
+    assert coordinates(from_array) == coordinates(from_sites)
+
+
+def test_triangle_array_skips_outer_face():
+    d = Delauney([Site(0, 0), Site(10, 0), Site(5, 10), Site(5, 3)])
+
+    triangles = d.triangle_array()
+    assert triangles.shape == (3, 3)
+    assert len(d.find_triangles()) == 3
+
+
+def test_voronoi_arrays():
+    random.seed(3)
+    n = 200
+    d = Delauney.from_array(np.array([(random.uniform(0, 100), random.uniform(0, 100)) for _ in range(n)]))
+
+    triangles = d.triangle_array()
+    centers, edges = d.voronoi_arrays()
+    hull = 2 * n - 2 - len(triangles)
+
+    assert centers.shape == (len(triangles), 2)
+    assert len(edges) == len(d.edges) // 4 - hull
+
+    # Every circumcenter is equidistant from the corners of its triangle
+    distances = np.linalg.norm(d.points[triangles] - centers[:, None, :], axis=2)
+    assert np.allclose(distances, distances[:, :1])
+
+    # Voronoi edges join triangles that share two sites
+    for a, b in edges.tolist():
+        assert len(set(triangles[a]) & set(triangles[b])) == 2
+
+
+def polygon_area(polygon):
+    x, y = polygon[:, 0], polygon[:, 1]
+    return 0.5 * (np.dot(x, np.roll(y, -1)) - np.dot(y, np.roll(x, -1)))
+
+
+def test_voronoi_cells_cover_bounds():
+    random.seed(4)
+    d = Delauney.from_array(np.array([(random.uniform(0, 100), random.uniform(0, 100)) for _ in range(100)]))
+    vertices, offsets, indices = d.voronoi_cells((-10, -10, 110, 110))
+
+    assert len(offsets) == len(d.points) + 1
+    areas = []
+    for i, site in enumerate(d.points):
+        cell = vertices[indices[offsets[i] : offsets[i + 1]]]
+        areas.append(polygon_area(cell))
+        # The site is closer to every vertex of its cell than any other site
+        distances = np.linalg.norm(d.points[None, :, :] - cell[:, None, :], axis=2)
+        assert np.allclose(distances[:, i], distances.min(axis=1))
+
+    assert min(areas) > 0
+    assert np.isclose(sum(areas), 120 * 120)
+
+
+def test_voronoi_cells_grid_shares_vertices():
+    grid = np.array([(i, j) for i in range(5) for j in range(5)], dtype=float)
+    d = Delauney.from_array(grid)
+    vertices, offsets, indices = d.voronoi_cells((-1, -1, 5, 5))
+
+    assert len(vertices) == 36
+    assert np.all(np.diff(offsets) == 4)
+
+
+def test_voronoi_rays():
+    d = Delauney([Site(0, 0), Site(0, 1), Site(1, 0), Site(1, 1)])
+    origins, directions = d.voronoi_rays()
+    centers, _ = d.voronoi_arrays()
+
+    assert len(origins) == 4
+    assert np.allclose(np.linalg.norm(directions, axis=1), 1)
+    assert np.allclose(centers[origins], 0.5)
+    assert sorted(map(tuple, directions.round(6).tolist())) == [(-1, 0), (0, -1), (0, 1), (1, 0)]
+
+
+def triangle_coordinates(d):
+    return {tuple(sorted(map(tuple, d.points[t].tolist()))) for t in d.triangle_array()}
+
+
+def test_insert_matches_rebuild():
+    random.seed(5)
+    points = [(random.uniform(0, 100), random.uniform(0, 100)) for _ in range(200)]
+    d = Delauney.from_array(np.array(points[:3]))
+    for point in points[3:]:
+        d.insert(point)
+
+    assert len(d.points) == 200
+    assert triangle_coordinates(d) == triangle_coordinates(Delauney.from_array(np.array(points)))
+
+
+def test_insert_on_edges_and_outside_hull():
+    sites = [Site(0, 0), Site(0, 1), Site(1, 0), Site(1, 1)]
+    d = Delauney(sites)
+
+    assert d.insert(Site(1, 1)) == 3
+    center = Site(0.5, 0.5)
+    assert d.insert(center) == 4
+    assert d.sites[4] is center
+    d.insert((0.5, 0))
+    d.insert((3, 0.5))
+    d.insert((-1, -1))
+
+    triangles = d.triangle_array()
+    assert len(triangles) == 2 * len(d.points) - 2 - 4
+    for a, b, c in triangles:
+        for i in range(len(d.points)):
+            if i not in (a, b, c):
+                assert not d.in_circle(d.sites[a], d.sites[b], d.sites[c], d.sites[i])
+    assert d.left.origin.x == -1
+
+
+def test_insert_collinear():
+    d = Delauney([Site(0, 0), Site(1, 1)])
+    d.insert((3, 3))
+    d.insert((2, 2))
+    d.insert((-1, -1))
+
+    assert len(d.triangle_array()) == 0
+    assert len(d.edges) // 4 == 4
+
+    d.insert((0, 2))
+    assert len(d.triangle_array()) == 4
+
+
+def test_remove_matches_rebuild():
+    random.seed(6)
+    points = [(random.uniform(0, 100), random.uniform(0, 100)) for _ in range(150)]
+    d = Delauney.from_array(np.array(points))
+
+    removed = random.sample(range(150), 60)
+    for i in removed:
+        assert d.remove(i) == i
+    removed.append(d.remove((d.left.origin.x, d.left.origin.y)))
+
+    remaining = np.delete(d.points, removed, axis=0)
+    assert triangle_coordinates(d) == triangle_coordinates(Delauney.from_array(remaining))
+    assert d.removed == 61
+
+
+def test_move_matches_rebuild():
+    random.seed(7)
+    points = [(random.uniform(0, 100), random.uniform(0, 100)) for _ in range(150)]
+    d = Delauney.from_array(np.array(points))
+
+    for _ in range(100):
+        i = random.randrange(150)
+        x, y = d.points[i]
+        assert d.move(i, (x + random.uniform(-2, 2), y + random.uniform(-2, 2))) == i
+    d.move(0, (500, 500))
+
+    assert d.points[0].tolist() == [500, 500]
+    assert triangle_coordinates(d) == triangle_coordinates(Delauney.from_array(d.points.copy()))
+
+
+def test_nearest_queries():
+    random.seed(8)
+    d = Delauney.from_array(np.array([(random.uniform(0, 100), random.uniform(0, 100)) for _ in range(300)]))
+    d.remove(17)
+    queries = np.array([(random.uniform(-20, 120), random.uniform(-20, 120)) for _ in range(100)])
+
+    alive = np.array([i for i in range(len(d.points)) if i != 17])
+    distances = np.linalg.norm(d.points[alive][None, :, :] - queries[:, None, :], axis=2)
+    expected = alive[np.argsort(distances, axis=1)]
+
+    assert d.nearest(*queries[0]) == expected[0, 0]
+    assert d.k_nearest(*queries[1], 5).tolist() == expected[1, :5].tolist()
+    assert d.nearest_array(queries).tolist() == expected[:, 0].tolist()
+    assert d.k_nearest_array(queries, 8).tolist() == expected[:, :8].tolist()
+    assert d.k_nearest_array(queries[:1], 400)[0, -100:].tolist() == [-1] * 100
+
+
+def test_stats():
+    random.seed(9)
+    points = np.array([(random.uniform(0, 100), random.uniform(0, 100)) for _ in range(200)])
+    plain = Delauney.from_array(points)
+    assert plain.stats is None
+
+    d = Delauney.from_array(points, stats=True)
+    assert d.triangle_array().tolist() == plain.triangle_array().tolist()
+    d.insert((50.5, 50.5))
+    d.voronoi()
+
+    stats = d.stats.as_dict()
+    assert stats["calls"]["ccw"] > 0 and stats["calls"]["in_circle"] > 0
+    assert stats["merges"][0]["merges"] == 1
+    assert stats["merges"][1]["merges"] == 2
+    assert sum(level["iterations"] for level in stats["merges"].values()) <= stats["calls"]["connect"]
+    assert {"build", "triangulate", "insert", "voronoi", "voronoi_arrays"} <= set(stats["seconds"])
+    assert json.loads(d.stats.to_json())["calls"] == stats["calls"]
+
+
+def test_save_and_load(tmp_path):
+    random.seed(10)
+    d = Delauney.from_array(np.array([(random.uniform(0, 100), random.uniform(0, 100)) for _ in range(300)]))
+    d.remove(5)
+    path = str(tmp_path / "mesh.bin")
+    d.save(path, triangles=True, voronoi=True)
+    saved = open(path, "rb").read()
+
+    for mmap in (True, False):
+        loaded = Delauney.load(path, mmap=mmap)
+        assert loaded.triangle_array().tolist() == d.triangle_array().tolist()
+        assert loaded.voronoi_arrays()[1].tolist() == d.voronoi_arrays()[1].tolist()
+        assert loaded.order.tolist() == d.order.tolist()
+        assert loaded.representative.tolist() == d.representative.tolist()
+        assert loaded.nearest(50, 50) == d.nearest(50, 50)
+
+        # Updates work on the loaded mesh and never reach the file
+        loaded.insert((50.5, 49.5))
+        d2 = Delauney.from_array(np.vstack([np.delete(d.points, 5, axis=0), [(50.5, 49.5)]]))
+        assert sorted(triangle_coordinates(loaded)) == sorted(triangle_coordinates(d2))
+    assert open(path, "rb").read() == saved
+
+    # Meshes of one site or none have no hull edges to save
+    for points in (np.empty((0, 2)), np.array([(3.0, 4.0)])):
+        Delauney.from_array(points).save(path, triangles=True, voronoi=True)
+        loaded = Delauney.load(path)
+        assert loaded.left is None and loaded.points.tolist() == points.tolist()
+        assert len(loaded.triangle_array()) == 0
+        assert loaded.insert((1.0, 2.0)) == len(points)
+        assert loaded.nearest(1, 1) == len(points)
+
+
+def test_stream_matches_build(tmp_path):
+    random.seed(11)
+    points = np.array([(random.uniform(0, 100), random.uniform(0, 100)) for _ in range(600)])
+    points = np.vstack([points, points[:50]])
+    np.save(tmp_path / "cloud.npy", points)
+
+    chunks = list(Delauney.stream(str(tmp_path / "cloud.npy"), strip_size=70, chunk_size=128))
+    assert len(chunks) > 1
+    triangles = np.concatenate(chunks)
+
+    d = Delauney.from_array(points)
+    streamed = {tuple(sorted(map(tuple, points[t].tolist()))) for t in triangles}
+    assert len(streamed) == len(triangles) == len(d.triangle_array())
+    assert streamed == triangle_coordinates(d)
+
+
+def test_edge_array():
+    random.seed(12)
+    d = Delauney.from_array(np.array([(random.uniform(0, 100), random.uniform(0, 100)) for _ in range(200)]))
+    edges = d.edge_array()
+    assert len(edges) == len({tuple(sorted(e)) for e in edges.tolist()})
+    assert len(edges) == (len(d.triangle_array()) * 3 + len(d.voronoi_rays()[0])) // 2
+
+    offsets, targets = d.adjacency()
+    assert sorted(targets[offsets[7] : offsets[8]].tolist()) == sorted(d.neighbors(7))
+
+
+def assert_constrained_delauney(d):
+    # Every segment is an edge, and every other edge between two triangles
+    # has its opposite corner outside their circumcircle
+    segments = {tuple(sorted(e)) for e in d.constraint_array().tolist()}
+    assert segments <= {tuple(sorted(e)) for e in d.edge_array().tolist()}
+    opposite = {}
+    for t in d.triangle_array().tolist():
+        for i in range(3):
+            opposite[t[i], t[(i + 1) % 3]] = t[(i + 2) % 3]
+    x, y = d.points[:, 0], d.points[:, 1]
+    for (u, v), w in opposite.items():
+        z = opposite.get((v, u))
+        if z is not None and tuple(sorted((u, v))) not in segments:
+            assert not delauney.incircle(x[u], y[u], x[v], y[v], x[w], y[w], x[z], y[z]) > 0
+
+
+def test_constrained_segments(tmp_path):
+    random.seed(12)
+    d = Delauney.from_array(np.array([(random.uniform(0, 100), random.uniform(0, 100)) for _ in range(500)]))
+
+    # Square obstacles marked as holes, and one long wall through a site
+    squares = [(20, 20, 8), (60, 30, 5), (40, 75, 12)]
+    for cx, cy, r in squares:
+        d.insert_polygon([(cx - r, cy - r), (cx + r, cy - r), (cx + r, cy + r), (cx - r, cy + r)], hole=True)
+    middle = d.insert((85, 50))
+    path = d.insert_segment((80, 10), (90, 90))
+    assert middle in path and len(path) == 3
+    assert_constrained_delauney(d)
+
+    centers = d.points[d.triangle_array()].mean(axis=1)
+    inside = np.zeros(len(centers), dtype=bool)
+    for cx, cy, r in squares:
+        inside |= (np.abs(centers[:, 0] - cx) < r) & (np.abs(centers[:, 1] - cy) < r)
+    assert d.hole_mask().tolist() == inside.tolist()
+
+    # Segments survive later inserts, which split them where they land on one
+    count = len(d.constraints)
+    for _ in range(100):
+        d.insert((random.uniform(0, 100), random.uniform(0, 100)))
+    d.insert((87.5, 70))
+    assert len(d.constraints) == count + 1
+    assert_constrained_delauney(d)
+
+    try:
+        d.insert_segment((10, 60), (95, 60))
+        assert False
+    except ValueError:
+        pass
+
+    d.save(str(tmp_path / "mesh.bin"))
+    loaded = Delauney.load(str(tmp_path / "mesh.bin"))
+    assert loaded.constraint_array().tolist() == d.constraint_array().tolist()
+    assert loaded.hole_mask().tolist() == d.hole_mask().tolist()
+
+
+def test_remove_keeps_segments():
+    random.seed(19)
+    d = Delauney.from_array(np.array([(random.uniform(0, 10), random.uniform(0, 10)) for _ in range(100)]))
+    d.insert_segment((0.0, 0.0), (10.0, 10.0))
+    d.insert((5.0, 5.0))
+    assert len(d.constraints) == 2
+
+    # Removing the site in the middle joins the two halves again
+    d.remove((5.0, 5.0))
+    a, b = d.nearest(0, 0), d.nearest(10, 10)
+    assert sorted(map(sorted, d.constraint_array().tolist())) == [sorted((a, b))]
+    assert_constrained_delauney(d)
+
+    # Where two segments cross the site cannot go, at an end the segment goes
+    d.insert_segment((0.0, 10.0), (5.0, 5.0))
+    d.insert_segment((5.0, 5.0), (10.0, 0.0))
+    try:
+        d.remove((5.0, 5.0))
+        assert False
+    except ValueError:
+        pass
+    d.remove(a)
+    assert len(d.constraints) == 3
+    assert_constrained_delauney(d)
+
+    # Edges a removed segment kept are flipped back, on the hull too
+    for seed in range(10):
+        random.seed(seed)
+        d = Delauney.from_array(np.array([(random.uniform(0, 10), random.uniform(0, 10)) for _ in range(60)]))
+        for _ in range(4):
+            try:
+                d.insert_segment(*[(random.uniform(-1, 11), random.uniform(-1, 11)) for _ in range(2)])
+            except ValueError:
+                pass
+        for v in range(60, len(d.points)):
+            if d.incident[v] >= 0 and len(d.points) - d.removed > 3:
+                try:
+                    d.remove(v)
+                except ValueError:
+                    continue
+                d.validate()
+
+
+def test_strategies_match_vertical():
+    random.seed(17)
+    clouds = [
+        np.array([(random.uniform(0, 100), random.uniform(0, 100)) for _ in range(700)]),
+        # A long thin strip and a cross of two skewed clusters
+        np.array([(random.uniform(0, 1e6), random.uniform(0, 1)) for _ in range(500)]),
+        np.array([(random.gauss(0, 100), random.gauss(0, 1)) for _ in range(300)] + [(random.gauss(0, 1), random.gauss(0, 100)) for _ in range(300)]),
+        np.array([(float(i), 2.0 * i) for i in range(20)]),
+    ]
+    for points in clouds:
+        expected = triangle_coordinates(Delauney.from_array(points))
+        for strategy in ("alternating", "hilbert", "morton"):
+            d = Delauney.from_array(points, strategy=strategy)
+            assert triangle_coordinates(d) == expected
+            assert len(d.edge_array()) == len(Delauney.from_array(points).edge_array())
+
+            # Hull references are valid for later updates
+            d.insert((-1e7, 0.5))
+            d.remove(len(d.points) - 1)
+            assert triangle_coordinates(d) == expected
+
+    try:
+        Delauney.from_array(clouds[0], strategy="diagonal")
+        assert False
+    except ValueError:
+        pass
+
+
+def test_sanitize_merges_close_sites():
+    points = np.array([[0, 0], [5, 5], [0, 0], [np.nan, 1], [5, 5 + 1e-9], [1, 0], [0, 1], [5 + 2e-9, 5]])
+    keep, representative = delauney.sanitize(points)
+    assert keep.tolist() == [0, 6, 5, 1, 4, 7]
+    assert representative.tolist() == [0, 3, 0, -1, 4, 2, 1, 5]
+
+    d = Delauney.from_array(points, tolerance=1e-6)
+    assert d.order.tolist() == [0, 6, 5, 1]
+    assert d.representative.tolist() == [0, 3, 0, -1, 3, 2, 1, 3]
+    assert len(d.triangle_array()) == 2
+    d.validate()
+
+    sites = [Site(x, y) for x, y in points[[0, 1, 2, 4, 5, 6, 7]].tolist()]
+    d = Delauney(sites, tolerance=1e-6)
+    assert len(d.sites) == 4
+    assert d.representative.tolist() == [0, 0, 1, 2, 3, 3, 3]
+
+    # Stats describe the last build only, whether sites merged or not
+    random.seed(22)
+    spread = np.array([(random.uniform(0, 100), random.uniform(0, 100)) for _ in range(200)])
+    for points in (spread, np.vstack([spread, spread[:20] + 1e-9])):
+        d = Delauney.from_array(points, stats=True, tolerance=1e-6)
+        expected = Delauney.from_array(spread[np.sort(d.order)], stats=True)
+        assert d.stats.calls == expected.stats.calls
+        assert d.stats.merges == expected.stats.merges
+
+
+def test_degenerate_inputs_are_valid():
+    random.seed(23)
+    # Eighths, so that the lines below are exactly collinear
+    xs = [random.randrange(800) / 8 for _ in range(200)]
+    clouds = [
+        np.array([(x, 3.0) for x in xs]),
+        np.array([(3.0, x) for x in xs]),
+        np.array([(x, 2 * x + 1) for x in xs]),
+        np.array([(float(random.randrange(10)), float(random.randrange(10))) for _ in range(300)]),
+        np.array([(float(random.randrange(5)),) * 2 for _ in range(50)]),
+        np.array([[0.0, 0.0], [2.0, 2.0], [1.0, 1.0]]),
+    ]
+    for points in clouds:
+        for strategy in delauney.STRATEGIES:
+            d = Delauney.from_array(points, strategy=strategy)
+            d.validate()
+            assert len(d.points) == len(np.unique(points, axis=0))
+
+    # A line of sites is a path along it
+    d = Delauney.from_array(clouds[2], strategy="hilbert")
+    assert len(d.edge_array()) == len(d.points) - 1 and len(d.triangle_array()) == 0
+    assert d.circumcenter(Site(0, 0), Site(1, 1), Site(2, 2)).x == float("inf")
+
+
+def test_validate_finds_broken_meshes():
+    random.seed(29)
+    d = Delauney.from_array(np.array([(random.uniform(0, 100), random.uniform(0, 100)) for _ in range(100)]))
+    d.validate()
+
+    # Moving a site without repairing the mesh breaks the Delaunay property
+    v = d.triangle_array()[0, 0]
+    d.points[v] += 30
+    try:
+        d.validate()
+        assert False
+    except ValueError:
+        pass
+
+
+def triangle_angles(d):
+    p = d.points[d.triangle_array()]
+    angles = []
+    for k in range(3):
+        u, v = p[:, (k + 1) % 3] - p[:, k], p[:, (k + 2) % 3] - p[:, k]
+        cos = (u * v).sum(axis=1) / np.linalg.norm(u, axis=1) / np.linalg.norm(v, axis=1)
+        angles.append(np.degrees(np.arccos(np.clip(cos, -1, 1))))
+    return np.min(angles, axis=0)
+
+
+def triangle_areas(d):
+    p = d.points[d.triangle_array()]
+    u, v = p[:, 1] - p[:, 0], p[:, 2] - p[:, 0]
+    return (u[:, 0] * v[:, 1] - u[:, 1] * v[:, 0]) / 2
+
+
+def test_refine():
+    random.seed(31)
+    points = np.array([(random.uniform(0, 100), random.uniform(0, 100)) for _ in range(300)])
+    box = np.array([(-1.0, -1.0), (101.0, -1.0), (101.0, 101.0), (-1.0, 101.0)])
+    d = Delauney.from_array(points)
+    d.insert_polygon(box)
+    sites = len(d.points)
+
+    steiner, seconds, smallest = d.refine(min_angle=25, max_area=20.0)
+    assert steiner == len(d.points) - sites and seconds > 0
+    assert np.isclose(smallest, triangle_angles(d).min()) and smallest >= 25
+    assert triangle_areas(d).max() <= 20
+    d.validate()
+
+    # The box is still there, split into pieces along its sides
+    segments = d.points[d.constraint_array()]
+    on_side = (segments[:, 0] == segments[:, 1]) & np.isin(segments[:, 0], (-1.0, 101.0))
+    assert on_side.any(axis=1).all()
+    assert len(segments) > 4
+    assert d.refine(min_angle=25, max_area=20.0)[0] == 0
+
+    # Nothing is added inside a hole, and the bound holds around it
+    d = Delauney.from_array(points)
+    d.insert_polygon(box)
+    d.insert_polygon(np.array([(40.0, 40.0), (60.0, 40.0), (60.0, 60.0), (40.0, 60.0)]), hole=True)
+    inside = (d.points > 40) & (d.points < 60)
+    before = np.all(inside, axis=1).sum()
+    d.refine(min_angle=20)
+    assert np.all((d.points > 40) & (d.points < 60), axis=1).sum() == before
+    assert triangle_angles(d)[~d.hole_mask()].min() >= 20
+    d.validate()
+
+    # Without a box the domain is kept: every site lies on or inside the
+    # hull of the sites refined, which covers the same area. The smallest
+    # angle left is returned, here meeting the bound on a round hull
+    t = np.linspace(0, 2 * np.pi, 40, endpoint=False)
+    ring = np.column_stack((50 + 50 * np.cos(t), 50 + 50 * np.sin(t)))
+    round_points = np.concatenate((ring, points[np.hypot(*(points - 50).T) < 30]))
+    d = Delauney.from_array(round_points)
+    p = d.points[d.triangle_array()]
+    sides = np.concatenate([p[:, [k, (k + 1) % 3]] for k in range(3)])
+    pairs = [tuple(map(tuple, side.tolist())) for side in sides]
+    hull = np.array([side for side in pairs if side[::-1] not in set(pairs)])
+    before = triangle_areas(d).sum()
+    steiner, _, smallest = d.refine(min_angle=25)
+    assert steiner == len(d.points) - len(round_points) and steiner > 0
+    u, v = hull[:, 1] - hull[:, 0], d.points[:, None] - hull[:, 0]
+    assert (u[:, 0] * v[..., 1] - u[:, 1] * v[..., 0] >= -1e-9).all()
+    assert np.isclose(triangle_areas(d).sum(), before, rtol=1e-12)
+    assert np.isclose(smallest, triangle_angles(d).min()) and smallest >= 25
+    assert d.refine(min_angle=25)[0] == 0
+    d.validate()
+
+    # A square cloud has slanted hull edges too close to sites to split,
+    # which the smallest angle reports, unless the sites are enclosed
+    d = Delauney.from_array(points)
+    before = triangle_areas(d).sum()
+    smallest = d.refine(min_angle=25)[2]
+    assert smallest < 25 and np.isclose(smallest, triangle_angles(d).min())
+    assert np.isclose(triangle_areas(d).sum(), before, rtol=1e-12)
+    steiner, _, smallest = d.refine(min_angle=25, enclose=True)
+    assert np.isclose(smallest, triangle_angles(d).min()) and smallest >= 25
+    xmin, ymin, xmax, ymax = d.bounds
+    assert {(xmin, ymin), (xmax, ymin), (xmax, ymax), (xmin, ymax)} <= set(map(tuple, d.points.tolist()))
+    d.validate()
+
+
+def test_proximity_graphs():
+    random.seed(25)
+    # A coarse grid has many cocircular sites, and right angles over edges
+    for points in (
+        np.array([(random.uniform(0, 100), random.uniform(0, 100)) for _ in range(150)]),
+        np.array(sorted({(random.randint(0, 9), random.randint(0, 9)) for _ in range(70)}), dtype=np.float64),
+    ):
+        d = Delauney.from_array(points)
+        p = d.points
+        n = len(p)
+        squared = ((p[:, None] - p[None]) ** 2).sum(axis=2)
+        distance = np.sqrt(squared)
+
+        def as_set(edges):
+            return {tuple(sorted(e)) for e in edges.tolist()}
+
+        # Every pair checked against every other site
+        gabriel, neighborhood = set(), set()
+        for u in range(n):
+            for v in range(u + 1, n):
+                others = np.arange(n)[(np.arange(n) != u) & (np.arange(n) != v)]
+                if (squared[u, others] + squared[v, others] > squared[u, v]).all():
+                    gabriel.add((u, v))
+                if not ((distance[u, others] < distance[u, v]) & (distance[v, others] < distance[u, v])).any():
+                    neighborhood.add((u, v))
+        assert as_set(d.gabriel_array()) == gabriel
+        assert as_set(d.relative_neighborhood_array()) == neighborhood
+
+        # Prim's algorithm on the complete graph gives the same length
+        tree = d.spanning_tree_array()
+        lengths = distance[tree[:, 0], tree[:, 1]]
+        assert len(tree) == n - 1 and (np.diff(lengths) >= 0).all()
+        assert as_set(tree) <= neighborhood
+        best, done, total = distance[0].copy(), np.zeros(n, dtype=bool), 0.0
+        done[0] = True
+        for _ in range(n - 1):
+            v = np.where(done, np.inf, best).argmin()
+            total += best[v]
+            done[v] = True
+            best = np.minimum(best, distance[v])
+        assert abs(lengths.sum() - total) < 1e-9
+
+    # Collinear sites have no triangles; their chain is every graph
+    line = Delauney.from_array(np.array([(0.0, 0.0), (1.0, 1.0), (3.0, 3.0), (2.0, 2.0)]))
+    for edges in (line.gabriel_array(), line.relative_neighborhood_array(), line.spanning_tree_array()):
+        assert as_set(edges) == as_set(line.edge_array())
+
+
+def test_insert_into_tiny_meshes():
+    for d in (Delauney([]), Delauney.from_array(np.empty((0, 2)))):
+        assert d.nearest(1, 1) == -1
+        assert len(d.k_nearest(1, 1, 3)) == 0
+        assert d.insert((2.0, 1.0)) == 0
+        assert d.nearest(5, 5) == 0 and d.k_nearest(5, 5, 3).tolist() == [0]
+        assert d.insert(Site(2, 1)) == 0
+        assert d.insert((0.0, 3.0)) == 1
+        assert (d.left.origin.x, d.left.origin.y, d.left.dest.x, d.left.dest.y) == (0, 3, 2, 1)
+        assert d.nearest(0, 2) == 1 and d.k_nearest(3, 1, 5).tolist() == [0, 1]
+        d.insert((1.0, 0.0))
+        d.insert((1.0, 1.0))
+        assert len(d.triangle_array()) == 3
+        d.validate()
+
+    # The sampled walk starts leave the caller's random state alone
+    random.seed(8)
+    state = random.getstate()
+    d = Delauney.from_array(np.random.default_rng(8).random((100, 2)))
+    for x, y in np.random.default_rng(9).random((20, 2)).tolist():
+        d.insert((x, y))
+        d.nearest(y, x)
+    assert random.getstate() == state
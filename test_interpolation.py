@@ -0,0 +1,77 @@
+import random
+
+import numpy as np
+
+from turn_in.delauney import Delauney
+from turn_in.interpolation import Interpolator
+
+
+def plane(xy):
+    return 2 * xy[:, 0] - 3 * xy[:, 1] + 1
+
+
+def polygon_area(polygon):
+    x, y = polygon[:, 0], polygon[:, 1]
+    return 0.5 * (np.dot(x, np.roll(y, -1)) - np.dot(y, np.roll(x, -1)))
+
+
+def test_linear_functions_are_reproduced():
+    random.seed(1)
+    d = Delauney.from_array(np.array([(random.uniform(0, 100), random.uniform(0, 100)) for _ in range(400)]))
+    interpolator = Interpolator(d, plane(d.points))
+    queries = np.array([(random.uniform(-10, 110), random.uniform(-10, 110)) for _ in range(3000)])
+
+    # Inside the hull both methods are exact on planes, outside they fill
+    for method in (interpolator.linear, interpolator.natural):
+        result = method(queries)
+        inside = interpolator.locate(queries)[1]
+        assert np.isnan(result[~inside]).all()
+        assert np.allclose(result[inside], plane(queries[inside]), atol=1e-9)
+        assert np.allclose(method(d.points), plane(d.points), atol=1e-9)
+        assert (method(queries, fill=-1.0)[~inside] == -1).all()
+
+    # Queries on edges, where the new Voronoi vertices degenerate
+    edges = d.edge_array()
+    middles = (d.points[edges[:, 0]] + d.points[edges[:, 1]]) / 2
+    result = interpolator.natural(middles)
+    inside = ~np.isnan(result)
+    assert inside.mean() > 0.9
+    assert np.allclose(result[inside], plane(middles[inside]), atol=1e-9)
+
+
+def test_natural_weights_are_stolen_areas():
+    random.seed(2)
+    points = np.array([(random.uniform(0, 100), random.uniform(0, 100)) for _ in range(60)])
+    values = np.array([random.random() for _ in range(60)])
+    d = Delauney.from_array(points)
+    interpolator = Interpolator(d, values[d.order])
+
+    def cell_areas(d):
+        vertices, offsets, indices = d.voronoi_cells((-1e4, -1e4, 1e4, 1e4))
+        return np.array([polygon_area(vertices[indices[offsets[i] : offsets[i + 1]]]) for i in range(len(d.points))])
+
+    before = cell_areas(d)
+    for query in [(50.0, 50.0), (31.5, 72.25), (80.0, 12.5)]:
+        after = Delauney.from_array(np.vstack([points, query]))
+        area = np.empty(len(after.points))
+        area[after.order] = cell_areas(after)
+        stolen = before - area[d.order]
+        expected = (stolen * values[d.order]).sum() / stolen.sum()
+        assert abs(interpolator.natural(np.array([query]))[0] - expected) < 1e-8
+
+
+def test_grid_matches_queries():
+    random.seed(3)
+    d = Delauney.from_array(np.array([(random.uniform(0, 100), random.uniform(0, 100)) for _ in range(200)]))
+    interpolator = Interpolator(d, np.array([random.random() for _ in range(200)]))
+    xs, ys = np.linspace(0, 100, 37), np.linspace(0, 100, 23)
+    queries = np.column_stack([np.tile(xs, len(ys)), np.repeat(ys, len(xs))])
+
+    for method in ("linear", "natural"):
+        raster = interpolator.grid(xs, ys, method, fill=0.0)
+        assert raster.shape == (23, 37)
+        assert np.allclose(raster.ravel(), getattr(interpolator, method)(queries, fill=0.0))
+
+    # Without triangles everything is outside
+    line = Delauney.from_array(np.array([(0.0, 0.0), (1.0, 1.0), (2.0, 2.0)]))
+    assert np.isnan(Interpolator(line, np.zeros(3)).natural(queries[:5])).all()
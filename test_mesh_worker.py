@@ -0,0 +1,123 @@
+import random
+import threading
+
+import numpy as np
+
+from turn_in.delauney import Delauney
+from turn_in.mesh_worker import MeshWorker
+from turn_in.quad_edge import Site
+from turn_in.render import mesh_layers
+
+
+def test_worker_matches_direct_build():
+    random.seed(4)
+    sites = [Site(random.uniform(0, 10000), random.uniform(0, 10000)) for _ in range(200)]
+    worker = MeshWorker()
+    try:
+        assert worker.latest() is None
+        worker.submit(sites[0])
+        assert worker.wait(10)
+        version, layers = worker.latest()
+        assert len(layers) == 1 and len(layers[0][1]) == 1
+
+        for site in sites[1:]:
+            worker.submit(site)
+        assert worker.wait(10)
+        newer, layers = worker.latest()
+        assert newer > version
+
+        expected = mesh_layers(Delauney.from_array(np.array([(s.x, s.y) for s in sites])))
+        for (kind, vertices), (expected_kind, xy, _) in zip(layers, expected):
+            assert kind == expected_kind
+            assert sorted(map(tuple, vertices[:, :2].tolist())) == sorted(map(tuple, xy.astype(np.float32).tolist()))
+    finally:
+        worker.close()
+
+
+def test_submits_during_a_job_are_coalesced():
+    random.seed(5)
+    worker = MeshWorker()
+    try:
+        worker.submit(Site(0, 0))
+        worker.submit(Site(1, 0))
+        worker.wait(10)
+        jobs = worker.jobs
+
+        # Hold the worker inside its next job while more sites arrive
+        release = threading.Event()
+        inserting = threading.Event()
+        insert = worker.delauney.insert
+
+        def slow_insert(site):
+            inserting.set()
+            release.wait(10)
+            return insert(site)
+
+        worker.delauney.insert = slow_insert
+        worker.submit(Site(0, 1))
+        assert inserting.wait(10)
+        for _ in range(50):
+            worker.submit(Site(random.uniform(0, 1), random.uniform(0, 1)))
+        release.set()
+        assert worker.wait(10)
+
+        assert worker.jobs == jobs + 2
+        assert len(worker.latest()[1][0][1]) == 53
+    finally:
+        worker.close()
+
+
+def test_view_culls_and_decimates():
+    rng = np.random.default_rng(6)
+    points = rng.uniform(0, 10000, size=(2000, 2))
+    worker = MeshWorker()
+    try:
+        for x, y in points.tolist():
+            worker.submit(Site(x, y))
+        worker.set_view(0, 5000, 0, 5000)
+        assert worker.wait(30)
+        sites = worker.latest()[1][0][1]
+        expected = points[(points <= 5000).all(axis=1)]
+        assert sorted(map(tuple, sites[:, :2].tolist())) == sorted(map(tuple, expected.astype(np.float32).tolist()))
+
+        # Zoomed far out every layer is reduced to a few pixels
+        worker.set_view(0, 10000, 0, 10000, pixel=2500)
+        assert worker.wait(30)
+        for kind, vertices in worker.latest()[1]:
+            assert len(vertices) <= 2 * 25 * 25
+    finally:
+        worker.close()
+
+
+def test_duplicate_sites_and_failing_jobs():
+    worker = MeshWorker()
+    try:
+        # A double click as the very first input
+        worker.submit(Site(1, 1))
+        worker.submit(Site(1, 1))
+        assert worker.wait(10)
+        assert len(worker.latest()[1][0][1]) == 1
+        for site in (Site(1, 1), Site(3, 1), Site(2, 4)):
+            worker.submit(site)
+        assert worker.wait(10)
+        assert worker.error is None
+        assert len(worker.delauney.triangle_array()) == 1
+
+        # A job that raises leaves the last mesh up and the worker running
+        version = worker.latest()[0]
+        insert = worker.delauney.insert
+
+        def failing_insert(site):
+            raise RuntimeError("insert failed")
+
+        worker.delauney.insert = failing_insert
+        worker.submit(Site(5, 5))
+        assert worker.wait(10)
+        assert isinstance(worker.error, RuntimeError) and worker.latest()[0] == version
+
+        worker.delauney.insert = insert
+        worker.submit(Site(0, 5))
+        assert worker.wait(10)
+        assert worker.latest()[0] > version
+    finally:
+        worker.close()
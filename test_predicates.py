@@ -0,0 +1,47 @@
+import random
+
+import numpy as np
+
+from turn_in.predicates import incircle, incircle_array, orient2d
+
+
+def test_orient2d_matches_det():
+    random.seed(1)
+    for _ in range(200):
+        a, b, c = [(random.uniform(-100, 100), random.uniform(-100, 100)) for _ in range(3)]
+        expected = np.linalg.det([[a[0], a[1], 1], [b[0], b[1], 1], [c[0], c[1], 1]])
+        assert (orient2d(*a, *b, *c) > 0) == (expected > 0)
+
+
+def test_incircle_matches_det():
+    random.seed(2)
+    for _ in range(200):
+        pts = [(random.uniform(-100, 100), random.uniform(-100, 100)) for _ in range(4)]
+        expected = np.linalg.det([[x, y, x * x + y * y, 1] for x, y in pts])
+        assert (incircle(*pts[0], *pts[1], *pts[2], *pts[3]) > 0) == (expected > 0)
+
+
+def test_orient2d_near_collinear():
+    # Points one ulp apart around (0.5, 0.5); naive evaluation gets these wrong.
+    ulp = 2.0**-53
+    assert orient2d(0.5, 0.5, 12.0, 12.0, 24.0, 24.0) == 0
+    assert orient2d(0.5 + ulp, 0.5, 12.0, 12.0, 24.0, 24.0) < 0
+    assert orient2d(0.5, 0.5 + ulp, 12.0, 12.0, 24.0, 24.0) > 0
+
+
+def test_incircle_cocircular():
+    assert incircle(0, 0, 1, 0, 1, 1, 0, 1) == 0
+    assert incircle(0, 0, 1, 0, 1, 1, 0.5, 0.5) > 0
+    assert incircle(0, 0, 1, 0, 1, 1, 2, 2) < 0
+    assert incircle(0.1, 0.1, 0.3, 0.1, 0.3, 0.3, 0.1, 0.3) == 0
+
+
+def test_incircle_array_matches_scalar():
+    random.seed(3)
+    pts = np.array([[random.uniform(-100, 100) for _ in range(8)] for _ in range(200)])
+    # Cocircular rows, where only the exact fallback gets the sign right
+    pts[:50, 6:] = -pts[:50, :2]
+    pts[:50, 2:4] = pts[:50, :2][:, ::-1]
+    pts[:50, 4:6] = -pts[:50, 2:4]
+    det = incircle_array(*pts.T)
+    assert [np.sign(x) for x in det.tolist()] == [np.sign(incircle(*row)) for row in pts.tolist()]
@@ -0,0 +1,42 @@
+from turn_in.quad_edge import EdgeStore, QuadEdge, Site
+
+
+def test_edge_views():
+    a, b = Site(0, 0), Site(1, 0)
+    e = QuadEdge.make_edge(a, b)
+
+    assert e.origin is a
+    assert e.dest is b
+    assert e.sym.sym == e
+    assert e.rot.rot.rot.rot == e
+    assert e.onext == e
+    assert e.lnext == e.sym
+    assert e.rot.origin is None
+
+
+def test_triangle_connect():
+    store = EdgeStore([Site(0, 0), Site(1, 0), Site(0, 1)])
+    a = store.view(store.make_edge(0, 1))
+    b = store.view(store.make_edge(1, 2))
+    QuadEdge.splice(a.sym, b)
+    c = QuadEdge.connect(b, a)
+
+    assert c.origin is store.sites[2]
+    assert c.dest is store.sites[0]
+    assert a.lnext == b
+    assert b.lnext == c
+    assert c.lnext == a
+    assert len(store) == 12
+
+
+def test_delete_reuses_ids():
+    store = EdgeStore([Site(0, 0), Site(1, 0), Site(0, 1)])
+    e = store.make_edge(0, 1)
+    f = store.make_edge(1, 2)
+    store.delete(e)
+
+    assert e not in store
+    assert f in store
+    assert len(store) == 4
+    assert store.make_edge(0, 2) == e
+    assert store.view(e).dest is store.sites[2]
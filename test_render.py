@@ -0,0 +1,51 @@
+import random
+import struct
+import zlib
+
+import numpy as np
+
+from turn_in.delauney import Delauney
+from turn_in.render import BACKGROUND_COLOR, VORONOI_EDGE_COLOR, ortho, render_png, render_svg, to_window
+
+
+def read_png(path):
+    data = open(path, "rb").read()
+    assert data[:8] == b"\x89PNG\r\n\x1a\n"
+    width, height = struct.unpack(">II", data[16:24])
+    chunks, i = [], 8
+    while i < len(data):
+        (length,) = struct.unpack(">I", data[i : i + 4])
+        if data[i + 4 : i + 8] == b"IDAT":
+            chunks.append(data[i + 8 : i + 8 + length])
+        i += 12 + length
+    rows = np.frombuffer(zlib.decompress(b"".join(chunks)), dtype=np.uint8).reshape(height, -1)
+    return rows[:, 1:].reshape(height, width, 3)
+
+
+def mesh():
+    random.seed(13)
+    return Delauney.from_array(np.array([(random.uniform(0, 10000), random.uniform(0, 10000)) for _ in range(60)]))
+
+
+def test_ortho_maps_extent_to_window():
+    window = to_window(np.array([[0.0, 0.0], [10000.0, 10000.0]]), ortho(0, 10000, 0, 10000), 720, 360)
+    assert window.tolist() == [[0.0, 360.0], [720.0, 0.0]]
+
+
+def test_png_tiles_match(tmp_path):
+    d = mesh()
+    render_png(d, str(tmp_path / "whole.png"), 200, 150)
+    render_png(d, str(tmp_path / "tiled.png"), 200, 150, tile=7)
+    whole = read_png(str(tmp_path / "whole.png"))
+    assert whole.shape == (150, 200, 3)
+    assert np.array_equal(whole, read_png(str(tmp_path / "tiled.png")))
+
+    colors = {tuple(c) for c in whole.reshape(-1, 3).tolist()}
+    assert tuple(round(c * 255) for c in BACKGROUND_COLOR) in colors
+    assert tuple(round(c * 255) for c in VORONOI_EDGE_COLOR) in colors
+
+
+def test_svg(tmp_path):
+    render_svg(mesh(), str(tmp_path / "mesh.svg"), delauney_edges=False)
+    svg = open(tmp_path / "mesh.svg").read()
+    assert svg.startswith("<svg") and svg.count("<path") == 3
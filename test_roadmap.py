@@ -0,0 +1,53 @@
+import math
+import random
+
+import numpy as np
+
+from turn_in.delauney import Delauney
+from turn_in.roadmap import Roadmap
+
+
+def test_nearest_matches_brute_force():
+    rng = np.random.default_rng(14)
+    points = rng.uniform(0, 100, size=(500, 2))
+    edges = rng.integers(0, 400, size=(600, 2))
+    roadmap = Roadmap(points, edges)
+    connected = np.flatnonzero(np.diff(roadmap.offsets) > 0)
+    for x, y in rng.uniform(-50, 150, size=(200, 2)).tolist():
+        distance = np.hypot(points[connected, 0] - x, points[connected, 1] - y)
+        assert math.isclose(math.dist(points[roadmap.nearest(x, y)], (x, y)), distance.min())
+    assert Roadmap(points, np.zeros((0, 2))).nearest(0, 0) == -1
+
+
+def test_astar_matches_dijkstra():
+    rng = np.random.default_rng(15)
+    roadmap = Delauney.from_array(rng.uniform(0, 100, size=(400, 2))).roadmap()
+    for _ in range(30):
+        s, t = rng.integers(0, len(roadmap.points), size=2)
+        path, length = roadmap.shortest_path(s, t)
+        _, expected = roadmap.shortest_path(s, t, heuristic=False)
+        assert math.isclose(length, expected)
+        assert path[0] == s and path[-1] == t
+        steps = np.linalg.norm(np.diff(roadmap.points[path], axis=0), axis=1).sum()
+        assert math.isclose(steps, length)
+
+
+def test_route_avoids_holes():
+    random.seed(16)
+    d = Delauney.from_array(np.array([(random.uniform(0, 100), random.uniform(0, 100)) for _ in range(800)]))
+    d.insert_polygon([(30, 10), (70, 10), (70, 90), (30, 90)], hole=True)
+
+    points, length = d.route((10, 50), (90, 50))
+    assert len(points) > 2 and math.isclose(length, np.linalg.norm(np.diff(points, axis=0), axis=1).sum())
+    assert tuple(points[0]) == (10, 50) and tuple(points[-1]) == (90, 50)
+    inside = (points[:, 0] > 30) & (points[:, 0] < 70) & (points[:, 1] > 10) & (points[:, 1] < 90)
+    assert not inside.any()
+
+    # The graph is kept until the triangulation changes
+    assert d.roadmap() is d.roadmap()
+    roadmap = d.roadmap()
+    d.insert((5, 5))
+    assert d.roadmap() is not roadmap
+
+    # No passage is wide enough for a huge robot
+    assert d.route((10, 50), (90, 50), clearance=1000)[1] == math.inf
@@ -0,0 +1,74 @@
+import numpy as np
+
+from turn_in.viewport import GridIndex, View, decimate
+
+
+def brute_force(primitives, left, right, bottom, top):
+    p = primitives if primitives.ndim == 3 else primitives[:, None, :]
+    lo, hi = p.min(axis=1), p.max(axis=1)
+    return np.flatnonzero((lo[:, 0] <= right) & (hi[:, 0] >= left) & (lo[:, 1] <= top) & (hi[:, 1] >= bottom))
+
+
+def test_grid_index_matches_brute_force():
+    rng = np.random.default_rng(8)
+    points = rng.uniform(0, 10000, size=(3000, 2))
+    # Mostly short segments, with some spanning the whole extent
+    starts = rng.uniform(0, 10000, size=(3000, 2))
+    segments = np.stack([starts, starts + rng.normal(scale=50, size=(3000, 2))], axis=1)
+    segments[::100, 1] = rng.uniform(-20000, 30000, size=(30, 2))
+
+    for primitives in (points, segments, points[:0], points[:1]):
+        index = GridIndex(primitives)
+        for _ in range(50):
+            x0, x1 = np.sort(rng.uniform(-1000, 11000, size=2))
+            y0, y1 = np.sort(rng.uniform(-1000, 11000, size=2))
+            assert np.array_equal(np.sort(index.query(x0, x1, y0, y1)), brute_force(primitives, x0, x1, y0, y1))
+
+
+def test_grid_index_leaves_outliers_out_of_the_grid():
+    # Voronoi edges of a mesh reach far out at the circumcenters of slivers
+    # along the hull; they must not stretch the grid into a single cell
+    rng = np.random.default_rng(10)
+    starts = rng.uniform(0, 10000, size=(20000, 2))
+    segments = np.stack([starts, starts + rng.normal(scale=20, size=(20000, 2))], axis=1)
+    segments[::200] = rng.uniform(-1e9, 1e9, size=(100, 2, 2))
+    segments[1::200, 1] = rng.uniform(-1e9, 1e9, size=(100, 2))
+
+    index = GridIndex(segments)
+    assert np.diff(index.start).max() <= 4 * 4 * 4
+    assert len(index.overflow) <= 0.05 * len(segments)
+    for _ in range(20):
+        x0, x1 = np.sort(rng.uniform(-1000, 11000, size=2))
+        y0, y1 = np.sort(rng.uniform(-1000, 11000, size=2))
+        assert np.array_equal(np.sort(index.query(x0, x1, y0, y1)), brute_force(segments, x0, x1, y0, y1))
+
+
+def test_decimate_keeps_one_per_pixel():
+    rng = np.random.default_rng(9)
+    points = rng.uniform(0, 100, size=(100000, 2))
+    kept = decimate(points, 10.0)
+    assert len(kept) == 100
+    assert len(np.unique(np.floor(points[kept] / 10), axis=0)) == 100
+    assert np.array_equal(decimate(points, 0.0), np.arange(len(points)))
+
+    segments = np.stack([points[:50000], points[50000:]], axis=1)
+    kept = decimate(segments, 10.0)
+    assert len(kept) <= 100 * 100
+    assert (np.abs(segments[kept, 1] - segments[kept, 0]).max(axis=1) >= 20).all()
+
+
+def test_view_pan_and_zoom():
+    view = View((0, 10000, 0, 10000), 720, 720)
+    assert view.to_world(0, 0) == (0, 10000)
+    assert view.to_world(720, 720) == (10000, 0)
+
+    before = view.to_world(100, 200)
+    view.zoom(4, 100, 200)
+    assert np.allclose(view.to_world(100, 200), before)
+    assert np.isclose(view.pixel, 10000 / 720 / 4)
+
+    view.pan(72, -72)
+    assert np.allclose(view.to_world(172, 128), before)
+
+    view.resize(1440, 720)
+    assert np.isclose(view.pixel, 10000 / 720 / 4)
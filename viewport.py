@@ -0,0 +1,164 @@
+from typing import Tuple
+
+import numpy as np
+
+from render import EXTENT
+
+# Primitives per grid cell the index aims for, and a cap on cells per side
+CELL_OCCUPANCY = 4
+MAX_GRID_SIDE = 2048
+# The grid spans this quantile range of the primitive centers; the few
+# beyond, like circumcenters of slivers along the hull, go to the overflow
+GRID_QUANTILES = (0.01, 0.99)
+
+# How far in and out the view may zoom, as a fraction of its starting width
+MIN_ZOOM = 1e-6
+MAX_ZOOM = 100.0
+
+# Segments shorter than this many pixels are left out when decimating
+LOD_MIN_SEGMENT = 2
+
+
+class View:
+    # The world rectangle shown in a width x height window, kept as the
+    # (left, right, bottom, top) that glm.ortho takes. Window positions are
+    # in pixels with y pointing down, as GLFW reports the cursor.
+    def __init__(self, extent: Tuple[float, float, float, float] = EXTENT, width: int = 720, height: int = 720) -> None:
+        self.left, self.right, self.bottom, self.top = map(float, extent)
+        self.width = width
+        self.height = height
+        self.__initial_width = self.right - self.left
+
+    @property
+    def extent(self) -> Tuple[float, float, float, float]:
+        return self.left, self.right, self.bottom, self.top
+
+    @property
+    def pixel(self) -> float:
+        # World units per pixel, the larger of the two axes
+        return max((self.right - self.left) / self.width, (self.top - self.bottom) / self.height)
+
+    def to_world(self, x: float, y: float) -> Tuple[float, float]:
+        return (
+            self.left + x / self.width * (self.right - self.left),
+            self.top - y / self.height * (self.top - self.bottom),
+        )
+
+    def pan(self, dx: float, dy: float) -> None:
+        # Moves the view with a drag of (dx, dy) pixels
+        sx = dx / self.width * (self.right - self.left)
+        sy = dy / self.height * (self.top - self.bottom)
+        self.left -= sx
+        self.right -= sx
+        self.bottom += sy
+        self.top += sy
+
+    def zoom(self, factor: float, x: float, y: float) -> None:
+        # Zooms in by factor (out when below 1), keeping the world position
+        # under window position (x, y) where it is
+        width = self.right - self.left
+        factor = min(max(factor, width / (MAX_ZOOM * self.__initial_width)), width / (MIN_ZOOM * self.__initial_width))
+        wx, wy = self.to_world(x, y)
+        self.left = wx - (wx - self.left) / factor
+        self.right = wx + (self.right - wx) / factor
+        self.bottom = wy - (wy - self.bottom) / factor
+        self.top = wy + (self.top - wy) / factor
+
+    def resize(self, width: int, height: int) -> None:
+        # Keeps the scale and the top left corner
+        self.right = self.left + (self.right - self.left) * width / self.width
+        self.bottom = self.top - (self.top - self.bottom) * height / self.height
+        self.width = width
+        self.height = height
+
+
+class GridIndex:
+    # A uniform grid over the primitives of one layer, points as an (N, 2)
+    # array or segments as (N, 2, 2), answering which of them touch a
+    # rectangle. Every primitive no larger than a cell is filed under the
+    # cell of its center; larger ones, and those centered outside the
+    # grid, are kept in an overflow list and always tested.
+    def __init__(self, primitives: np.ndarray) -> None:
+        p = np.asarray(primitives, dtype=np.float64)
+        if p.ndim == 2:
+            p = p[:, None, :]
+        n = len(p)
+        self.lo = p.min(axis=1) if n else np.zeros((0, 2))
+        self.hi = p.max(axis=1) if n else np.zeros((0, 2))
+
+        center = (self.lo + self.hi) / 2
+        finite = np.isfinite(center).all(axis=1)
+        if finite.any():
+            self.origin, end = np.quantile(center[finite], GRID_QUANTILES, axis=0)
+        else:
+            self.origin, end = np.zeros(2), np.zeros(2)
+        span = end - self.origin
+        side = int(min(max(np.ceil(np.sqrt(n / CELL_OCCUPANCY)), 1), MAX_GRID_SIDE))
+        self.cell = span.max() / side or 1.0
+        self.nx, self.ny = (np.minimum(np.floor(span / self.cell).astype(np.int64), side - 1) + 1).tolist()
+
+        inside = finite & (center >= self.origin).all(axis=1) & (center <= end).all(axis=1)
+        small = inside & ((self.hi - self.lo) <= self.cell).all(axis=1)
+        self.overflow = np.flatnonzero(~small)
+        small = np.flatnonzero(small)
+        cx, cy = self.__cells((self.lo[small] + self.hi[small]) / 2)
+        key = cy * self.nx + cx
+        order = np.argsort(key, kind="stable")
+        self.items = small[order]
+        self.start = np.searchsorted(key[order], np.arange(self.nx * self.ny + 1))
+
+    def __cells(self, xy: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        c = np.clip(np.floor((xy - self.origin) / self.cell), 0, [self.nx - 1, self.ny - 1]).astype(np.int64)
+        return c[:, 0], c[:, 1]
+
+    def query(self, left: float, right: float, bottom: float, top: float) -> np.ndarray:
+        # Indices of the primitives whose bounding boxes meet the rectangle.
+        # A small primitive reaches at most half a cell past its own cell,
+        # so one extra ring of cells is searched.
+        (x0, x1), (y0, y1) = self.__cells(np.array([[left, bottom], [right, top]]))
+        x0, y0 = max(x0 - 1, 0), max(y0 - 1, 0)
+        x1, y1 = min(x1 + 1, self.nx - 1), min(y1 + 1, self.ny - 1)
+
+        rows = np.arange(y0, y1 + 1) * self.nx
+        begin = self.start[rows + x0]
+        count = self.start[rows + x1 + 1] - begin
+        offsets = np.arange(count.sum()) - np.repeat(np.cumsum(count) - count, count)
+        candidates = np.concatenate([self.items[np.repeat(begin, count) + offsets], self.overflow])
+
+        lo, hi = self.lo[candidates], self.hi[candidates]
+        keep = (lo[:, 0] <= right) & (hi[:, 0] >= left) & (lo[:, 1] <= top) & (hi[:, 1] >= bottom)
+        return candidates[keep]
+
+
+def first_unique(q: np.ndarray) -> np.ndarray:
+    # Index of the first occurrence of each distinct row of an integer
+    # array, as np.unique(q, axis=0, return_index=True) but packing each
+    # row into one integer when the ranges allow it, which is much faster
+    q = q - q.min(axis=0)
+    radix = q.max(axis=0) + 1
+    if np.prod(radix.astype(np.float64)) >= 2**62:
+        return np.unique(q, axis=0, return_index=True)[1]
+    key = np.zeros(len(q), dtype=np.int64)
+    for k in range(q.shape[1]):
+        key = key * radix[k] + q[:, k]
+    return np.unique(key, return_index=True)[1]
+
+
+def decimate(primitives: np.ndarray, pixel: float) -> np.ndarray:
+    # Indices of one primitive per pixel, or per pair of pixels for
+    # segments, out of points (N, 2) or segments (N, 2, 2). Segments shorter
+    # than LOD_MIN_SEGMENT pixels are dropped: their ends are drawn as sites
+    # or circumcenters anyway, and where they are that short the points
+    # already fill the region. Zoomed out, this bounds what is drawn by the
+    # window size rather than the mesh size.
+    p = np.asarray(primitives, dtype=np.float64)
+    if not len(p) or pixel <= 0:
+        return np.arange(len(p))
+    q = np.floor(p / pixel).astype(np.int64)
+    if p.ndim == 3:
+        q = q.reshape(-1, 4)
+        long = np.abs(p[:, 1] - p[:, 0]).max(axis=1) >= LOD_MIN_SEGMENT * pixel
+        if not long.any():
+            return np.flatnonzero(long)
+        return np.flatnonzero(long)[first_unique(q[long])]
+    return first_unique(q)
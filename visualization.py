@@ -14,6 +14,7 @@ from shader import Shader
 import numpy as np
 import glm
 
+from render import BACKGROUND_COLOR, POINT_SIZE
 from voronoi_and_delauney_visualization import VDV
 
 
@@ -57,18 +58,8 @@ shader = Shader(vertex_src, fragment_src)
 
 
 
-glClearColor(0.35, 0.45, 0.50, 1.00)
-glPointSize(5.0)
-
-left = 0  # Maps to -1 in the original space
-right = 10000  # Maps to 1 in the original space
-bottom = 0  # Maps to -1 in the original space
-top = 10000  # Maps to 1 in the original space
-
-zNear = -1.0  # Example value, adjust as needed
-zFar = 1.0  # Example value, adjust as needed
-
-projection = glm.ortho(left, right, bottom, top, zNear, zFar)
+glClearColor(*BACKGROUND_COLOR, 1.00)
+glPointSize(POINT_SIZE)
 
 vdv = VDV()
 vdv.set_mouse_button_callback(window)
@@ -78,8 +69,13 @@ while not glfw.window_should_close(window):
     glfw.poll_events()
     glClear(GL_COLOR_BUFFER_BIT)
     shader.bind()
-    shader.set_mat4("projection", glm.value_ptr(projection))
+    # Pan and zoom change the projection from frame to frame
+    shader.set_mat4("projection", glm.value_ptr(vdv.projection()))
 
+    vdv.update()
     vdv.display()
 
     glfw.swap_buffers(window)
+
+vdv.delete()
+glfw.terminate()
@@ -2,161 +2,132 @@ import glfw
 from OpenGL.GL import *
 from OpenGL.GLUT import *
 from OpenGL.GLU import *
-from delauney import Delauney, VoronoiEdge
-from quad_edge import QuadEdge, Site
+from mesh_worker import MeshWorker
+from quad_edge import Site
 from shader import Shader
+from viewport import View
 import numpy as np
 import glm
 
+# Zoom factor per scroll wheel step
+ZOOM_STEP = 1.2
 
-class VDV:
-    def __init__(self) -> None:
-        self.delauney_sites = []
-        self.delauney_sites_vao = []
-        self.voronoi_circumcenters = []
-        self.voronoi_edges = []
-        self.delauney_edges = []
-        self.__show_delauney_edges = True
 
-    def display(self):
-        for site in self.delauney_sites_vao:
-            glBindVertexArray(site)
-            glDrawArrays(GL_POINTS, 0, 1)
-
-        for circumcenter in self.voronoi_circumcenters:
-            glBindVertexArray(circumcenter)
-            glDrawArrays(GL_POINTS, 0, 1)
-
-        if self.__show_delauney_edges:
-            for edge in self.delauney_edges:
-                glBindVertexArray(edge)
-                glDrawArrays(GL_LINES, 0, 2)
+class Layer:
+    # All primitives of one kind in a single vertex buffer, drawn with one
+    # call. The buffer grows geometrically and is otherwise rewritten in
+    # place, so updates do not allocate GPU memory.
+    def __init__(self, mode) -> None:
+        self.mode = mode
+        self.count = 0
+        self.capacity = 0
+        self.vao = glGenVertexArrays(1)
+        self.vbo = glGenBuffers(1)
 
-        for edge in self.voronoi_edges:
-            glBindVertexArray(edge)
-            glDrawArrays(GL_LINES, 0, 2)
-
-    def create_edge_vao(seld, data: np.ndarray):
-        vao = glGenVertexArrays(1)
-        vbo = glGenBuffers(1)
-
-        glBindBuffer(GL_ARRAY_BUFFER, vbo)
-        glBufferData(GL_ARRAY_BUFFER, data.nbytes, data, GL_STATIC_DRAW)
-
-        glBindVertexArray(vao)
+        glBindVertexArray(self.vao)
+        glBindBuffer(GL_ARRAY_BUFFER, self.vbo)
         glEnableVertexAttribArray(0)
-        glVertexAttribPointer(
-            0, 2, GL_FLOAT, GL_FALSE, 5 * sizeof(ctypes.c_float), None
-        )
-
+        glVertexAttribPointer(0, 2, GL_FLOAT, GL_FALSE, 5 * sizeof(ctypes.c_float), None)
         glEnableVertexAttribArray(1)
-        glVertexAttribPointer(1,3,GL_FLOAT,GL_FALSE,5 * sizeof(ctypes.c_float),ctypes.c_void_p(2 * sizeof(ctypes.c_float)))
+        glVertexAttribPointer(1, 3, GL_FLOAT, GL_FALSE, 5 * sizeof(ctypes.c_float), ctypes.c_void_p(2 * sizeof(ctypes.c_float)))
 
-        return vao
-    
-    def create_site_vao(self, data: np.ndarray):
-        vao = glGenVertexArrays(1)
-        vbo = glGenBuffers(1)
+    def upload(self, vertices: np.ndarray):
+        vertices = np.ascontiguousarray(vertices, dtype=np.float32)
+        glBindBuffer(GL_ARRAY_BUFFER, self.vbo)
+        if len(vertices) > self.capacity:
+            self.capacity = max(1024, 2 * len(vertices))
+            glBufferData(GL_ARRAY_BUFFER, self.capacity * 5 * sizeof(ctypes.c_float), None, GL_DYNAMIC_DRAW)
+        if len(vertices):
+            glBufferSubData(GL_ARRAY_BUFFER, 0, vertices.nbytes, vertices)
+        self.count = len(vertices)
 
-        glBindBuffer(GL_ARRAY_BUFFER, vbo)
-        glBufferData(GL_ARRAY_BUFFER, data.nbytes, data, GL_STATIC_DRAW)
+    def draw(self):
+        if self.count:
+            glBindVertexArray(self.vao)
+            glDrawArrays(self.mode, 0, self.count)
 
-        glBindVertexArray(vao)
-        glEnableVertexAttribArray(0)
-        glVertexAttribPointer(0, 2, GL_FLOAT, GL_FALSE, 5 * sizeof(ctypes.c_float), None)
-        glEnableVertexAttribArray(1)
-        glVertexAttribPointer(1, 3, GL_FLOAT, GL_FALSE, 5 * sizeof(ctypes.c_float), ctypes.c_void_p(2 * sizeof(ctypes.c_float)))
+    def delete(self):
+        glDeleteBuffers(1, [self.vbo])
+        glDeleteVertexArrays(1, [self.vao])
+        self.count = self.capacity = 0
+
+
+class VDV:
+    def __init__(self) -> None:
+        # Triangulates off the render thread; update() picks up its results
+        self.worker = MeshWorker()
+        self.version = 0
+        self.view = View()
+        self.__drag = None
+        self.__set_view()
+        self.sites = Layer(GL_POINTS)
+        self.voronoi_circumcenters = Layer(GL_POINTS)
+        self.delauney_edges = Layer(GL_LINES)
+        self.voronoi_edges = Layer(GL_LINES)
+        self.__show_delauney_edges = True
 
-        return vao
-    
-    def add_delauney_edge(self, e: QuadEdge):
-        data = np.array(
-            [
-                e.origin.x,
-                e.origin.y,
-                0.0,
-                0.0,
-                1.0,
-                e.dest.x,
-                e.dest.y,
-                0.0,
-                0.0,
-                1.0,
-            ], dtype=np.float32)
-        
-        vao = self.create_edge_vao(data)
-        self.delauney_edges.append(vao)
-
-    def add_voronoi_edge(self, e: VoronoiEdge):
-        data = np.array(
-            [
-                e.origin.x,
-                e.origin.y,
-                1.0,
-                0.0,
-                0.0,
-                e.dest.x,
-                e.dest.y,
-                1.0,
-                0.0,
-                0.0,
-            ], dtype=np.float32)
-        
-        vao = self.create_edge_vao(data)
-        self.voronoi_edges.append(vao)
-
-    def add_delauney_site(self, site: Site):
-        data = np.array(
-            [
-                site.x,
-                site.y,
-                1.0,
-                0.5,
-                0.0,
-            ], dtype=np.float32)
-        
-        vao = self.create_site_vao(data)
-        self.delauney_sites_vao.append(vao)
-
-    def add_voronoi_circumcenter(self, site: Site):
-        data = np.array(
-            [
-                site.x,
-                site.y,
-                0.0,
-                0.0,
-                0.0,
-            ], dtype=np.float32)
-        
-        vao = self.create_site_vao(data)
-        self.voronoi_circumcenters.append(vao)
+    def display(self):
+        self.sites.draw()
+        self.voronoi_circumcenters.draw()
+        if self.__show_delauney_edges:
+            self.delauney_edges.draw()
+        self.voronoi_edges.draw()
+
+    def update(self):
+        # Called once per frame. Uploads the worker's latest mesh if it is
+        # newer than the one drawn, and otherwise does nothing, so frames do
+        # not wait for triangulation.
+        latest = self.worker.latest()
+        if latest is None or latest[0] == self.version:
+            return
+        self.version, vertices = latest
+
+        layers = (self.sites, self.voronoi_circumcenters, self.delauney_edges, self.voronoi_edges)
+        for layer, (_, data) in zip(layers, vertices):
+            layer.upload(data)
+
+    def projection(self):
+        return glm.ortho(*self.view.extent, -1.0, 1.0)
+
+    def __set_view(self):
+        # The worker culls and decimates for the new view in the background
+        self.worker.set_view(*self.view.extent, self.view.pixel)
+
+    def delete(self):
+        self.worker.close()
+        for layer in (self.sites, self.voronoi_circumcenters, self.delauney_edges, self.voronoi_edges):
+            layer.delete()
 
     def set_mouse_button_callback(self, window):
-        
+
         def mouse_button_callback(window, button, action, mods):
             if button == glfw.MOUSE_BUTTON_LEFT and action == glfw.PRESS:
-                x, y = glfw.get_cursor_pos(window)
-                x = (x / 720) * 10000
-                y = 10000 - ((y / 720) * 10000)
-                self.delauney_sites.append(Site(x, y))
-                self.add_delauney_site(self.delauney_sites[-1])
-
-                if len(self.delauney_sites) > 1:
-                    d = Delauney(self.delauney_sites)
-                    self.delauney_edges.clear()
-                    for e in [edge for edge in d.edges.values() if edge.origin and edge.dest]:
-                        self.add_delauney_edge(e)
-
-                    self.voronoi_circumcenters.clear()
-                    self.voronoi_edges.clear()
-                    circ, v_edges = d.voronoi()
-                    for e in v_edges:
-                        self.add_voronoi_edge(e)
-
-                    for site in circ:
-                        self.add_voronoi_circumcenter(site)
+                x, y = self.view.to_world(*glfw.get_cursor_pos(window))
+                self.worker.submit(Site(x, y))
+            elif button == glfw.MOUSE_BUTTON_RIGHT:
+                # Right drag pans
+                self.__drag = glfw.get_cursor_pos(window) if action == glfw.PRESS else None
+
+        def cursor_pos_callback(window, x, y):
+            if self.__drag is not None:
+                self.view.pan(x - self.__drag[0], y - self.__drag[1])
+                self.__drag = (x, y)
+                self.__set_view()
+
+        def scroll_callback(window, dx, dy):
+            self.view.zoom(ZOOM_STEP**dy, *glfw.get_cursor_pos(window))
+            self.__set_view()
+
+        def window_size_callback(window, width, height):
+            if width and height:
+                glViewport(0, 0, *glfw.get_framebuffer_size(window))
+                self.view.resize(width, height)
+                self.__set_view()
 
         glfw.set_mouse_button_callback(window, mouse_button_callback)
+        glfw.set_cursor_pos_callback(window, cursor_pos_callback)
+        glfw.set_scroll_callback(window, scroll_callback)
+        glfw.set_window_size_callback(window, window_size_callback)
 
     def set_button_callback(self, window):
         def key_callback(window, key, scancode, action, mods):